@@ -1,20 +1,33 @@
 import json 
 from utility import *
+from query_templates import template_query, query_parameters
+from cypher_cache import cached_cypher_query
+from retrieval import rank_results, warm_query_embedding
+from pipeline import Pipeline
+from context_packing import pack_results
 
-def get_author_collaboration(conn, openai,user_query):
+def get_author_collaboration(conn, openai,user_query, on_token=None):
     try:
 
-        query_info = extract_query_information(user_query, openai)
+        # The query embedding is computed while the query is extracted and expanded and the
+        # candidates retrieved, and is handed to ranking with them
+        pipeline = Pipeline("author")
+        pipeline.add("query_info", lambda: get_expanded_query_information(conn, user_query, openai))
+        pipeline.add("embedding", lambda: warm_query_embedding(user_query, openai, conn=conn))
+        pipeline.add("candidates", lambda query_info: retrieve_candidates(conn, openai, query_info[1]),
+                     deps=["query_info"])
+        pipeline.add("results", lambda query_info, candidates, embedding: rank_results(
+            conn, query_info[1], candidates, openai, query_text=user_query, query_embedding=embedding),
+                     deps=["query_info", "candidates", "embedding"])
+        pipeline.add("recommendations", lambda results: generate_author_recommendations(user_query, openai, results, on_token),
+                     deps=["results"])
+        stages = pipeline.run()
+        query_info, extracted_info = stages["query_info"]
+        results, recommendations = stages["results"], stages["recommendations"]
         print(f"\nExtracted query information: {json.dumps(query_info, indent=2)}")
-
-        extracted_info=expand_query_information(query_info, openai)
         print(f"\nExpanded query information: {json.dumps(extracted_info, indent=2)}")
-
-        results = get_datasets_and_papers(conn, openai,extracted_info)
         print(f"\nRetrieved results:", results)
 
-        recommendations = generate_author_recommendations(user_query, openai, results)
-
         print("\nRecommendations:")
         print(recommendations)
         return recommendations
@@ -24,10 +37,7 @@ def get_author_collaboration(conn, openai,user_query):
 
 
 def dynamic_cypher_query(query_info, openai, schema):
-    if not schema:
-        schema_str = "Schema information not available."
-    else:
-        schema_str = json.dumps(schema, indent=2)
+    schema_str = format_schema(schema)
 
     json_dict = json.dumps(query_info, indent=2)
     content = query_info.get("content", "")
@@ -51,9 +61,13 @@ def dynamic_cypher_query(query_info, openai, schema):
 
     Important guidelines:
     - Use OPTIONAL MATCH for relationships that might not exist for all papers
+    - Also return p.id AS Id, and score AS Score when using the full-text index
     - Use separate WHERE clauses for each MATCH to improve readability
     - Use coalesce() for optional filters to avoid errors when the field is not provided
-    - For keyword matching, use: ANY(keyword IN json_dict["keywords"] WHERE p.title CONTAINS keyword OR p.abstract CONTAINS keyword)
+    - For keyword matching, use the full-text index: CALL db.index.fulltext.queryNodes('paper_text', $search) YIELD node AS p, score
+      ($search holds the keywords as a Lucene query; it is null when there are no keywords)
+    - If $date_range_text is not null, the date range could not be parsed and $date_range_start and $date_range_end are null;
+      filter p.date_published on that text with date() and duration() bounds, e.g. "last year" as p.date_published >= date() - duration('P1Y')
     - Ensure the query is efficient and uses appropriate indexes if possible
     - Use the exact node labels, relationship types, and property names as provided in the database schema
     - If the schema information is not available, use general node labels like Dataset, Paper, Keyword, etc.
@@ -80,21 +94,17 @@ def dynamic_cypher_query(query_info, openai, schema):
     Do not include the 'CYPHER' keyword in the query and dont generate ```.
     """
 
-    response = openai.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}]
-    )
+    return openai.complete(prompt).strip()
 
-    return response.choices[0].message.content.strip()
 
-
-def generate_author_recommendations(user_query, openai, results):
+def generate_author_recommendations(user_query, openai, results, on_token=None):
     """
     Generate author collaboration recommendations based on user query and retrieved results.
 
     Args:
         user_query (str): The original user query
         results (list): Retrieved research papers and authors from the database
+        on_token (callable): If given, called with each piece of the answer as it is generated
 
     Returns:
         str: AI-generated recommendations and insights about potential collaborators
@@ -104,7 +114,7 @@ def generate_author_recommendations(user_query, openai, results):
 
     Based on the query, here are the relevant authors and their associated work found:
 
-    {json.dumps(results, indent=2)}
+    {pack_results(results)}
 
     Please provide:
     1. A list of authors who are experts or active in the given research area or topic.
@@ -115,41 +125,22 @@ def generate_author_recommendations(user_query, openai, results):
     Respond in a concise, well-structured format.
     """
 
-    response = openai.chat.completions.create(
-        model="gpt-4o-mini",  # Using the same model as in other recommendation methods
-        messages=[{"role": "user", "content": prompt}]
-    )
-
-    return response.choices[0].message.content
-
-
-def get_datasets_and_papers(conn, openai, query_info):
-    schema = get_database_structure(conn)
-    query = dynamic_cypher_query(query_info,openai,schema)
-    print(f"Generated Cypher query:\n{query}")
-
-    # Prepare parameters with default values
-    parameters = {
-        "papers": query_info.get("papers", []),
-        "keywords": query_info.get("keywords", []),
-        "authors": query_info.get("authors", []),
-        "conferences": query_info.get("conferences", []),
-        "domains": query_info.get("domains", []),
-        "date_range_start": None,
-        "date_range_end": None,
-        "min_citations": query_info.get("min_citations")
-    }
-
-    # Safely get date range values
-    date_range = query_info.get("date_range", {})
-    if isinstance(date_range, dict):
-        parameters["date_range_start"] = date_range.get("start")
-        parameters["date_range_end"] = date_range.get("end")
-
-    # Convert None to empty lists for list parameters
-    for key in ["keywords", "authors", "conferences", "domains"]:
-        if parameters[key] is None:
-            parameters[key] = []
+    return openai.complete(prompt, on_token=on_token)
+
+
+def get_datasets_and_papers(conn, openai, query_info, query_text=None, query_embedding=None):
+    results = retrieve_candidates(conn, openai, query_info)
+    return rank_results(conn, query_info, results, openai, query_text=query_text, query_embedding=query_embedding)
+
+
+def retrieve_candidates(conn, openai, query_info):
+    query = template_query("author", query_info)
+    if query is None:
+        query = cached_cypher_query("author", query_info, lambda: dynamic_cypher_query(
+            query_info, openai, get_database_structure(conn)))
+        print(f"Generated Cypher query:\n{query}")
+
+    parameters = query_parameters(query_info)
 
     results = conn.query(query, parameters=parameters)
     print(f"Retrieved {len(results)} results")
@@ -0,0 +1,136 @@
+import argparse
+import contextlib
+import io
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SAMPLE_QUERIES = [
+    "Recommend datasets for named entity recognition in biomedical text",
+    "Find influential papers on relation extraction published since 2020",
+    "Who works on document-level information extraction with graph neural networks?",
+    "Datasets for open information extraction with at least 50 citations",
+    "Papers on event extraction presented at ACL between 2019 and 2023",
+    "Suggest collaborators working on few-shot named entity recognition",
+    "Recent work on knowledge graph completion with language models",
+    "Datasets used for aspect based sentiment analysis",
+]
+
+
+def percentile(values, q):
+    """
+    Nearest-rank percentile of values, q between 0 and 100.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(math.ceil(q / 100 * len(ordered)) - 1, 0)]
+
+
+def tool_functions():
+    from dataset_recommendation import get_dataset_recommendations
+    from theme_specific_search import theme_search
+    from author_collaboration import get_author_collaboration
+    from summarize_papers import summarize_papers, get_citation_reasoning
+
+    return {
+        "datasets": get_dataset_recommendations,
+        "theme": theme_search,
+        "authors": get_author_collaboration,
+        "summarize": summarize_papers,
+        "citations": get_citation_reasoning,
+    }
+
+
+def run_benchmark(conn, openai, tool, queries, requests, concurrency, verbose=False):
+    """
+    Send requests queries (cycling through queries) to tool, concurrency at
+    a time, and return the latency of each one and the number that failed.
+    """
+    def timed(query):
+        start = time.perf_counter()
+        try:
+            result = tool(conn, openai, query)
+        except Exception as e:
+            print(f"Error: {e}")
+            result = None
+        return time.perf_counter() - start, result is not None
+
+    batch = [queries[i % len(queries)] for i in range(requests)]
+    start = time.perf_counter()
+    # The tools log every step; keep the report readable unless asked not to
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    with output, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(timed, batch))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for latency, _ in outcomes]
+    return {
+        "requests": requests,
+        "errors": sum(1 for _, ok in outcomes if not ok),
+        "seconds": elapsed,
+        "throughput": requests / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "max": max(latencies, default=0.0),
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure tool throughput and latency, offline by default.")
+    parser.add_argument("--tools", default="datasets,theme,authors",
+                        help="Comma separated tools: datasets, theme, authors, summarize, citations")
+    parser.add_argument("--queries", help="File with one query per line (default: built-in samples)")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per tool")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at once")
+    parser.add_argument("--backend", default="stub", choices=["stub", "replay", "openai", "record"],
+                        help="LLM backend")
+    parser.add_argument("--latency", type=float, help="Simulated seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, help="Simulated generation speed")
+    parser.add_argument("--cache", action="store_true", help="Keep the LLM completion cache enabled")
+    parser.add_argument("--verbose", action="store_true", help="Show the tools' own output")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    # The backend and cache read these when the client is built
+    if args.latency is not None:
+        os.environ["LLM_LATENCY"] = str(args.latency)
+    if args.tokens_per_second is not None:
+        os.environ["LLM_TOKENS_PER_SECOND"] = str(args.tokens_per_second)
+    if not args.cache:
+        os.environ["LLM_CACHE_SIZE"] = "0"
+
+    from neo4j_connection import SharedNeo4jConnection
+    from llm_client import initialize_llm
+
+    queries = SAMPLE_QUERIES
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    tools = tool_functions()
+    names = [name.strip() for name in args.tools.split(",") if name.strip()]
+    for name in names:
+        if name not in tools:
+            raise SystemExit(f"Unknown tool: {name}")
+
+    openai = initialize_llm(args.backend)
+    with SharedNeo4jConnection(os.getenv("NEO4J_URI"), os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD"),
+                               max_pool_size=max(args.concurrency * 2, 10)) as conn:
+        print(f"Backend {args.backend}, {args.requests} requests per tool, concurrency {args.concurrency}")
+        print(f"{'tool':<10} {'req/s':>8} {'p50 s':>8} {'p95 s':>8} {'max s':>8} {'errors':>7}")
+        for name in names:
+            stats = run_benchmark(conn, openai, tools[name], queries, args.requests, args.concurrency,
+                                  verbose=args.verbose)
+            print(f"{name:<10} {stats['throughput']:>8.2f} {stats['p50']:>8.3f} {stats['p95']:>8.3f} "
+                  f"{stats['max']:>8.3f} {stats['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with a time-to-live and an optional SQLite tier.
+
+    Entries live in memory up to maxsize, evicting the least recently used.
+    When path is given, every entry is also written to a SQLite table so the
+    cache survives restarts; memory misses fall through to it. The table is
+    trimmed to the disk_maxsize most recent entries. Values must be JSON
+    serializable.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, path=None, table="cache", disk_maxsize=None):
+        self.maxsize = maxsize
+        self.disk_maxsize = disk_maxsize
+        self.ttl = ttl
+        self.table = table
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(f"CREATE TABLE IF NOT EXISTS {table} "
+                             "(key TEXT PRIMARY KEY, value TEXT, created_at REAL)")
+            self._db.commit()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._db is not None:
+                entry = self._load(key)
+                if entry is not None:
+                    self._store(key, entry)
+            if entry is not None and self._expired(entry):
+                self._delete(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            entry = (value, time.time())
+            self._store(key, entry)
+            if self._db is not None:
+                self._db.execute(f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?)",
+                                 (key, json.dumps(value), entry[1]))
+                if self.disk_maxsize is not None:
+                    self._db.execute(f"DELETE FROM {self.table} WHERE key IN "
+                                     f"(SELECT key FROM {self.table} ORDER BY created_at DESC "
+                                     "LIMIT -1 OFFSET ?)", (self.disk_maxsize,))
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute(f"DELETE FROM {self.table}")
+                self._db.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._entries),
+        }
+
+    def _expired(self, entry):
+        return self.ttl is not None and time.time() - entry[1] > self.ttl
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _load(self, key):
+        row = self._db.execute(f"SELECT value, created_at FROM {self.table} WHERE key = ?",
+                               (key,)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def _delete(self, key):
+        self._entries.pop(key, None)
+        if self._db is not None:
+            self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._db.commit()
@@ -0,0 +1,112 @@
+import json
+import os
+from doc_packing import count_tokens, truncate_tokens
+
+# Token cap for the retrieved results in a recommendation prompt
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+
+# Long text columns are truncated to this many tokens each
+LONG_FIELD_TOKENS = int(os.getenv("LONG_FIELD_TOKENS", "120"))
+LONG_FIELDS = {"Abstract", "Conclusion"}
+
+# Columns that identify the paper of a row, in order of preference
+PAPER_KEYS = ["Id", "Paper", "Title", "PaperTitle"]
+
+# Ranking columns that mean nothing to the model
+HIDDEN_FIELDS = {"Id", "Score", "Relevance"}
+
+
+def pack_results(results, max_tokens=CONTEXT_TOKEN_BUDGET, long_field_tokens=LONG_FIELD_TOKENS):
+    """
+    Serialize retrieved rows compactly for a prompt.
+
+    Rows of the same paper (e.g. one per dataset or author) are merged into
+    one line whose differing columns become lists, column names are written
+    once as a header, abstracts and conclusions are truncated, and papers are
+    added in order until the token budget is reached.
+
+    Args:
+        results (list): Records or dicts, best first
+        max_tokens (int): Token cap for the packed text
+        long_field_tokens (int): Token cap for each abstract or conclusion
+
+    Returns:
+        str: Pipe separated table with a header line
+    """
+    rows = [row.data() if hasattr(row, "data") else dict(row) for row in results]
+    if not rows:
+        return "No results found."
+
+    papers = merge_rows(rows)
+    columns = [column for column in dict.fromkeys(key for row in rows for key in row)
+               if column not in HIDDEN_FIELDS]
+
+    header = " | ".join(columns)
+    lines = [header]
+    used = count_tokens(header)
+    for i, paper in enumerate(papers):
+        line = " | ".join(_format(column, paper.get(column), long_field_tokens) for column in columns)
+        cost = count_tokens(line) + 1
+        if used + cost > max_tokens and len(lines) > 1:
+            lines.append(f"({len(papers) - i} more results omitted)")
+            break
+        lines.append(line)
+        used += cost
+    return "\n".join(lines)
+
+
+def merge_rows(rows):
+    """
+    Merge rows that belong to the same paper, keeping first-seen order.
+    Columns whose values differ between the rows become de-duplicated lists.
+    """
+    key_column = next((key for key in PAPER_KEYS if any(row.get(key) is not None for row in rows)), None)
+    groups = {}
+    for i, row in enumerate(rows):
+        key = row.get(key_column) if key_column else None
+        groups.setdefault(key if key is not None else ("row", i), []).append(row)
+
+    merged = []
+    for group in groups.values():
+        paper = {}
+        for column in dict.fromkeys(key for row in group for key in row):
+            values = [row.get(column) for row in group]
+            if all(_hashable(value) == _hashable(values[0]) for value in values):
+                paper[column] = values[0]
+            else:
+                flat = []
+                for value in values:
+                    flat.extend(value if isinstance(value, list) else [value])
+                paper[column] = [value for value in _unique(flat) if value not in (None, "")]
+        merged.append(paper)
+    return merged
+
+
+def _format(column, value, long_field_tokens):
+    if value is None:
+        text = ""
+    elif isinstance(value, list):
+        text = "; ".join(_format(column, item, long_field_tokens) for item in value)
+    elif isinstance(value, dict) or hasattr(value, "items"):
+        text = json.dumps(dict(value), separators=(",", ":"), default=str)
+    else:
+        text = str(value)
+    text = " ".join(text.replace("|", "/").split())
+    if column in LONG_FIELDS and not isinstance(value, list):
+        truncated = truncate_tokens(text, long_field_tokens)
+        if truncated != text:
+            text = truncated.rstrip() + "..."
+    return text
+
+
+def _hashable(value):
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def _unique(values):
+    seen = set()
+    for value in values:
+        key = _hashable(value)
+        if key not in seen:
+            seen.add(key)
+            yield value
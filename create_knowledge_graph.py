@@ -1,17 +1,33 @@
 from neo4j import GraphDatabase
-import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from dotenv import load_dotenv
 import os
-from create_paper_node import create_paper
+import time
+from create_paper_node import (LINKS, create_paper, create_papers_batch,
+                               create_dimension_nodes, delta_papers_batch, paper_links,
+                               backfill_dates)
+from paper_loader import iter_papers, batched
+from schema_cache import schema_cache, bump_schema_version
+from query_templates import FULLTEXT_INDEX
+from summary_store import SUMMARY_CONSTRAINT_QUERIES
+from vocab_expansion import QUERY_EXPANSION, rebuild_expansion_index
 
-# Neo4j connection details
-load_dotenv()
-URI = os.getenv("NEO4J_URI")
-USERNAME = os.getenv("NEO4J_USER")
-PASSWORD = os.getenv("NEO4J_PASSWORD")
+def connect():
+    # Neo4j connection details
+    load_dotenv()
+    uri = os.getenv("NEO4J_URI")
+    username = os.getenv("NEO4J_USER")
+    password = os.getenv("NEO4J_PASSWORD")
+    # Seconds the driver keeps retrying a write transaction after transient
+    # errors. Parallel loads depend on it: a batch locks its own papers and
+    # then, through CITES links, papers other batches are writing, so
+    # concurrent batches can deadlock and one of them has to be retried
+    max_retry_time = float(os.getenv("NEO4J_MAX_RETRY_TIME", "60"))
 
-# Connect to Neo4j
-driver = GraphDatabase.driver(URI, auth=(USERNAME, PASSWORD))
+    # Connect to Neo4j
+    return GraphDatabase.driver(uri, auth=(username, password),
+                                max_transaction_retry_time=max_retry_time)
 
 def create_constraints(session):
     session.run("CREATE CONSTRAINT IF NOT EXISTS FOR (a:Author) REQUIRE a.name IS UNIQUE")
@@ -21,31 +37,220 @@ def create_constraints(session):
     session.run("CREATE CONSTRAINT IF NOT EXISTS FOR (do:Domain) REQUIRE do.name IS UNIQUE")
     session.run("CREATE CONSTRAINT IF NOT EXISTS FOR (k:Keyword) REQUIRE k.name IS UNIQUE")
     session.run("CREATE CONSTRAINT IF NOT EXISTS FOR (r:GitHubRepo) REQUIRE r.link IS UNIQUE")
+    for query in SUMMARY_CONSTRAINT_QUERIES:
+        session.run(query)
 
-def insert_data(papers):
+def create_indexes(session):
+    session.run(f"CREATE FULLTEXT INDEX {FULLTEXT_INDEX} IF NOT EXISTS "
+                "FOR (p:Paper) ON EACH [p.title, p.abstract, p.conclusion]")
+    session.run("CREATE INDEX paper_date_published IF NOT EXISTS FOR (p:Paper) ON (p.date_published)")
+    session.run("CREATE INDEX paper_year IF NOT EXISTS FOR (p:Paper) ON (p.year)")
+    session.run("CREATE INDEX paper_number_of_citations IF NOT EXISTS FOR (p:Paper) ON (p.number_of_citations)")
+
+def insert_data(driver, papers, batch_size=500, offset=0, delta=False):
+    """
+    Bulk-load papers, writing each batch of batch_size papers in one transaction.
+
+    Papers can be any iterable, so a streamed file is written as it is read.
+    offset is only used to report resumable positions in the input.
+    With delta=True, papers whose content hash is unchanged are skipped and
+    changed papers only have their differences written.
+
+    Returns:
+        tuple: (number of papers processed, dict of new, changed and
+            unchanged counts for a delta load, or None)
+    """
     with driver.session() as session:
         # Create constraints
         create_constraints(session)
+        create_indexes(session)
 
         # Insert papers
-        for paper in papers:
-            session.execute_write(create_paper, paper)
+        start = time.perf_counter()
+        total = 0
+        stats = {"new": 0, "changed": 0, "unchanged": 0}
+        for batch in batched(papers, batch_size):
+            if delta:
+                _add_stats(stats, session.execute_write(delta_papers_batch, batch))
+            else:
+                session.execute_write(create_papers_batch, batch)
+            total += len(batch)
+            elapsed = time.perf_counter() - start
+            print(f"Inserted {total} papers ({total / elapsed:.1f} papers/sec), resume offset {offset + total}")
+    if delta:
+        print(f"Delta ingest: {stats['new']} new, {stats['changed']} changed, {stats['unchanged']} unchanged")
+    return total, stats if delta else None
 
-def insert_single_paper(paper):
+def _add_stats(stats, batch_stats):
+    for key, value in batch_stats.items():
+        stats[key] += value
+
+def insert_single_paper(driver, paper):
     with driver.session() as session:
         session.execute_write(create_paper, paper)
 
-# Read raw data
-raw_data = open('raw_data.json',)
-papers = json.load(raw_data)
+def insert_dimensions(driver, papers, batch_size=500):
+    """
+    Pre-create the shared nodes (authors, datasets, domains, keywords,
+    conferences, repos and cited papers) in one deduplicated pass, so the
+    parallel paper writers only have to MATCH them.
+    """
+    dimensions = {field: {} for field in LINKS}
+    for paper in papers:
+        for field in LINKS:
+            for link in paper_links(paper, field):
+                dimensions[field].setdefault(link['key'], link)
+
+    with driver.session() as session:
+        for field, rows in dimensions.items():
+            rows = sorted(rows.values(), key=lambda row: row['key'])
+            for batch in batched(rows, batch_size):
+                session.execute_write(create_dimension_nodes, field, batch)
+            print(f"Created {len(rows)} {LINKS[field][0]} nodes for {field}")
+
+def insert_data_parallel(driver, path, batch_size=500, offset=0, workers=4, delta=False):
+    """
+    Load papers from path with a pool of worker sessions.
+
+    For a full load the shared nodes are created first in a single pass, so
+    the writers only MATCH them; the paper and relationship batches are then
+    written concurrently, with at most two batches per worker in flight.
+    A delta load skips that pass, which would read and MERGE every shared
+    node of the file, and lets the writers MERGE the targets of the few new
+    and changed papers instead.
+
+    The batches are not deadlock-free: CITES links lock papers that other
+    batches may be writing. They rely on the driver retrying deadlocked
+    transactions for up to max_transaction_retry_time (see connect).
+
+    Returns the same (total, stats) pair as insert_data.
+    """
+    with driver.session() as session:
+        create_constraints(session)
+        create_indexes(session)
+
+    if not delta:
+        insert_dimensions(driver, iter_papers(path, offset=offset), batch_size)
+
+    start = time.perf_counter()
+    total = 0
+    stats = {"new": 0, "changed": 0, "unchanged": 0}
+
+    def collect(futures):
+        nonlocal total
+        for future in futures:
+            count, batch_stats = future.result()
+            total += count
+            if batch_stats:
+                _add_stats(stats, batch_stats)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for batch in batched(iter_papers(path, offset=offset), batch_size):
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending.add(executor.submit(_write_batch, driver, batch, delta))
+        collect(pending)
+
+    elapsed = time.perf_counter() - start
+    print(f"Processed {total} papers with {workers} workers ({total / elapsed:.1f} papers/sec)")
+    if delta:
+        print(f"Delta ingest: {stats['new']} new, {stats['changed']} changed, {stats['unchanged']} unchanged")
+    return total, stats if delta else None
+
+def _write_batch(driver, batch, delta=False):
+    work = delta_papers_batch if delta else create_papers_batch
+    # execute_write retries transient errors until max_transaction_retry_time;
+    # delta loads have no dimension pre-pass, so they MERGE the link targets
+    with driver.session() as session:
+        batch_stats = session.execute_write(work, batch, merge_targets=delta)
+    # create_papers_batch returns nothing; delta_papers_batch its new/changed/unchanged counts
+    return len(batch), batch_stats
+
+def backfill_paper_dates(driver, batch_size=500):
+    """
+    Convert the string date_published of papers loaded before dates were
+    parsed into native Neo4j dates with a year property.
+    """
+    with driver.session() as session:
+        create_indexes(session)
+        total = 0
+        while True:
+            converted = session.execute_write(backfill_dates, batch_size)
+            if not converted:
+                break
+            total += converted
+            print(f"Converted dates of {total} papers")
+    return total
+
+def invalidate_schema(driver):
+    """
+    Drop this process's cached schema and bump the graph's schema version, so
+    running servers fetch the new schema on their next version check.
+    """
+    schema_cache.invalidate()
+    with driver.session() as session:
+        bump_schema_version(session)
 
-# Insert the data
-insert_data(papers)
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load papers into the Neo4j knowledge graph.")
+    parser.add_argument("input", nargs="?", default="raw_data.json",
+                        help="JSON array or JSON Lines file of papers")
+    parser.add_argument("--batch-size", type=int, default=500,
+                        help="Number of papers written per transaction")
+    parser.add_argument("--offset", type=int, default=0,
+                        help="Number of papers to skip, to resume an interrupted load")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of parallel writer sessions")
+    parser.add_argument("--delta", action="store_true",
+                        help="Skip unchanged papers and only write what changed")
+    parser.add_argument("--backfill-dates", action="store_true",
+                        help="Convert string dates of existing papers instead of loading input")
+    parser.add_argument("--rebuild-vocab", action="store_true",
+                        help="Rebuild the query expansion index after loading "
+                             "(always done when QUERY_EXPANSION is local)")
+    parser.add_argument("--embed", action="store_true",
+                        help="Embed new and changed papers into the vector index after loading")
+    parser.add_argument("--embedding-backend", choices=["local", "openai"],
+                        help="Model used by --embed (default: EMBEDDING_BACKEND)")
+    args = parser.parse_args()
+    if args.embed and not (args.embedding_backend or os.getenv("EMBEDDING_BACKEND")):
+        parser.error("--embed needs --embedding-backend or EMBEDDING_BACKEND")
+    return args
 
-# insert single paper
-# insert_single_paper(papers[0])
+def main():
+    args = parse_args()
+    driver = connect()
+    try:
+        if args.backfill_dates:
+            total = backfill_paper_dates(driver, batch_size=args.batch_size)
+            # date_published changed from string to Date
+            invalidate_schema(driver)
+            print(f"Dates backfilled successfully! ({total} papers)")
+            return
+        if args.workers > 1:
+            total, stats = insert_data_parallel(driver, args.input, batch_size=args.batch_size,
+                                         offset=args.offset, workers=args.workers, delta=args.delta)
+        else:
+            papers = iter_papers(args.input, offset=args.offset)
+            total, stats = insert_data(driver, papers, batch_size=args.batch_size, offset=args.offset,
+                                delta=args.delta)
+        invalidate_schema(driver)
+        print(f"Data inserted successfully! ({total} papers)")
+        # A delta load that wrote nothing leaves the vocabulary as it was
+        vocabulary_changed = stats is None or stats["new"] + stats["changed"] > 0
+        if (args.rebuild_vocab or QUERY_EXPANSION == "local") and vocabulary_changed:
+            rebuild_expansion_index(driver)
+        if args.embed:
+            # Imported here so loading does not need the embedding dependencies
+            from paper_embeddings import EMBEDDING_BACKEND, embed_papers, get_embedder
 
-print("Data inserted successfully!")
+            embedded = embed_papers(driver, get_embedder(backend=args.embedding_backend or EMBEDDING_BACKEND))
+            print(f"Embeddings updated successfully! ({embedded} papers)")
+    finally:
+        # Close the driver
+        driver.close()
 
-# Close the driver
-driver.close()
+if __name__ == "__main__":
+    main()
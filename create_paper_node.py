@@ -1,12 +1,21 @@
+import hashlib
+import json
+from date_utils import parse_date
+
+
 def create_paper(tx, paper_data):
+    published = parse_date(paper_data['date_published'])
     query = """
     MERGE (p:Paper {id: $paper_id})
     SET p.title = $title,
         p.date_published = $date_published,
+        p.date_published_text = $date_published_text,
+        p.year = $year,
         p.abstract = $abstract,
         p.conclusion = $conclusion,
         p.number_of_citations = $number_of_citations,
-        p.url = $url
+        p.url = $url,
+        p.content_hash = $content_hash
     WITH p
     FOREACH (author_name IN CASE WHEN $authors IS NOT NULL THEN $authors ELSE [] END |
         MERGE (a:Author {name: author_name})
@@ -47,11 +56,14 @@ def create_paper(tx, paper_data):
     tx.run(query,
            paper_id=paper_data['id'],
            title=paper_data['title'],
-           date_published=paper_data['date_published'],
+           date_published=published,
+           date_published_text=paper_data['date_published'],
+           year=published.year if published else None,
            abstract=paper_data['abstract'],
            conclusion=paper_data.get('conclusion', ''),
            number_of_citations=paper_data['number_of_citations'],
            url=paper_data['url'],
+           content_hash=paper_hash(paper_data),
            authors=paper_data['authors'],
            datasets=paper_data['datasets'],
            domains=paper_data['domains'],
@@ -59,3 +71,265 @@ def create_paper(tx, paper_data):
            conference=paper_data['conference'],
            github_repo=paper_data.get('github_repo', None),
            citations=paper_data.get('citations', []))
+
+
+# Relationship layout of a paper record: field -> (label, key property, relationship type, paper is the start node)
+LINKS = {
+    "authors": ("Author", "name", "AUTHORED", False),
+    "datasets": ("Dataset", "name", "USES_DATASET", True),
+    "domains": ("Domain", "name", "HAS_DOMAIN", True),
+    "keywords": ("Keyword", "name", "HAS_KEYWORD", True),
+    "conference": ("Conference", "name", "PRESENTED_AT", True),
+    "github_repo": ("GitHubRepo", "link", "HAS_GITHUB_REPO", True),
+    "citations": ("Paper", "id", "CITES", True),
+}
+
+
+def paper_hash(paper_data):
+    """
+    Return a stable SHA-256 of the source record, used to skip unchanged papers.
+    """
+    canonical = json.dumps(paper_data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# Properties paper_properties sets; the delta load reads back only these
+PAPER_PROPERTIES = ("title", "date_published", "date_published_text", "year", "abstract",
+                    "conclusion", "number_of_citations", "url", "content_hash")
+
+
+def paper_properties(paper_data):
+    published = parse_date(paper_data['date_published'])
+    return {
+        "title": paper_data['title'],
+        "date_published": published,
+        "date_published_text": paper_data['date_published'],
+        "year": published.year if published else None,
+        "abstract": paper_data['abstract'],
+        "conclusion": paper_data.get('conclusion', ''),
+        "number_of_citations": paper_data['number_of_citations'],
+        "url": paper_data['url'],
+        "content_hash": paper_hash(paper_data),
+    }
+
+
+def paper_links(paper_data, field):
+    """
+    Return the link rows of one relationship type for a paper.
+
+    Each row is a dict with the target node key; citation rows also carry the
+    title and url used when the cited paper does not exist yet.
+    """
+    value = paper_data.get(field)
+    if value is None:
+        return []
+    if field == "citations":
+        return [{"key": c['id'], "title": c.get('title'), "url": c.get('url')} for c in value]
+    if not isinstance(value, list):
+        value = [value]
+    return [{"key": v} for v in value if v is not None]
+
+
+def create_papers_batch(tx, papers, merge_targets=True):
+    """
+    Write a batch of papers with one UNWIND statement per entity type.
+
+    Equivalent to calling create_paper for every paper, but costs a fixed
+    number of round trips per batch instead of one transaction per paper.
+    Link rows are sorted by target, which makes deadlocks between concurrent
+    batches less likely but does not rule them out: a CITES link also locks
+    the cited paper, which another batch may be writing. Concurrent callers
+    rely on the driver retrying the transaction.
+    """
+    rows = [{"id": p['id'], "props": paper_properties(p)} for p in papers]
+    tx.run("""
+    UNWIND $rows AS row
+    MERGE (p:Paper {id: row.id})
+    SET p += row.props
+    """, rows=rows)
+
+    for field in LINKS:
+        link_rows = [dict(link, paper_id=p['id']) for p in papers for link in paper_links(p, field)]
+        if link_rows:
+            link_rows.sort(key=lambda row: (row['key'], row['paper_id']))
+            create_links(tx, field, link_rows, merge_targets=merge_targets)
+
+
+def create_dimension_nodes(tx, field, rows):
+    """
+    MERGE the shared target nodes of one relationship type from rows of {"key"}.
+    """
+    label, key, _, _ = LINKS[field]
+    on_create = ""
+    if field == "citations":
+        on_create = "ON CREATE SET t.title = row.title, t.url = row.url"
+    query = f"""
+    UNWIND $rows AS row
+    MERGE (t:{label} {{{key}: row.key}})
+    {on_create}
+    """
+    tx.run(query, rows=rows)
+
+
+def create_links(tx, field, rows, merge_targets=True):
+    """
+    Create relationships of one type from rows of {"paper_id", "key"}.
+
+    With merge_targets=False the target nodes must already exist and are only
+    matched, which avoids taking write locks on shared nodes.
+    """
+    label, key, rel_type, outgoing = LINKS[field]
+    target = "MERGE" if merge_targets else "MATCH"
+    on_create = ""
+    if field == "citations" and merge_targets:
+        on_create = "ON CREATE SET t.title = row.title, t.url = row.url"
+    pattern = f"(p)-[:{rel_type}]->(t)" if outgoing else f"(t)-[:{rel_type}]->(p)"
+    query = f"""
+    UNWIND $rows AS row
+    MATCH (p:Paper {{id: row.paper_id}})
+    {target} (t:{label} {{{key}: row.key}})
+    {on_create}
+    MERGE {pattern}
+    """
+    tx.run(query, rows=rows)
+
+
+def delete_links(tx, field, rows):
+    """
+    Delete relationships of one type from rows of {"paper_id", "key"}.
+    """
+    label, key, rel_type, outgoing = LINKS[field]
+    pattern = f"(p)-[r:{rel_type}]->(t)" if outgoing else f"(t)-[r:{rel_type}]->(p)"
+    query = f"""
+    UNWIND $rows AS row
+    MATCH (p:Paper {{id: row.paper_id}})
+    MATCH {pattern}
+    WHERE t.{key} = row.key
+    DELETE r
+    """
+    tx.run(query, rows=rows)
+
+
+def fetch_paper_state(tx, papers):
+    """
+    Return the stored content hash of each paper id, plus the stored
+    PAPER_PROPERTIES and link keys of the papers whose hash differs.
+
+    Only the properties the load compares are read, so large derived ones
+    such as embeddings are not sent back for every changed paper.
+    """
+    link_columns = []
+    for field, (label, key, rel_type, outgoing) in LINKS.items():
+        pattern = f"(p)-[:{rel_type}]->(t:{label})" if outgoing else f"(t:{label})-[:{rel_type}]->(p)"
+        link_columns.append(f"{field}: [{pattern} | t.{key}]")
+    links = ", ".join(link_columns)
+    props = ", ".join(f".{name}" for name in PAPER_PROPERTIES)
+    query = f"""
+    UNWIND $rows AS row
+    MATCH (p:Paper {{id: row.id}})
+    RETURN p.id AS id, p.content_hash AS content_hash,
+           CASE WHEN p.content_hash = row.content_hash THEN null
+                ELSE p {{{props}}} END AS props,
+           CASE WHEN p.content_hash = row.content_hash THEN null
+                ELSE {{{links}}} END AS links
+    """
+    rows = [{"id": p['id'], "content_hash": paper_hash(p)} for p in papers]
+    return {record["id"]: record.data() for record in tx.run(query, rows=rows)}
+
+
+def delta_papers_batch(tx, papers, merge_targets=True):
+    """
+    Write only what changed in a batch of papers.
+
+    Papers whose content hash matches the stored one are skipped. Papers that
+    are new, or only exist as citation stubs, are written in full. For
+    changed papers only the differing properties are set, and relationships
+    are added or removed to match the source record.
+
+    Returns:
+        dict: Number of new, changed and unchanged papers
+    """
+    state = fetch_paper_state(tx, papers)
+    new_papers = []
+    prop_rows = []
+    added = {field: [] for field in LINKS}
+    removed = {field: [] for field in LINKS}
+    unchanged = 0
+
+    for paper in papers:
+        stored = state.get(paper['id'])
+        if stored is None or stored['content_hash'] is None:
+            new_papers.append(paper)
+            continue
+        if stored['props'] is None:
+            unchanged += 1
+            continue
+
+        props = {name: value for name, value in paper_properties(paper).items()
+                 if _native(stored['props'].get(name)) != value}
+        prop_rows.append({"id": paper['id'], "props": props})
+
+        for field in LINKS:
+            new_links = {link['key']: link for link in paper_links(paper, field)}
+            old_keys = set(stored['links'][field])
+            added[field] += [dict(link, paper_id=paper['id'])
+                             for key, link in new_links.items() if key not in old_keys]
+            removed[field] += [{"paper_id": paper['id'], "key": key}
+                               for key in old_keys if key not in new_links]
+
+    if new_papers:
+        create_papers_batch(tx, new_papers, merge_targets=merge_targets)
+    if prop_rows:
+        tx.run("""
+        UNWIND $rows AS row
+        MATCH (p:Paper {id: row.id})
+        SET p += row.props
+        """, rows=prop_rows)
+    for field in LINKS:
+        if removed[field]:
+            delete_links(tx, field, sorted(removed[field], key=lambda row: (row['key'], row['paper_id'])))
+        if added[field]:
+            create_links(tx, field, sorted(added[field], key=lambda row: (row['key'], row['paper_id'])),
+                         merge_targets=merge_targets)
+
+    return {"new": len(new_papers), "changed": len(prop_rows), "unchanged": unchanged}
+
+
+def _native(value):
+    # Neo4j temporal values compare equal to their datetime counterparts only after conversion
+    return value.to_native() if hasattr(value, "to_native") else value
+
+
+def backfill_dates(tx, batch_size):
+    """
+    Convert one batch of string date_published values to native dates.
+
+    The original string is kept in date_published_text, which also marks the
+    paper as done, so unparsable dates are not picked up again.
+
+    Returns:
+        int: Number of papers converted in this batch
+    """
+    result = tx.run("""
+    MATCH (p:Paper)
+    WHERE p.date_published IS NOT NULL AND p.date_published_text IS NULL
+    RETURN p.id AS id, p.date_published AS date_published
+    LIMIT $batch_size
+    """, batch_size=batch_size)
+    rows = []
+    for record in result:
+        published = parse_date(record["date_published"])
+        rows.append({
+            "id": record["id"],
+            "date_published": published,
+            "date_published_text": str(record["date_published"]),
+            "year": published.year if published else None,
+        })
+    tx.run("""
+    UNWIND $rows AS row
+    MATCH (p:Paper {id: row.id})
+    SET p.date_published = row.date_published,
+        p.date_published_text = row.date_published_text,
+        p.year = row.year
+    """, rows=rows)
+    return len(rows)
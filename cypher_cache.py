@@ -0,0 +1,58 @@
+import hashlib
+import json
+import os
+from dotenv import load_dotenv
+from cache import LRUCache
+
+load_dotenv()
+
+# Bump whenever a Cypher generation prompt changes, so queries generated by
+# the old prompt are not served from the cache
+CYPHER_PROMPT_VERSION = "2"
+
+_ttl = os.getenv("CYPHER_CACHE_TTL")
+cypher_cache = LRUCache(maxsize=int(os.getenv("CYPHER_CACHE_SIZE", "512")),
+                        ttl=float(_ttl) if _ttl else 86400,
+                        path=os.getenv("CYPHER_CACHE_PATH"),
+                        table="cypher_cache")
+
+
+def cypher_cache_key(tool, query_info):
+    """
+    Hash the extracted fields of query_info into a cache key for tool.
+
+    The raw query text is left out and list values are lower-cased, deduplicated
+    and sorted, so questions that extract to the same fields share an entry.
+    When no field was extracted the normalized query text is used instead, so
+    unrelated questions do not all map to the same empty key.
+    """
+    normalized = {}
+    for key, value in query_info.items():
+        if key == "content" or value in (None, [], {}, ""):
+            continue
+        if isinstance(value, list):
+            value = sorted({v.strip().lower() if isinstance(v, str) else json.dumps(v, sort_keys=True)
+                            for v in value})
+        elif isinstance(value, str):
+            value = value.strip().lower()
+        normalized[key] = value
+    if not normalized:
+        normalized["content"] = " ".join(str(query_info.get("content") or "").lower().split())
+    canonical = json.dumps(normalized, sort_keys=True, separators=(",", ":"), default=str)
+    return f"{tool}:v{CYPHER_PROMPT_VERSION}:{hashlib.sha256(canonical.encode('utf-8')).hexdigest()}"
+
+
+def cached_cypher_query(tool, query_info, generate):
+    """
+    Return the cached Cypher for this query_info shape, calling generate()
+    to ask the LLM for it on a miss.
+    """
+    key = cypher_cache_key(tool, query_info)
+    query = cypher_cache.get(key)
+    if query is None:
+        query = generate()
+        if query:
+            cypher_cache.set(key, query)
+    else:
+        print(f"Using cached Cypher query ({cypher_cache.stats()['hit_rate']:.0%} hit rate)")
+    return query
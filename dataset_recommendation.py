@@ -3,20 +3,36 @@ import json
 from dotenv import load_dotenv
 import os
 from utility import *
+from query_templates import template_query, query_parameters
+from cypher_cache import cached_cypher_query
+from retrieval import rank_results, warm_query_embedding
+from pipeline import Pipeline
+from context_packing import pack_results
 load_dotenv()
 
-def get_dataset_recommendations(conn,openai,user_query):
+def get_dataset_recommendations(conn,openai,user_query, on_token=None):
     """
     Returns a string containing dataset recommendations based on a given query.
     """
     try:
-        query_info = extract_query_information(user_query,openai)
+        # The query embedding is computed while the query is extracted and the
+        # candidates retrieved, and is handed to ranking with them
+        pipeline = Pipeline("dataset")
+        pipeline.add("query_info", lambda: extract_query_information(user_query, openai))
+        pipeline.add("embedding", lambda: warm_query_embedding(user_query, openai, conn=conn))
+        pipeline.add("candidates", lambda query_info: retrieve_candidates(conn, openai, query_info),
+                     deps=["query_info"])
+        pipeline.add("results", lambda query_info, candidates, embedding: rank_results(
+            conn, query_info, candidates, openai, query_text=user_query, query_embedding=embedding),
+                     deps=["query_info", "candidates", "embedding"])
+        pipeline.add("recommendations", lambda query_info, results: generate_recommendations(
+            user_query, openai, query_info, results, on_token), deps=["query_info", "results"])
+        stages = pipeline.run()
+        query_info, results = stages["query_info"], stages["results"]
+        recommendations = stages["recommendations"]
         print(f"\nExtracted query information: {json.dumps(query_info, indent=2)}")
-
-        results = get_datasets_and_papers(conn,openai, query_info)
         print(f"\nRetrieved results:", results)
 
-        recommendations = generate_recommendations(user_query, openai,query_info, results)
         print("\nRecommendations:")
         print(recommendations)
         return recommendations
@@ -26,10 +42,7 @@ def get_dataset_recommendations(conn,openai,user_query):
 
 
 def dynamic_cypher_query(query_info, openai, schema):
-    if not schema:
-        schema_str = "Schema information not available."
-    else:
-        schema_str = json.dumps(schema, indent=2)
+    schema_str = format_schema(schema)
 
     json_dict = json.dumps(query_info, indent=2)
     content = query_info.get("content", "")
@@ -54,9 +67,13 @@ def dynamic_cypher_query(query_info, openai, schema):
 
     Important guidelines:
     - Use OPTIONAL MATCH for relationships that might not exist for all papers
+    - Also return p.id AS Id, and score AS Score when using the full-text index
     - Use separate WHERE clauses for each MATCH to improve readability
     - Use coalesce() for optional filters to avoid errors when the field is not provided
-    - For keyword matching, use: ANY(keyword IN json_dict["keywords"] WHERE p.title CONTAINS keyword OR p.abstract CONTAINS keyword)
+    - For keyword matching, use the full-text index: CALL db.index.fulltext.queryNodes('paper_text', $search) YIELD node AS p, score
+      ($search holds the keywords as a Lucene query; it is null when there are no keywords)
+    - If $date_range_text is not null, the date range could not be parsed and $date_range_start and $date_range_end are null;
+      filter p.date_published on that text with date() and duration() bounds, e.g. "last year" as p.date_published >= date() - duration('P1Y')
     - Ensure the query is efficient and uses appropriate indexes if possible
     - Use the exact node labels, relationship types, and property names as provided in the database schema
     - If the schema information is not available, use general node labels like Dataset, Paper, Keyword, etc.
@@ -92,21 +109,16 @@ def dynamic_cypher_query(query_info, openai, schema):
     Do not include the 'CYPHER' keyword in the query and dont generate ```.
     """
 
-    response = openai.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}]
-    )
-
-    return response.choices[0].message.content.strip()
+    return openai.complete(prompt).strip()
 
 
-def generate_recommendations(user_query, openai, query_info, results):
+def generate_recommendations(user_query, openai, query_info, results, on_token=None):
     prompt = f"""
     User Query: "{user_query}"
 
     Based on the query and extracted information, here are the relevant datasets and papers found:
 
-    {json.dumps(results, indent=2)}
+    {pack_results(results)}
 
     Please provide:
     1. A summary of the most relevant datasets and why they are suitable for the given topics or research areas.
@@ -117,41 +129,22 @@ def generate_recommendations(user_query, openai, query_info, results):
     Respond in a concise, well-structured format, focusing on providing useful recommendations for dataset usage in research.
     """
 
-    response = openai.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}]
-    )
-
-    return response.choices[0].message.content
-
-
-def get_datasets_and_papers(conn, openai, query_info):
-    schema = get_database_structure(conn)
-    query = dynamic_cypher_query(query_info,openai,schema)
-    print(f"Generated Cypher query:\n{query}")
-
-    # Prepare parameters with default values
-    parameters = {
-        "papers": query_info.get("papers", []),
-        "keywords": query_info.get("keywords", []),
-        "authors": query_info.get("authors", []),
-        "conferences": query_info.get("conferences", []),
-        "domains": query_info.get("domains", []),
-        "date_range_start": None,
-        "date_range_end": None,
-        "min_citations": query_info.get("min_citations")
-    }
-
-    # Safely get date range values
-    date_range = query_info.get("date_range", {})
-    if isinstance(date_range, dict):
-        parameters["date_range_start"] = date_range.get("start")
-        parameters["date_range_end"] = date_range.get("end")
-
-    # Convert None to empty lists for list parameters
-    for key in ["keywords", "authors", "conferences", "domains"]:
-        if parameters[key] is None:
-            parameters[key] = []
+    return openai.complete(prompt, on_token=on_token)
+
+
+def get_datasets_and_papers(conn, openai, query_info, query_text=None, query_embedding=None):
+    results = retrieve_candidates(conn, openai, query_info)
+    return rank_results(conn, query_info, results, openai, query_text=query_text, query_embedding=query_embedding)
+
+
+def retrieve_candidates(conn, openai, query_info):
+    query = template_query("dataset", query_info)
+    if query is None:
+        query = cached_cypher_query("dataset", query_info, lambda: dynamic_cypher_query(
+            query_info, openai, get_database_structure(conn)))
+        print(f"Generated Cypher query:\n{query}")
+
+    parameters = query_parameters(query_info)
 
     results = conn.query(query, parameters=parameters)
     print(f"Retrieved {len(results)} results")
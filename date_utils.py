@@ -0,0 +1,55 @@
+import calendar
+import re
+from datetime import date, datetime
+
+# Formats seen in the source data ("25 Oct 2022", "April 2024", "2024") and
+# in extracted date ranges, with the precision each one carries
+DATE_FORMATS = [
+    ("%Y-%m-%d", "day"),
+    ("%d %b %Y", "day"),
+    ("%d %B %Y", "day"),
+    ("%b %d, %Y", "day"),
+    ("%B %d, %Y", "day"),
+    ("%Y-%m", "month"),
+    ("%b %Y", "month"),
+    ("%B %Y", "month"),
+    ("%Y", "year"),
+]
+
+
+def parse_date(value, end=False):
+    """
+    Parse a publication date string into a datetime.date.
+
+    Args:
+        value (str): Date such as "25 Oct 2022", "April 2024" or "2024"
+        end (bool): For month or year precision, return the last day of the
+            period instead of the first, as needed for range upper bounds
+
+    Returns:
+        date: The parsed date, or None if the value cannot be parsed
+    """
+    if hasattr(value, "to_native"):
+        # neo4j.time.Date and DateTime values read back from the graph
+        value = value.to_native()
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, int):
+        value = str(value)
+    if not isinstance(value, str):
+        return None
+
+    text = re.sub(r"\bSept\b", "Sep", " ".join(value.split()))
+    for fmt, precision in DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+        if end and precision == "month":
+            return parsed.replace(day=calendar.monthrange(parsed.year, parsed.month)[1])
+        if end and precision == "year":
+            return parsed.replace(month=12, day=31)
+        return parsed
+    return None
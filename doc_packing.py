@@ -0,0 +1,116 @@
+import json
+import os
+import re
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:  # tiktoken missing or its encoding files unavailable
+    _encoding = None
+
+# Token budget for one parsed paper in a summarization prompt
+SUMMARY_TOKEN_BUDGET = int(os.getenv("SUMMARY_TOKEN_BUDGET", "6000"))
+
+# Section priority, lowest first; sections matching SKIPPED_SECTIONS are never sent
+SECTION_PRIORITY = [
+    re.compile(r"abstract", re.IGNORECASE),
+    re.compile(r"introduction|motivation|overview", re.IGNORECASE),
+    re.compile(r"method|approach|model|framework|architecture|proposed", re.IGNORECASE),
+    re.compile(r"conclusion|discussion|summary|future work", re.IGNORECASE),
+    re.compile(r"result|experiment|evaluation|analysis", re.IGNORECASE),
+]
+SKIPPED_SECTIONS = re.compile(r"reference|bibliography|acknowledg|appendix", re.IGNORECASE)
+
+# JSON punctuation and keys around the packed document and each section
+DOCUMENT_OVERHEAD_TOKENS = 10
+SECTION_OVERHEAD_TOKENS = 4
+
+# Sections that would get fewer tokens than this are dropped instead of truncated
+MIN_SECTION_TOKENS = 50
+
+
+def count_tokens(text):
+    """
+    Count tokens with the local tiktoken encoder, or estimate four
+    characters per token when tiktoken is not installed.
+    """
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return -(-len(text) // 4)
+
+
+def truncate_tokens(text, max_tokens):
+    if _encoding is not None:
+        tokens = _encoding.encode(text)
+        return text if len(tokens) <= max_tokens else _encoding.decode(tokens[:max_tokens])
+    return text[:max_tokens * 4]
+
+
+def section_rank(heading):
+    if SKIPPED_SECTIONS.search(heading):
+        return None
+    for rank, pattern in enumerate(SECTION_PRIORITY):
+        if pattern.search(heading):
+            return rank
+    return len(SECTION_PRIORITY)
+
+
+def pack_document(doc, max_tokens=SUMMARY_TOKEN_BUDGET):
+    """
+    Fit a parsed paper into a token budget as compact JSON.
+
+    The untitled leading content (title block and usually the abstract) goes
+    first, then sections by priority: abstract, introduction, method,
+    conclusion, results, then everything else in document order. The first
+    section that does not fit is truncated and the rest are dropped.
+
+    Args:
+        doc (dict): {"title", "content", "sections"} from extract_paper_content_from_url
+        max_tokens (int): Token budget for the packed document
+
+    Returns:
+        tuple: (packed JSON string, report dict with token counts and dropped sections)
+    """
+    if not doc:
+        return json.dumps(doc), {"tokens": 0, "original_tokens": 0, "trimmed_tokens": 0, "dropped_sections": []}
+
+    sections = doc.get("sections") or {}
+    candidates = [("content", doc.get("content") or "")]
+    ranked = []
+    dropped = []
+    for position, (heading, text) in enumerate(sections.items()):
+        rank = section_rank(heading)
+        if rank is None:
+            dropped.append(heading)
+        else:
+            ranked.append((rank, position, heading, text))
+    candidates += [(heading, text) for _, _, heading, text in sorted(ranked)]
+
+    original_tokens = count_tokens(doc.get("content") or "") + sum(
+        count_tokens(heading) + count_tokens(text) for heading, text in sections.items())
+
+    remaining = max_tokens - count_tokens(doc.get("title") or "") - DOCUMENT_OVERHEAD_TOKENS
+    packed = {}
+    for heading, text in candidates:
+        heading_cost = count_tokens(heading) + SECTION_OVERHEAD_TOKENS
+        cost = heading_cost + count_tokens(text)
+        if cost <= remaining:
+            packed[heading] = text
+            remaining -= cost
+        elif remaining - heading_cost >= MIN_SECTION_TOKENS:
+            packed[heading] = truncate_tokens(text, remaining - heading_cost)
+            remaining = 0
+        elif heading != "content":
+            dropped.append(heading)
+
+    content = packed.pop("content", "")
+    text = json.dumps({"title": doc.get("title"), "content": content, "sections": packed},
+                      separators=(",", ":"), ensure_ascii=False)
+    tokens = count_tokens(text)
+    report = {
+        "tokens": tokens,
+        "original_tokens": original_tokens,
+        "trimmed_tokens": max(original_tokens - tokens, 0),
+        "dropped_sections": dropped,
+    }
+    return text, report
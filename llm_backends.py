@@ -0,0 +1,366 @@
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from query_templates import DATASET_QUERY, THEME_QUERY, AUTHOR_QUERY
+
+# Backends take the chat messages and request parameters of a completion and
+# return its text, either whole (complete) or in pieces (stream). OpenAI is
+# the real one; the others let the pipelines run and be benchmarked offline.
+
+
+def completion_key(model, messages, params):
+    canonical = json.dumps({"model": model, "messages": messages, "params": params},
+                           sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class OpenAIBackend:
+    """
+    Chat completions from the OpenAI API. The client is created on first use,
+    so importing this module does not need an API key.
+    """
+
+    def __init__(self, client=None):
+        self._client = client
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                from openai_connection import initialize_openai
+                self._client = initialize_openai()
+        return self._client
+
+    def complete(self, model, messages, **params):
+        response = self.client.chat.completions.create(model=model, messages=messages, **params)
+        return response.choices[0].message.content
+
+    def stream(self, model, messages, **params):
+        for chunk in self.client.chat.completions.create(model=model, messages=messages, stream=True, **params):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def __getattr__(self, name):
+        # Other OpenAI APIs, such as embeddings, are used directly
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+
+class SimulatedLatency:
+    """
+    Sleeps that mimic a hosted model: latency seconds before the first token
+    (varied by +/- jitter as a fraction), then one token every
+    1 / tokens_per_second seconds. A seed makes the delays repeatable.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, tokens_per_second=None, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def first_token(self, latency=None):
+        latency = self.latency if latency is None else latency
+        if latency and self.jitter:
+            with self._lock:
+                latency *= 1 + self._random.uniform(-self.jitter, self.jitter)
+        if latency > 0:
+            time.sleep(latency)
+
+    def tokens(self, count):
+        if self.tokens_per_second and count:
+            time.sleep(count / self.tokens_per_second)
+
+
+def split_tokens(text):
+    """
+    Split text into word-sized pieces that join back into the same text.
+    """
+    return re.findall(r"\s*\S+|\s+", text)
+
+
+class LocalBackend:
+    """
+    Base for backends that produce the whole text locally and simulate the
+    time a hosted model would take to return or stream it.
+    """
+
+    def __init__(self, delay=None):
+        self.delay = delay or SimulatedLatency()
+
+    def respond(self, model, messages, **params):
+        """
+        Returns:
+            tuple: (text, latency in seconds or None for the configured latency)
+        """
+        raise NotImplementedError
+
+    def complete(self, model, messages, **params):
+        text, latency = self.respond(model, messages, **params)
+        self.delay.first_token(latency)
+        self.delay.tokens(len(split_tokens(text)))
+        return text
+
+    def stream(self, model, messages, **params):
+        text, latency = self.respond(model, messages, **params)
+        self.delay.first_token(latency)
+        for piece in split_tokens(text):
+            self.delay.tokens(1)
+            yield piece
+
+
+STOPWORDS = set("""
+a about above after all also am an and any are as at be been before between both but by can
+could did do does find for from get give has have how i in into is it its least latest list
+looking me more most my need new of on or over papers paper please published recent
+recommend recommendations research researchers show since some suggest than that the their
+them these this those to under until up using want was we were what which who with work
+works would year years you citations citation datasets dataset authors author collaborators
+collaboration collaborate potential influential relevant related find topics topic
+""".split())
+
+CONFERENCES = {"acl", "emnlp", "naacl", "eacl", "coling", "neurips", "nips", "icml", "iclr",
+               "cvpr", "iccv", "eccv", "aaai", "ijcai", "kdd", "sigir", "www", "icassp", "interspeech"}
+
+
+class StubBackend(LocalBackend):
+    """
+    Rule-based stand-in for the model that answers every prompt the tools
+    send with output of the right shape:
+
+    - query extraction and expansion prompts get JSON built from the words,
+      years, citation counts and quoted titles in the query
+    - Cypher generation prompts get the matching parameterized template, or
+      a title lookup with the titles inlined
+    - paper title extraction gets the quoted titles, or null
+    - recommendation, summary and citation prompts get words_per_answer
+      words of placeholder prose
+
+    Answers are deterministic, so runs can be compared.
+    """
+
+    def __init__(self, delay=None, words_per_answer=200):
+        super().__init__(delay)
+        self.words_per_answer = words_per_answer
+
+    def respond(self, model, messages, **params):
+        prompt = messages[-1]["content"]
+        if "Generate a Cypher query" in prompt:
+            return self.cypher(prompt), None
+        if "Extract titles of mentioned research papers" in prompt:
+            titles = quoted_titles(quoted_query(prompt))
+            return (", ".join(f'"{title}"' for title in titles) if titles else "null"), None
+        if "Perform query expansion" in prompt:
+            return json.dumps(expand_terms(embedded_json(prompt))), None
+        if "Extract the following information from the given query" in prompt:
+            extracted = extract_terms(quoted_query(prompt))
+            if "response_format" in params:
+                return json.dumps({"extracted": extracted, "expanded": expand_terms(extracted)}), None
+            return json.dumps(extracted), None
+        return self.prose(prompt), None
+
+    def cypher(self, prompt):
+        if "using title information" in prompt:
+            match = re.search(r"titles:\s*(.*)", prompt)
+            titles = quoted_titles(match.group(1)) if match else []
+            if not titles and match and match.group(1).strip().lower() != "null":
+                titles = [title.strip().lower() for title in match.group(1).split(",") if title.strip()]
+            literals = ", ".join(json.dumps(title) for title in titles)
+            return f"MATCH (p:Paper)\nWHERE toLower(p.title) IN [{literals}]\nRETURN p\nLIMIT 100"
+        if "MATCH clause for Authors" in prompt:
+            return AUTHOR_QUERY.strip()
+        if "finds datasets" in prompt:
+            return DATASET_QUERY.strip()
+        return THEME_QUERY.strip()
+
+    def prose(self, prompt):
+        match = re.search(r'User Query: "(.*?)"', prompt) or re.search(r"research paper : (.*)", prompt)
+        subject = match.group(1).strip() if match else "the request"
+        words = [word for word in re.findall(r"[A-Za-z][A-Za-z\-]+", subject) if word.lower() not in STOPWORDS]
+        words = words or ["research"]
+        filler = (words * (self.words_per_answer // len(words) + 1))[:self.words_per_answer]
+        return f"Stub answer for {subject}.\n\n" + " ".join(filler)
+
+
+def quoted_query(prompt):
+    match = re.search(r'from the given query:\s*"(.*?)"\s*\n', prompt, re.DOTALL)
+    return match.group(1).strip() if match else prompt
+
+
+def quoted_titles(text):
+    return [title.strip().lower() for title in re.findall(r"[\"'“‘](.+?)[\"'”’]", text)
+            if len(title.split()) > 1]
+
+
+def embedded_json(prompt):
+    start = prompt.find("{")
+    try:
+        return json.JSONDecoder().raw_decode(prompt[start:])[0] if start >= 0 else {}
+    except ValueError:
+        return {}
+
+
+def extract_terms(query):
+    """
+    Fill the query information keys from a query with simple rules.
+    """
+    titles = quoted_titles(query)
+    text = query
+    for title in re.findall(r"[\"'“‘].+?[\"'”’]", query):
+        text = text.replace(title, " , ")
+
+    authors = [name.strip().lower() for name in re.findall(r"\bby ((?:[A-Z][\w.\-]+ ?){2,3})", text)]
+    years = sorted(int(year) for year in re.findall(r"\b((?:19|20)\d{2})\b", text))
+    date_range = None
+    if len(years) >= 2:
+        date_range = {"start": f"{years[0]}-01-01", "end": f"{years[-1]}-12-31"}
+    elif years and re.search(r"\b(before|until|up to)\s+%d" % years[0], text, re.IGNORECASE):
+        date_range = {"start": None, "end": f"{years[0]}-12-31"}
+    elif years:
+        date_range = {"start": f"{years[0]}-01-01", "end": None}
+    citations = re.search(r"(?:at least|more than|over|>=?)\s*(\d+)\s*citations", text, re.IGNORECASE)
+
+    conferences = []
+    keywords = []
+    phrase = []
+    for word in re.findall(r"[A-Za-z][A-Za-z0-9\-]*|[,.;:!?]|\d+", text):
+        lower = word.lower()
+        if lower in CONFERENCES:
+            conferences.append(lower)
+        if lower in STOPWORDS or lower in CONFERENCES or not word[0].isalpha() \
+                or any(lower in name.split() for name in authors):
+            if phrase:
+                keywords.append(" ".join(phrase))
+            phrase = []
+        else:
+            phrase.append(lower)
+    if phrase:
+        keywords.append(" ".join(phrase))
+
+    return {
+        "content": query,
+        "keywords": list(dict.fromkeys(keywords))[:5],
+        "papers": titles,
+        "datasets": [],
+        "domains": [],
+        "authors": authors,
+        "conferences": list(dict.fromkeys(conferences)),
+        "date_range": date_range,
+        "min_citations": int(citations.group(1)) if citations else None,
+    }
+
+
+def expand_terms(extracted):
+    """
+    Expand keywords with their acronym and singular form.
+    """
+    expanded = {key: list(extracted.get(key) or []) for key in
+                ["keywords", "domains", "papers", "datasets", "authors", "conferences"]}
+    for term in extracted.get("keywords") or []:
+        words = term.split()
+        if len(words) > 1:
+            expanded["keywords"].append("".join(word[0] for word in words))
+        if term.endswith("s") and not term.endswith("ss"):
+            expanded["keywords"].append(term[:-1])
+    expanded["keywords"] = list(dict.fromkeys(expanded["keywords"]))
+    return expanded
+
+
+class ReplayBackend(LocalBackend):
+    """
+    Answer from completions recorded by RecordingBackend, matched on model,
+    messages and parameters. Recorded latencies are replayed unless a fixed
+    latency is configured; prompts that were not recorded go to fallback,
+    or raise KeyError when there is none.
+    """
+
+    def __init__(self, path, delay=None, fallback=None, recorded_latency=True):
+        super().__init__(delay)
+        self.fallback = fallback
+        self.recorded_latency = recorded_latency
+        self.records = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self.records[record["key"]] = record
+
+    def respond(self, model, messages, **params):
+        record = self.records.get(completion_key(model, messages, params))
+        if record is None:
+            if self.fallback is None:
+                raise KeyError("No recorded completion for this prompt")
+            return self.fallback.respond(model, messages, **params)
+        return record["response"], record.get("latency") if self.recorded_latency else None
+
+
+class RecordingBackend:
+    """
+    Pass completions through to another backend and append each one, with
+    its latency, to a JSON Lines file that ReplayBackend can load.
+    """
+
+    def __init__(self, backend, path):
+        self.backend = backend
+        self.path = path
+        self._lock = threading.Lock()
+
+    def complete(self, model, messages, **params):
+        start = time.perf_counter()
+        text = self.backend.complete(model, messages, **params)
+        self._record(model, messages, params, text, time.perf_counter() - start)
+        return text
+
+    def stream(self, model, messages, **params):
+        start = time.perf_counter()
+        pieces = []
+        for piece in self.backend.stream(model, messages, **params):
+            pieces.append(piece)
+            yield piece
+        self._record(model, messages, params, "".join(pieces), time.perf_counter() - start)
+
+    def _record(self, model, messages, params, text, latency):
+        record = {"key": completion_key(model, messages, params), "model": model, "messages": messages,
+                  "params": params, "response": text, "latency": round(latency, 4)}
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+
+    def __getattr__(self, name):
+        if name.startswith("_") or name == "backend":
+            raise AttributeError(name)
+        return getattr(self.backend, name)
+
+
+def create_backend(name=None):
+    """
+    Build the backend named by name or LLM_BACKEND: "openai" (default),
+    "stub", "replay" (LLM_REPLAY_PATH, falling back to the stub) or "record"
+    (OpenAI, appending to LLM_RECORD_PATH). The local backends simulate
+    LLM_LATENCY seconds to the first token, varied by LLM_LATENCY_JITTER, and
+    LLM_TOKENS_PER_SECOND.
+    """
+    name = name or os.getenv("LLM_BACKEND", "openai")
+    tokens_per_second = os.getenv("LLM_TOKENS_PER_SECOND")
+    delay = SimulatedLatency(latency=float(os.getenv("LLM_LATENCY", "0")),
+                             jitter=float(os.getenv("LLM_LATENCY_JITTER", "0")),
+                             tokens_per_second=float(tokens_per_second) if tokens_per_second else None,
+                             seed=int(os.getenv("LLM_LATENCY_SEED", "0")))
+    if name == "openai":
+        return OpenAIBackend()
+    if name == "stub":
+        return StubBackend(delay)
+    if name == "replay":
+        return ReplayBackend(os.getenv("LLM_REPLAY_PATH", "llm_recordings.jsonl"), delay,
+                             fallback=StubBackend(delay),
+                             recorded_latency=os.getenv("LLM_LATENCY") is None)
+    if name == "record":
+        return RecordingBackend(OpenAIBackend(), os.getenv("LLM_RECORD_PATH", "llm_recordings.jsonl"))
+    raise ValueError(f"Unknown LLM backend: {name}")
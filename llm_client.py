@@ -0,0 +1,114 @@
+import os
+from dotenv import load_dotenv
+from cache import LRUCache
+from llm_backends import completion_key, create_backend
+
+load_dotenv()
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+
+class LLMClient:
+    """
+    Single entry point for chat completions used by every tool module.
+
+    Completions come from a backend (OpenAI, or a local stub or replay for
+    offline runs, see llm_backends) and are cached by exact match on model,
+    messages and request parameters, in memory and optionally in SQLite.
+    Any other attribute is passed through to the backend.
+    """
+
+    def __init__(self, backend, cache=None):
+        self.backend = backend
+        self.cache = cache
+
+    def complete(self, prompt, model=DEFAULT_MODEL, on_token=None, **params):
+        """
+        Return the text of a single-message chat completion.
+
+        Args:
+            prompt (str): User message content
+            model (str): Model name
+            on_token (callable): If given, the completion is streamed and
+                on_token is called with each piece of text as it arrives
+            **params: Extra parameters for chat.completions.create
+
+        Returns:
+            str: The completion text
+        """
+        if on_token is not None:
+            pieces = []
+            for piece in self.stream(prompt, model=model, **params):
+                pieces.append(piece)
+                on_token(piece)
+            return "".join(pieces)
+
+        messages = [{"role": "user", "content": prompt}]
+        key = completion_key(model, messages, params)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        content = self.backend.complete(model, messages, **params)
+
+        if self.cache is not None and content is not None:
+            self.cache.set(key, content)
+        return content
+
+    def stream(self, prompt, model=DEFAULT_MODEL, **params):
+        """
+        Yield the text of a single-message chat completion as it arrives.
+
+        A cached completion is yielded in one piece. A streamed completion is
+        cached once it is complete, under the same key as complete() uses.
+        """
+        messages = [{"role": "user", "content": prompt}]
+        key = completion_key(model, messages, params)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+
+        pieces = []
+        for piece in self.backend.stream(model, messages, **params):
+            pieces.append(piece)
+            yield piece
+
+        if self.cache is not None:
+            self.cache.set(key, "".join(pieces))
+
+    def stats(self):
+        if self.cache is None:
+            return {"hits": 0, "misses": 0, "hit_rate": 0.0, "size": 0}
+        return self.cache.stats()
+
+    def __getattr__(self, name):
+        if name.startswith("_") or name == "backend":
+            raise AttributeError(name)
+        return getattr(self.backend, name)
+
+
+def create_completion_cache():
+    """
+    Build the completion cache from LLM_CACHE_SIZE, LLM_CACHE_TTL,
+    LLM_CACHE_PATH and LLM_CACHE_DISK_SIZE; LLM_CACHE_SIZE=0 disables it.
+    """
+    size = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+    if size <= 0:
+        return None
+    ttl = os.getenv("LLM_CACHE_TTL")
+    disk_size = os.getenv("LLM_CACHE_DISK_SIZE")
+    return LRUCache(maxsize=size,
+                    ttl=float(ttl) if ttl else 86400,
+                    path=os.getenv("LLM_CACHE_PATH"),
+                    table="completion_cache",
+                    disk_maxsize=int(disk_size) if disk_size else 100000)
+
+
+def initialize_llm(backend=None):
+    """
+    Build the LLM client for the backend named by backend or LLM_BACKEND.
+    """
+    return LLMClient(create_backend(backend), cache=create_completion_cache())
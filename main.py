@@ -1,22 +1,39 @@
 import os
 from langchain.agents import AgentExecutor, create_openai_tools_agent
 from langchain_core.tools import StructuredTool
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_community.chat_models import ChatOpenAI
 from langchain_community.utilities import GoogleSerperAPIWrapper
 
 
 import json
-from neo4j_connection import Neo4jConnection
-from openai_connection import initialize_openai
+from neo4j_connection import SharedNeo4jConnection
+from llm_client import initialize_llm
 from dataset_recommendation import get_dataset_recommendations
 from theme_specific_search import theme_search
 from author_collaboration import get_author_collaboration
 from summarize_papers import summarize_papers, get_citation_reasoning
+from summary_store import flush_requests
 from dotenv import load_dotenv
 
 load_dotenv(override=True)
 
+# Print answers token by token as they are generated instead of all at once
+STREAM_OUTPUT = os.getenv("STREAM_OUTPUT", "true").lower() in ("1", "true", "yes")
+
+def print_token(token):
+    print(token, end="", flush=True)
+
+class TokenStreamHandler(BaseCallbackHandler):
+    def __init__(self, on_token):
+        self.on_token = on_token
+
+    def on_llm_new_token(self, token, **kwargs):
+        # Tool call chunks arrive as empty tokens
+        if token:
+            self.on_token(token)
+
 def initialize_services():
     # Initialize Neo4j connection
     neo4j_uri = os.getenv("NEO4J_URI")
@@ -26,15 +43,17 @@ def initialize_services():
     if not all([neo4j_uri, neo4j_user, neo4j_password]):
         raise ValueError("Neo4j environment variables are not set properly.")
 
-    neo4j_conn = Neo4jConnection(neo4j_uri, neo4j_user, neo4j_password)
+    # One pooled async driver shared by every tool, including their worker threads
+    neo4j_conn = SharedNeo4jConnection(neo4j_uri, neo4j_user, neo4j_password,
+                                       max_pool_size=int(os.getenv("NEO4J_POOL_SIZE", "50")))
     neo4j_conn.connect()
 
     # Initialize OpenAI
-    openai_client = initialize_openai()
+    openai_client = initialize_llm()
 
     return neo4j_conn, openai_client
 
-def setup_tools(neo4j_conn, openai_client):
+def setup_tools(neo4j_conn, openai_client, on_token=None):
     # Check if SERPER_API_KEY is set
     serper_api_key = os.getenv("SERPER_API_KEY")
     if not serper_api_key:
@@ -44,27 +63,27 @@ def setup_tools(neo4j_conn, openai_client):
 
     dataset_tool = StructuredTool.from_function(
         name="get_dataset_recommendations",
-        func=lambda query: get_dataset_recommendations(neo4j_conn, openai_client, query),
+        func=lambda query: get_dataset_recommendations(neo4j_conn, openai_client, query, on_token),
         description="Get dataset recommendations for information extraction tasks"
     )
     theme_tool = StructuredTool.from_function(
         name="generate_theme_recommendations",
-        func=lambda query: theme_search(neo4j_conn, openai_client, query),
+        func=lambda query: theme_search(neo4j_conn, openai_client, query, on_token),
         description="Get influential papers for a specific domain"
     )
     author_tool = StructuredTool.from_function(
         name="get_author_collaboration",
-        func=lambda query: get_author_collaboration(neo4j_conn, openai_client, query),
+        func=lambda query: get_author_collaboration(neo4j_conn, openai_client, query, on_token),
         description="Find potential authors for collaboration"
     )
     summarization_tool = StructuredTool.from_function(
         name="summarize_papers",
-        func=lambda query: summarize_papers(neo4j_conn, openai_client, query),
+        func=lambda query: summarize_papers(neo4j_conn, openai_client, query, on_token=on_token),
         description="Fetch summaries of mentioned papers"
     )
     citation_reasoning_tool = StructuredTool.from_function(
         name="citation_reasoning",
-        func=lambda query: get_citation_reasoning(neo4j_conn, openai_client, query),
+        func=lambda query: get_citation_reasoning(neo4j_conn, openai_client, query, on_token),
         description="Give reasoning for citation between given papers."
     )
     web_search_tool = StructuredTool.from_function(
@@ -76,8 +95,22 @@ def setup_tools(neo4j_conn, openai_client):
     return [dataset_tool, theme_tool, author_tool, summarization_tool, citation_reasoning_tool, web_search_tool]
 
 
-def setup_agent(tools):
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+def setup_agent(tools, on_token=None, streaming=False):
+    """
+    Build the agent executor over tools, streaming its final answer to
+    on_token when given. With streaming=True and no on_token, the model
+    streams and callbacks can be passed per call instead, as in
+    invoke(..., config={"callbacks": [TokenStreamHandler(on_token)]}).
+
+    Only the direct tool entry points get a faster first token from
+    streaming. An agent's first token is its final answer, which it only
+    starts writing after every tool call has finished, so the CLI and the
+    server's /agent endpoint gain no time to first token; the stream just
+    shows the answer as it is written.
+    """
+    streaming = streaming or on_token is not None
+    callbacks = [TokenStreamHandler(on_token)] if on_token is not None else None
+    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0, streaming=streaming, callbacks=callbacks)
     main_prompt = ChatPromptTemplate.from_messages([
         ("system", "You are a helpful assistant for researchers in the field of Natural Language Processing and Information Extraction. "
                    "You can provide dataset recommendations, suggest influential papers, help find potential collaborators and summarize research papers."
@@ -100,7 +133,7 @@ def setup_agent(tools):
 
 
 
-def chatbot(agent_executor):
+def chatbot(agent_executor, streaming=False):
     while True:
         user_input = input("User: ")
         if user_input.lower() in ['quit', 'exit', 'bye']:
@@ -108,20 +141,31 @@ def chatbot(agent_executor):
             break
 
         try:
-            response = agent_executor.invoke({"input": user_input})
-            print("Assistant:", response['output'])
+            if streaming:
+                # Tokens are printed by the stream handler as they arrive
+                print("Assistant: ", end="", flush=True)
+                agent_executor.invoke({"input": user_input})
+                print()
+            else:
+                response = agent_executor.invoke({"input": user_input})
+                print("Assistant:", response['output'])
         except Exception as e:
             print(f"An error occurred: {str(e)}")
 
 def main():
     neo4j_conn, openai_client = initialize_services()
+    # Only the agent's final answer is streamed; the tools' own answers are
+    # intermediate steps that the agent rewrites
     tools = setup_tools(neo4j_conn, openai_client)
-    agent_executor = setup_agent(tools)
+    agent_executor = setup_agent(tools, print_token if STREAM_OUTPUT else None)
 
     try:
-        chatbot(agent_executor)
+        chatbot(agent_executor, streaming=STREAM_OUTPUT)
     finally:
-        # Close Neo4j connection
+        stats = openai_client.stats()
+        print(f"LLM cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
+        # Write the pending summary request counts, then close Neo4j connection
+        flush_requests(neo4j_conn)
         neo4j_conn.close()
 
 if __name__ == "__main__":
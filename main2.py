@@ -1,6 +1,7 @@
 import os
 import json
 from neo4j_connection import Neo4jConnection
+from llm_client import initialize_llm
 from openai_connection import initialize_openai
 from dataset_recommendation import get_dataset_recommendations
 from theme_specific_search import generate_theme_recommendations
@@ -18,10 +19,12 @@ def initialize_services():
     neo4j_conn = Neo4jConnection(neo4j_uri, neo4j_user, neo4j_password)
     neo4j_conn.connect()
 
-    # Initialize OpenAI
-    openai_client = initialize_openai()
+    # The tools go through the cached LLM client; the tool-calling loop needs
+    # the raw OpenAI chat API
+    llm_client = initialize_llm()
+    chat_client = initialize_openai()
 
-    return neo4j_conn, openai_client
+    return neo4j_conn, llm_client, chat_client
 
 # Define the tools
 tools = [
@@ -78,7 +81,7 @@ tools = [
     }
 ]
 
-def chatbot(neo4j_conn, openai_client):
+def chatbot(neo4j_conn, llm_client, chat_client):
     messages = [
         {"role": "system", "content": "You are a helpful assistant for researchers in the field of Natural Language Processing and Information Extraction. You can provide dataset recommendations, suggest influential papers, and help find potential collaborators."}
     ]
@@ -92,7 +95,7 @@ def chatbot(neo4j_conn, openai_client):
         messages.append({"role": "user", "content": user_input})
 
         try:
-            response = openai_client.chat.completions.create(
+            response = chat_client.chat.completions.create(
                 model="gpt-4",
                 messages=messages,
                 tools=tools,
@@ -109,11 +112,11 @@ def chatbot(neo4j_conn, openai_client):
 
                     try:
                         if function_name == "get_dataset_recommendations":
-                            result = get_dataset_recommendations(neo4j_conn, openai_client, function_args['query'])
+                            result = get_dataset_recommendations(neo4j_conn, llm_client, function_args['query'])
                         elif function_name == "generate_theme_recommendations":
-                            result = generate_theme_recommendations(function_args['query'], openai_client, neo4j_conn)
+                            result = generate_theme_recommendations(function_args['query'], llm_client, neo4j_conn)
                         elif function_name == "get_author_collaboration":
-                            result = get_author_collaboration(neo4j_conn, openai_client, function_args['query'])
+                            result = get_author_collaboration(neo4j_conn, llm_client, function_args['query'])
                         else:
                             result = "Function not found."
                     except Exception as e:
@@ -124,7 +127,7 @@ def chatbot(neo4j_conn, openai_client):
                     )
 
                 # Get a new response from the model
-                response = openai_client.chat.completions.create(
+                response = chat_client.chat.completions.create(
                     model="gpt-4",
                     messages=messages
                 )
@@ -137,10 +140,10 @@ def chatbot(neo4j_conn, openai_client):
             print(f"An error occurred: {str(e)}")
 
 def main():
-    neo4j_conn, openai_client = initialize_services()
+    neo4j_conn, llm_client, chat_client = initialize_services()
 
     try:
-        chatbot(neo4j_conn, openai_client)
+        chatbot(neo4j_conn, llm_client, chat_client)
     finally:
         # Ensure Neo4j connection is closed
         neo4j_conn.close()
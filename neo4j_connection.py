@@ -1,5 +1,8 @@
-from neo4j import GraphDatabase
-from neo4j.exceptions import ServiceUnavailable
+import asyncio
+import re
+import threading
+from neo4j import GraphDatabase, AsyncGraphDatabase, READ_ACCESS
+from neo4j.exceptions import ServiceUnavailable, SessionExpired
 
 class Neo4jConnection:
     def __init__(self, uri, user, password):
@@ -34,6 +37,186 @@ class Neo4jConnection:
             result = session.run(query, parameters)
             return [record for record in result]
 
+
+# Clauses that make a query a write, checked after string literals are removed
+WRITE_CLAUSES = re.compile(r"\b(CREATE|MERGE|SET|DELETE|DETACH|REMOVE|DROP|LOAD\s+CSV)\b|"
+                           r"\bCALL\s+db\.create\.", re.IGNORECASE)
+STRING_LITERALS = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+
+
+def is_write_query(query):
+    return bool(WRITE_CLAUSES.search(STRING_LITERALS.sub("''", query)))
+
+
+class AsyncNeo4jConnection:
+    """
+    Async connection backed by one pooled AsyncGraphDatabase driver.
+
+    Read queries run as managed read transactions, which a cluster routes to
+    followers and the driver retries on transient errors; queries with write
+    clauses run as write transactions. stream() yields records as they
+    arrive instead of building a list, and query_many() runs several queries
+    concurrently on separate pooled sessions.
+    """
+
+    def __init__(self, uri, user, password, database=None, max_pool_size=50,
+                 max_retry_time=15.0, acquisition_timeout=60.0):
+        self._uri = uri
+        self._user = user
+        self._password = password
+        self._database = database
+        self._max_pool_size = max_pool_size
+        self._max_retry_time = max_retry_time
+        self._acquisition_timeout = acquisition_timeout
+        self._driver = None
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def connect(self):
+        if not self._driver:
+            try:
+                self._driver = AsyncGraphDatabase.driver(
+                    self._uri, auth=(self._user, self._password),
+                    max_connection_pool_size=self._max_pool_size,
+                    max_transaction_retry_time=self._max_retry_time,
+                    connection_acquisition_timeout=self._acquisition_timeout)
+                await self._driver.verify_connectivity()
+            except ServiceUnavailable:
+                print("Unable to connect to Neo4j database.")
+                raise
+
+    async def close(self):
+        if self._driver:
+            await self._driver.close()
+            self._driver = None
+
+    async def query(self, query, parameters=None, write=None):
+        """
+        Run a query in a managed transaction and return all records.
+
+        Args:
+            query (str): Cypher query
+            parameters (dict): Query parameters
+            write (bool): Force a write (True) or read (False) transaction;
+                by default it is decided from the query's clauses
+        """
+        assert self._driver is not None, "Driver not initialized. Call connect() first."
+        if write is None:
+            write = is_write_query(query)
+        async with self._driver.session(database=self._database) as session:
+            work = session.execute_write if write else session.execute_read
+            return await work(self._collect, query, parameters or {})
+
+    async def stream(self, query, parameters=None, retries=3, backoff=0.2):
+        """
+        Yield the records of a read query as they arrive.
+
+        Connection failures before the first record are retried with
+        exponential backoff; once records have been yielded, errors are raised.
+        """
+        assert self._driver is not None, "Driver not initialized. Call connect() first."
+        for attempt in range(retries + 1):
+            yielded = False
+            try:
+                async with self._driver.session(database=self._database,
+                                                default_access_mode=READ_ACCESS) as session:
+                    result = await session.run(query, parameters or {})
+                    async for record in result:
+                        yielded = True
+                        yield record
+                return
+            except (ServiceUnavailable, SessionExpired) as e:
+                if yielded or attempt == retries:
+                    raise
+                delay = backoff * 2 ** attempt
+                print(f"Transient error ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def query_many(self, queries):
+        """
+        Run several queries concurrently, each on its own pooled session.
+
+        Args:
+            queries (list): Cypher strings or (query, parameters) tuples
+
+        Returns:
+            list: One list of records per query, in input order
+        """
+        calls = [self.query(*item) if isinstance(item, tuple) else self.query(item) for item in queries]
+        return await asyncio.gather(*calls)
+
+    @staticmethod
+    async def _collect(tx, query, parameters):
+        result = await tx.run(query, parameters)
+        return [record async for record in result]
+
+
+class SharedNeo4jConnection:
+    """
+    Blocking facade over an AsyncNeo4jConnection running on its own event
+    loop thread, with the same query() interface as Neo4jConnection.
+
+    The synchronous tools can share one instance across threads and all of
+    their queries go through a single connection pool.
+    """
+
+    def __init__(self, uri, user, password, **kwargs):
+        self.async_conn = AsyncNeo4jConnection(uri, user, password, **kwargs)
+        self._loop = None
+        self._thread = None
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def connect(self):
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name="neo4j-loop", daemon=True)
+            self._thread.start()
+        self._run(self.async_conn.connect())
+
+    def close(self):
+        if self._loop is not None:
+            self._run(self.async_conn.close())
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+
+    def query(self, query, parameters=None, write=None):
+        return self._run(self.async_conn.query(query, parameters, write))
+
+    def query_many(self, queries):
+        return self._run(self.async_conn.query_many(queries))
+
+    def stream(self, query, parameters=None):
+        """
+        Yield the records of a read query as the event loop receives them.
+        """
+        records = self.async_conn.stream(query, parameters)
+        try:
+            while True:
+                try:
+                    yield self._run(records.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            self._run(records.aclose())
+
+    def _run(self, coro):
+        assert self._loop is not None, "Event loop not started. Call connect() first."
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+
 # Usage
 uri = "neo4j+s://b2850215.databases.neo4j.io"
 user = "neo4j"
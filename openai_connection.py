@@ -15,6 +15,3 @@ def initialize_openai():
 
     # Create and return the OpenAI client
     return OpenAI(api_key=api_key)
-
-# Initialize OpenAI and get the openai module
-openai = initialize_openai()
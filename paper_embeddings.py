@@ -0,0 +1,234 @@
+import argparse
+import os
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+VECTOR_INDEX = "paper_embedding"
+
+# "local" runs a sentence-transformers model on CPU (requirements-embeddings.txt),
+# "openai" calls the embeddings API. There is no default: the papers and the
+# queries must be embedded by the same model, whatever happens to be installed.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND")
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+OPENAI_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+
+# The model that produced the vectors in the index, as "backend:model:dimensions"
+EMBEDDING_MODEL_QUERY = f"""
+OPTIONAL MATCH (m:EmbeddingIndex {{name: '{VECTOR_INDEX}'}})
+RETURN m.model AS model, m.dimensions AS dimensions
+"""
+
+SET_EMBEDDING_MODEL_QUERY = f"""
+MERGE (m:EmbeddingIndex {{name: '{VECTOR_INDEX}'}})
+SET m.model = $model, m.dimensions = $dimensions
+"""
+
+INDEX_DIMENSIONS_QUERY = f"""
+SHOW INDEXES YIELD name, options
+WHERE name = '{VECTOR_INDEX}'
+RETURN options.indexConfig['vector.dimensions'] AS dimensions
+"""
+
+# Papers whose embedding is missing, was computed from older content or
+# came from another model
+PENDING_EMBEDDINGS_QUERY = """
+MATCH (p:Paper)
+WHERE p.content_hash IS NOT NULL
+  AND (p.embedding_hash IS NULL OR p.embedding_hash <> p.content_hash
+       OR p.embedding_model IS NULL OR p.embedding_model <> $model)
+RETURN p.id AS id, p.title AS title, p.abstract AS abstract, p.conclusion AS conclusion,
+       p.content_hash AS content_hash
+LIMIT $limit
+"""
+
+SET_EMBEDDINGS_QUERY = """
+UNWIND $rows AS row
+MATCH (p:Paper {id: row.id})
+CALL db.create.setNodeVectorProperty(p, 'embedding', row.embedding)
+SET p.embedding_hash = row.content_hash,
+    p.embedding_model = $model
+"""
+
+SEMANTIC_SEARCH_QUERY = f"""
+CALL db.index.vector.queryNodes('{VECTOR_INDEX}', $k, $embedding)
+YIELD node AS p, score
+RETURN p.id AS Id, p.title AS Title, score AS Score
+ORDER BY Score DESC
+"""
+
+
+class LocalEmbedder:
+    """
+    Embed text on CPU with a sentence-transformers model.
+    """
+
+    def __init__(self, model=LOCAL_EMBEDDING_MODEL, batch_size=64):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError("sentence-transformers is required for local embeddings, "
+                              "install requirements-embeddings.txt") from e
+        self.model = SentenceTransformer(model, device="cpu")
+        self.batch_size = batch_size
+        self.dimensions = self.model.get_sentence_embedding_dimension()
+        self.name = f"local:{model}:{self.dimensions}"
+
+    def embed(self, texts):
+        return self.model.encode(texts, batch_size=self.batch_size, normalize_embeddings=True).tolist()
+
+
+class OpenAIEmbedder:
+    """
+    Embed text with the OpenAI embeddings API.
+    """
+
+    def __init__(self, client, model=OPENAI_EMBEDDING_MODEL, dimensions=1536):
+        self.client = client
+        self.model = model
+        self.dimensions = dimensions
+        self.name = f"openai:{model}:{dimensions}"
+
+    def embed(self, texts):
+        response = self.client.embeddings.create(model=self.model, input=texts, dimensions=self.dimensions)
+        return [item.embedding for item in response.data]
+
+
+def get_embedder(openai=None, backend=EMBEDDING_BACKEND):
+    """
+    Return the embedder selected by EMBEDDING_BACKEND.
+
+    Args:
+        openai: OpenAI or LLM client, only used by the "openai" backend
+        backend (str): "local" or "openai"
+    """
+    if backend not in ("local", "openai"):
+        raise ValueError(f"Unknown embedding backend: {backend!r}; set EMBEDDING_BACKEND to local or openai")
+    if backend == "local":
+        return LocalEmbedder()
+    if openai is None:
+        from llm_client import initialize_llm
+        openai = initialize_llm()
+    return OpenAIEmbedder(openai)
+
+
+def paper_text(paper):
+    """
+    Text embedded for a paper: title, abstract and conclusion.
+    """
+    parts = [paper.get("title"), paper.get("abstract"), paper.get("conclusion")]
+    return "\n\n".join(part for part in parts if part)
+
+
+def create_vector_index(session, dimensions):
+    session.run(f"CREATE VECTOR INDEX {VECTOR_INDEX} IF NOT EXISTS "
+                "FOR (p:Paper) ON (p.embedding) "
+                f"OPTIONS {{indexConfig: {{`vector.dimensions`: {int(dimensions)}, "
+                "`vector.similarity_function`: 'cosine'}}")
+
+
+def prepare_vector_index(session, embedder):
+    """
+    Create the vector index for embedder and record its model. An index of
+    another dimension is dropped and recreated; the papers are re-embedded
+    because their embedding_model no longer matches.
+    """
+    record = session.run(INDEX_DIMENSIONS_QUERY).single()
+    if record is not None and record["dimensions"] != embedder.dimensions:
+        print(f"Recreating {VECTOR_INDEX} for {embedder.dimensions} dimensions "
+              f"(was {record['dimensions']})")
+        session.run(f"DROP INDEX {VECTOR_INDEX} IF EXISTS")
+    create_vector_index(session, embedder.dimensions)
+    previous = session.run(EMBEDDING_MODEL_QUERY).single()["model"]
+    if previous is not None and previous != embedder.name:
+        print(f"Embedding model changed from {previous} to {embedder.name}, re-embedding all papers")
+    session.run(SET_EMBEDDING_MODEL_QUERY, model=embedder.name, dimensions=embedder.dimensions)
+
+
+def index_model(conn):
+    """
+    Return the model name and dimensions recorded for the vector index, or
+    (None, None) before any paper was embedded.
+    """
+    records = conn.query(EMBEDDING_MODEL_QUERY)
+    if not records:
+        return None, None
+    return records[0]["model"], records[0]["dimensions"]
+
+
+def set_embeddings(tx, rows, model):
+    tx.run(SET_EMBEDDINGS_QUERY, rows=rows, model=model)
+
+
+def pending_embeddings(tx, limit, model):
+    return [record.data() for record in tx.run(PENDING_EMBEDDINGS_QUERY, limit=limit, model=model)]
+
+
+def embed_papers(driver, embedder, batch_size=256):
+    """
+    Embed every paper that has no embedding, whose content changed since it
+    was embedded or that was embedded by another model, batch_size papers
+    per model call and transaction.
+
+    Returns:
+        int: Number of papers embedded
+    """
+    with driver.session() as session:
+        prepare_vector_index(session, embedder)
+        start = time.perf_counter()
+        total = 0
+        while True:
+            papers = session.execute_read(pending_embeddings, batch_size, embedder.name)
+            if not papers:
+                break
+            embeddings = embedder.embed([paper_text(paper) for paper in papers])
+            rows = [{"id": paper["id"], "embedding": embedding, "content_hash": paper["content_hash"]}
+                    for paper, embedding in zip(papers, embeddings)]
+            session.execute_write(set_embeddings, rows, embedder.name)
+            total += len(rows)
+            elapsed = time.perf_counter() - start
+            print(f"Embedded {total} papers ({total / elapsed:.1f} papers/sec)")
+    return total
+
+
+def semantic_search(conn, embedder, text, k=20):
+    """
+    Find the papers closest in meaning to text using the vector index.
+
+    Args:
+        conn: Neo4jConnection object
+        embedder: LocalEmbedder or OpenAIEmbedder used to embed the papers
+        text (str): Query text
+        k (int): Number of papers to return
+
+    Returns:
+        list: Records with Id, Title and cosine similarity Score, best first
+    """
+    model, _ = index_model(conn)
+    if model is not None and model != embedder.name:
+        raise ValueError(f"The {VECTOR_INDEX} index holds {model} embeddings, not {embedder.name}")
+    embedding = embedder.embed([text])[0]
+    return conn.query(SEMANTIC_SEARCH_QUERY, parameters={"k": k, "embedding": embedding})
+
+
+def main():
+    from create_knowledge_graph import connect
+
+    parser = argparse.ArgumentParser(description="Embed papers into the Neo4j vector index.")
+    parser.add_argument("--batch-size", type=int, default=256, help="Papers embedded per batch")
+    parser.add_argument("--backend", choices=["local", "openai"], default=EMBEDDING_BACKEND,
+                        required=EMBEDDING_BACKEND is None,
+                        help="Embedding backend (default: EMBEDDING_BACKEND)")
+    args = parser.parse_args()
+
+    driver = connect()
+    try:
+        total = embed_papers(driver, get_embedder(backend=args.backend), batch_size=args.batch_size)
+        print(f"Embeddings updated successfully! ({total} papers)")
+    finally:
+        driver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import json
+from itertools import islice
+
+CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+
+
+def iter_papers(path, offset=0):
+    """
+    Stream paper dicts from a JSON array or JSON Lines file.
+
+    Only one chunk of the file and the paper being decoded are held in
+    memory, so memory use stays flat regardless of the file size.
+
+    Args:
+        path (str): Path of a .json file holding an array of papers or a
+            JSON Lines file with one paper per line
+        offset (int): Number of papers to skip, used to resume a load
+
+    Yields:
+        dict: One paper record at a time
+    """
+    with open(path, encoding="utf-8") as f:
+        first = _peek_first_char(f)
+        papers = _iter_array(f) if first == "[" else _iter_lines(f)
+        yield from islice(papers, offset, None)
+
+
+def batched(papers, batch_size):
+    batch = []
+    for paper in papers:
+        batch.append(paper)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _peek_first_char(f):
+    while True:
+        pos = f.tell()
+        ch = f.read(1)
+        if not ch or not ch.isspace():
+            f.seek(pos)
+            return ch
+
+
+def _iter_lines(f):
+    for line_number, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON on line {line_number}: {e}") from e
+
+
+def _iter_array(f):
+    buffer = f.read(CHUNK_SIZE).lstrip()[1:]  # drop the opening "["
+    eof = False
+    while True:
+        buffer = buffer.lstrip().lstrip(",").lstrip()
+        while not buffer and not eof:
+            chunk = f.read(CHUNK_SIZE)
+            eof = not chunk
+            buffer = chunk.lstrip().lstrip(",").lstrip()
+        if buffer.startswith("]"):
+            return
+        if not buffer:
+            raise ValueError("Unexpected end of file while reading JSON array")
+        try:
+            paper, end = _decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = f.read(CHUNK_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        if end == len(buffer) and not eof:
+            # A number or literal at the end of the buffer may continue in the next chunk
+            chunk = f.read(CHUNK_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        yield paper
+        buffer = buffer[end:]
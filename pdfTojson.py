@@ -1,73 +1,239 @@
+import argparse
+import atexit
 import json
+import multiprocessing
+import os
+import threading
+import time
 import requests
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
 import PyPDF2
 import re
+from pdf_cache import get_pdf_cache
 
-def extract_paper_content_from_url(pdf_url, paper_title):
+# Regex patterns to detect section headings
+section_pattern = re.compile(r"^\d+(\.\d+)*\s+[A-Z].*", re.MULTILINE)
+# Regex pattern to detect non-numeric, all-uppercase headings
+uppercase_heading_pattern = re.compile(r"^[A-Z\s]+$")  # Matches all-uppercase headings
+
+# Documents shorter than this are parsed in-process, where the pool overhead would dominate
+PARALLEL_MIN_PAGES = 16
+PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", str(os.cpu_count() or 1)))
+
+# Workers are spawned rather than forked: the parent may be running other
+# threads (e.g. a server's or prefetch's thread pool) whose locks a fork would copy
+_mp_context = multiprocessing.get_context("spawn")
+_pool = None
+_pool_lock = threading.Lock()
+
+def extract_paper_content_from_url(pdf_url, paper_title, cache=None):
     """
     Extract content and section headings from PDF using PyPDF2
 
+    Both the downloaded PDF and the parsed result are kept in the on-disk
+    PDF cache, so a paper that was already parsed needs neither the network
+    nor the PDF parser.
+
     Args:
         pdf_url (str): URL of the PDF
         paper_title (str): Manually provided paper title
+        cache (PdfCache): Cache to use, defaults to the one configured by
+            PDF_CACHE_DIR
 
     Returns:
         dict: Paper title with extracted content and section headings
     """
     try:
-        # Fetch the PDF from the URL
-        response = requests.get(pdf_url)
-        response.raise_for_status()  # Check if the request was successful
-
-        # Read the PDF from the binary content
-        pdf_stream = BytesIO(response.content)
-        pdf_reader = PyPDF2.PdfReader(pdf_stream)
-
-        content = []
-        section_headings = {}
-        current_heading = None
-
-        # Regex patterns to detect section headings
-        section_pattern = re.compile(r"^\d+(\.\d+)*\s+[A-Z].*", re.MULTILINE)
-        # Regex pattern to detect non-numeric, all-uppercase headings
-        uppercase_heading_pattern = re.compile(r"^[A-Z\s]+$")  # Matches all-uppercase headings
-
-
-        # Iterate over each page
-        for page_num in range(len(pdf_reader.pages)):
-            page = pdf_reader.pages[page_num]
-            text = page.extract_text()
-
-            # Collect content lines and detect section headings
-            for line in text.splitlines():
-                line = line.strip()
-                if line:
-                    # Check for section headings
-                    if section_pattern.match(line):
-                        current_heading = line  # Start new section
-                        section_headings[current_heading] = []
-                    elif uppercase_heading_pattern.match(line):
-                        current_heading = line # Clean uppercase heading
-                        section_headings[current_heading] = []  # Create a new section
-                    elif current_heading:
-                        # Append content to the current section
-                        section_headings[current_heading].append(line)
-                    else:
-                        content.append(line)
-
-        # Combine section contents into single paragraphs
-        for heading in section_headings:
-            section_headings[heading] = " ".join(section_headings[heading])
-
-        # Format content and headings
-        formatted_content = "\n".join(content)
-        structured_content = {
-            "title": paper_title,
-            "content": formatted_content,
-            "sections": section_headings
-        }
+        if cache is None:
+            cache = get_pdf_cache()
+        if cache is not None:
+            parsed = cache.get_parsed(pdf_url)
+            if parsed is not None:
+                return {"title": paper_title, **parsed}
+
+        pdf_bytes = cache.get_pdf(pdf_url) if cache is not None else None
+        if pdf_bytes is None:
+            pdf_bytes = fetch_pdf(pdf_url)
+            if cache is not None:
+                cache.put_pdf(pdf_url, pdf_bytes)
+
+        structured_content = parse_pdf(pdf_bytes, paper_title)
+        if cache is not None:
+            cache.put_parsed(pdf_url, {"content": structured_content["content"],
+                                       "sections": structured_content["sections"]})
         return structured_content
     except Exception as e:
         print(f"Error extracting content from URL {pdf_url}: {e}")
         return None
+
+
+def fetch_pdf(pdf_url):
+    # Fetch the PDF from the URL
+    response = requests.get(pdf_url)
+    response.raise_for_status()  # Check if the request was successful
+    return response.content
+
+
+def parse_pdf(pdf_bytes, paper_title, workers=PARSE_WORKERS):
+    """
+    Split the text of a PDF into untitled leading content and sections.
+
+    Text extraction and heading detection run per page; for long documents
+    the pages are spread across a process pool and the per-page results are
+    merged in page order.
+
+    Args:
+        pdf_bytes (bytes): Raw PDF content
+        paper_title (str): Manually provided paper title
+        workers (int): Number of worker processes for long documents
+
+    Returns:
+        dict: Paper title with extracted content and section headings
+    """
+    return _parse(pdf_bytes, paper_title, workers)[0]
+
+
+def _parse(pdf_bytes, paper_title, workers):
+    # parse_pdf, also returning the page count for callers that report throughput
+    page_count = len(PyPDF2.PdfReader(BytesIO(pdf_bytes)).pages)
+
+    if workers > 1 and page_count >= PARALLEL_MIN_PAGES:
+        chunk = -(-page_count // workers)
+        ranges = [(start, min(start + chunk, page_count)) for start in range(0, page_count, chunk)]
+        pool = _get_pool(workers)
+        futures = [pool.submit(classify_pages, pdf_bytes, start, stop) for start, stop in ranges]
+        lines = [line for future in futures for line in future.result()]
+    else:
+        lines = classify_pages(pdf_bytes, 0, page_count)
+
+    return merge_sections(lines, paper_title), page_count
+
+
+def classify_pages(pdf_bytes, start, stop):
+    """
+    Extract the text of pages [start, stop) and tag each non-empty line as
+    a "heading" or "text" line.
+    """
+    # Read the PDF from the binary content
+    pdf_reader = PyPDF2.PdfReader(BytesIO(pdf_bytes))
+
+    lines = []
+    for page_num in range(start, stop):
+        text = pdf_reader.pages[page_num].extract_text() or ""
+        for line in text.splitlines():
+            line = line.strip()
+            if line:
+                # Check for section headings
+                if section_pattern.match(line) or uppercase_heading_pattern.match(line):
+                    lines.append(("heading", line))
+                else:
+                    lines.append(("text", line))
+    return lines
+
+
+def merge_sections(lines, paper_title):
+    content = []
+    section_headings = {}
+    current_heading = None
+
+    for kind, line in lines:
+        if kind == "heading":
+            current_heading = line  # Start new section
+            section_headings[current_heading] = []
+        elif current_heading:
+            # Append content to the current section
+            section_headings[current_heading].append(line)
+        else:
+            content.append(line)
+
+    # Combine section contents into single paragraphs
+    for heading in section_headings:
+        section_headings[heading] = " ".join(section_headings[heading])
+
+    # Format content and headings
+    formatted_content = "\n".join(content)
+    structured_content = {
+        "title": paper_title,
+        "content": formatted_content,
+        "sections": section_headings
+    }
+    return structured_content
+
+
+def _get_pool(workers):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context)
+            atexit.register(_shutdown_pool)
+        return _pool
+
+
+def _shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def _parse_file(path):
+    with open(path, "rb") as f:
+        pdf_bytes = f.read()
+    title = os.path.splitext(os.path.basename(path))[0]
+    return _parse(pdf_bytes, title, workers=1)
+
+
+def parse_pdfs(paths, workers=PARSE_WORKERS):
+    """
+    Parse many PDFs with at most workers files in flight at once.
+
+    Args:
+        paths (list or str): PDF file paths, or a directory of PDFs
+        workers (int): Number of worker processes
+
+    Returns:
+        dict: Path -> structured content, or None for files that failed
+    """
+    if isinstance(paths, str) and os.path.isdir(paths):
+        directory = paths
+        paths = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                       if name.lower().endswith(".pdf"))
+
+    start = time.perf_counter()
+    documents = {}
+    total_pages = 0
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context) as executor:
+        futures = {path: executor.submit(_parse_file, path) for path in paths}
+        for path, future in futures.items():
+            try:
+                documents[path], pages = future.result()
+                total_pages += pages
+            except Exception as e:
+                print(f"Error parsing {path}: {e}")
+                documents[path] = None
+
+    elapsed = time.perf_counter() - start
+    print(f"Parsed {len(paths)} PDFs, {total_pages} pages ({total_pages / elapsed:.1f} pages/sec)")
+    return documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse PDFs into title/content/sections JSON.")
+    parser.add_argument("paths", nargs="+", help="PDF files or a directory of PDFs")
+    parser.add_argument("--workers", type=int, default=PARSE_WORKERS, help="Number of worker processes")
+    parser.add_argument("--output", help="Write one JSON document per line to this file")
+    args = parser.parse_args()
+
+    paths = args.paths[0] if len(args.paths) == 1 and os.path.isdir(args.paths[0]) else args.paths
+    documents = parse_pdfs(paths, workers=args.workers)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            for document in documents.values():
+                if document is not None:
+                    f.write(json.dumps(document, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class PdfCache:
+    """
+    Content-addressed on-disk cache of paper PDFs and their parsed structure.
+
+    Layout under root:
+        refs/<sha256 of url>      digest of the PDF downloaded from that url
+        pdf/<digest>.pdf          raw PDF bytes
+        parsed/<digest>.json      parsed {"content", "sections"} structure
+
+    Files are touched on every read. The size of the PDFs and parsed
+    documents is kept as a running total, and once it grows past max_bytes
+    the least recently used ones are evicted down to low_water of max_bytes,
+    together with the refs that no longer point at anything.
+    """
+
+    low_water = 0.9
+
+    def __init__(self, root, max_bytes=2 * 1024 ** 3):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = None  # bytes in pdf/ and parsed/, measured on the first write
+        for sub in ("refs", "pdf", "parsed"):
+            os.makedirs(os.path.join(root, sub), exist_ok=True)
+
+    def get_pdf(self, url):
+        path = self._blob_path(url, "pdf", ".pdf")
+        if path is None:
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def put_pdf(self, url, data):
+        digest = hashlib.sha256(data).hexdigest()
+        self._put_blob(os.path.join(self.root, "pdf", f"{digest}.pdf"), data)
+        self._write(self._ref_path(url), digest.encode("ascii"))
+        self._evict_if_full()
+        return digest
+
+    def get_parsed(self, url):
+        path = self._blob_path(url, "parsed", ".json")
+        if path is None:
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def put_parsed(self, url, parsed):
+        digest = self._digest(url)
+        if digest is None:
+            return
+        data = json.dumps(parsed, ensure_ascii=False).encode("utf-8")
+        self._put_blob(os.path.join(self.root, "parsed", f"{digest}.json"), data)
+        self._evict_if_full()
+
+    def evict(self):
+        """
+        Delete the least recently used files until the cache fits in
+        low_water of max_bytes, then drop refs whose PDF and parsed document
+        are both gone.
+        """
+        with self._lock:
+            files = []
+            for sub in ("pdf", "parsed"):
+                directory = os.path.join(self.root, sub)
+                for name in os.listdir(directory):
+                    path = os.path.join(directory, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in files)
+            removed = False
+            if total > self.max_bytes:
+                for _, size, path in sorted(files):
+                    if total <= self.max_bytes * self.low_water:
+                        break
+                    try:
+                        os.remove(path)
+                        removed = True
+                    except FileNotFoundError:
+                        pass
+                    total -= size
+            self._size = total
+            if removed:
+                self._prune_refs()
+
+    def _prune_refs(self):
+        directory = os.path.join(self.root, "refs")
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            try:
+                with open(path, encoding="ascii") as f:
+                    digest = f.read().strip()
+            except (FileNotFoundError, UnicodeDecodeError):
+                continue
+            if not (os.path.exists(os.path.join(self.root, "pdf", f"{digest}.pdf")) or
+                    os.path.exists(os.path.join(self.root, "parsed", f"{digest}.json"))):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def _evict_if_full(self):
+        with self._lock:
+            full = self._size is None or self._size > self.max_bytes
+        if full:
+            self.evict()
+
+    def _ref_path(self, url):
+        return os.path.join(self.root, "refs", hashlib.sha256(url.encode("utf-8")).hexdigest())
+
+    def _digest(self, url):
+        try:
+            with open(self._ref_path(url), encoding="ascii") as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def _blob_path(self, url, sub, suffix):
+        digest = self._digest(url)
+        if digest is None:
+            return None
+        path = os.path.join(self.root, sub, f"{digest}{suffix}")
+        try:
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            return None
+        return path
+
+    def _put_blob(self, path, data):
+        with self._lock:
+            try:
+                replaced = os.path.getsize(path)
+            except FileNotFoundError:
+                replaced = 0
+            self._write(path, data)
+            if self._size is not None:
+                self._size += len(data) - replaced
+
+    def _write(self, path, data):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_pdf_cache():
+    """
+    Return the cache configured by PDF_CACHE_DIR, creating it on first use,
+    or None when PDF_CACHE_DIR is set to an empty string.
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            root = os.getenv("PDF_CACHE_DIR", ".pdf_cache")
+            if not root:
+                return None
+            _default_cache = PdfCache(root, max_bytes=int(os.getenv("PDF_CACHE_MAX_BYTES", str(2 * 1024 ** 3))))
+        return _default_cache
+
+
+def prefetch(conn, workers=4):
+    """
+    Download and parse the PDF of every Paper node into the cache.
+    """
+    from pdfTojson import extract_paper_content_from_url
+
+    papers = conn.query("""
+    MATCH (p:Paper)
+    WHERE p.url IS NOT NULL
+    RETURN p.url AS url, p.title AS title
+    """)
+    print(f"Prefetching {len(papers)} papers")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(
+            lambda record: extract_paper_content_from_url(record["url"], record["title"]), papers))
+    print(f"Cached {sum(1 for r in results if r is not None)} of {len(papers)} papers")
+
+
+def main():
+    from neo4j_connection import Neo4jConnection
+
+    parser = argparse.ArgumentParser(description="Warm the PDF cache for every Paper node.")
+    parser.add_argument("--workers", type=int, default=4, help="Number of parallel downloads")
+    args = parser.parse_args()
+
+    with Neo4jConnection(os.getenv("NEO4J_URI"), os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD")) as conn:
+        prefetch(conn, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
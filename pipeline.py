@@ -0,0 +1,98 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+class Pipeline:
+    """
+    Small dependency graph of stages run on a thread pool.
+
+    Each stage is a function called with the results of its dependencies as
+    keyword arguments, and starts as soon as they have finished, so
+    independent stages overlap and the total time is that of the longest
+    chain. Per-stage timings and the critical path are printed after a run.
+
+    Example:
+        pipeline = Pipeline("theme")
+        pipeline.add("query_info", lambda: extract(query))
+        pipeline.add("embedding", lambda: embed(query))
+        pipeline.add("results", lambda query_info, embedding: retrieve(query_info, embedding),
+                     deps=["query_info", "embedding"])
+        results = pipeline.run()["results"]
+    """
+
+    def __init__(self, name, max_workers=4):
+        self.name = name
+        self.max_workers = max_workers
+        self.stages = {}
+        self.timings = {}
+
+    def add(self, name, func, deps=()):
+        for dep in deps:
+            if dep not in self.stages:
+                raise ValueError(f"Stage {name} depends on unknown stage {dep}")
+        self.stages[name] = (func, list(deps))
+        return self
+
+    def run(self):
+        """
+        Run every stage and return a dict of stage name -> result.
+
+        The first stage that raises stops new stages from starting, and its
+        exception is re-raised once the running ones have finished.
+        """
+        results = {}
+        self.timings = {}
+        start = time.perf_counter()
+        waiting = dict(self.stages)
+        running = {}
+        error = None
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while waiting or running:
+                if error is None:
+                    for name, (func, deps) in list(waiting.items()):
+                        if all(dep in results for dep in deps):
+                            kwargs = {dep: results[dep] for dep in deps}
+                            running[executor.submit(self._timed, name, func, kwargs, start)] = name
+                            del waiting[name]
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        error = error or e
+        if error is not None:
+            raise error
+
+        self.report(time.perf_counter() - start)
+        return results
+
+    def critical_path(self):
+        """
+        Return the chain of stages that determined the total time: from the
+        stage that finished last, back through the dependency that finished
+        last at each step.
+        """
+        if not self.timings:
+            return []
+        name = max(self.timings, key=lambda stage: self.timings[stage][1])
+        path = [name]
+        while self.stages[name][1]:
+            name = max(self.stages[name][1], key=lambda stage: self.timings[stage][1])
+            path.append(name)
+        return path[::-1]
+
+    def report(self, total):
+        stages = ", ".join(f"{name} {end - begin:.2f}s"
+                           for name, (begin, end) in sorted(self.timings.items(), key=lambda item: item[1][0]))
+        print(f"Pipeline {self.name} took {total:.2f}s ({stages}); "
+              f"critical path: {' -> '.join(self.critical_path())}")
+
+    def _timed(self, name, func, kwargs, start):
+        begin = time.perf_counter() - start
+        try:
+            return func(**kwargs)
+        finally:
+            self.timings[name] = (begin, time.perf_counter() - start)
@@ -0,0 +1,353 @@
+from itertools import combinations
+from date_utils import parse_date
+
+# Fixed, parameterized Cypher for the common shape of each tool's query.
+# Every template is a constant string whose filters are driven by
+# parameters, so Neo4j reuses one cached plan per template. The LLM query
+# generators are only needed when query_info holds something a template
+# cannot express.
+
+LIST_FIELDS = ["keywords", "papers", "datasets", "domains", "authors", "conferences"]
+KNOWN_FIELDS = set(LIST_FIELDS) | {"content", "date_range", "min_citations"}
+
+# Range filters on indexed Paper properties. A predicate such as
+# "$param IS NULL OR p.prop >= $param" cannot be planned as an index seek, so
+# each template is generated once per set of active range filters, holding
+# only their predicates. The set of query strings stays fixed.
+RANGE_FILTERS = {
+    "date_range_start": "p.date_published >= $date_range_start",
+    "date_range_end": "p.date_published <= $date_range_end",
+    "min_citations": "p.number_of_citations >= $min_citations",
+}
+
+FILTER_SHAPES = [shape for size in range(len(RANGE_FILTERS) + 1)
+                 for shape in combinations(RANGE_FILTERS, size)]
+
+
+def range_filters(shape):
+    return "".join(f"    AND {RANGE_FILTERS[name]}\n" for name in shape)
+
+
+def filter_shape(parameters):
+    """
+    Return the names of the range filters that have a value in parameters.
+    """
+    return tuple(name for name in RANGE_FILTERS if parameters.get(name) is not None)
+
+
+# Filters shared by the paper-centric templates, applied to p
+PAPER_FILTERS = """
+    AND ($papers = [] OR ANY(title IN $papers WHERE toLower(p.title) CONTAINS title))
+    AND ($authors = [] OR EXISTS {
+        MATCH (fa:Author)-[:AUTHORED]->(p) WHERE toLower(fa.name) IN $authors })
+    AND ($conferences = [] OR EXISTS {
+        MATCH (p)-[:PRESENTED_AT]->(fc:Conference)
+        WHERE ANY(conference IN $conferences WHERE toLower(fc.name) CONTAINS conference) })
+    AND ($datasets = [] OR EXISTS {
+        MATCH (p)-[:USES_DATASET]->(fd:Dataset)
+        WHERE ANY(dataset IN $datasets WHERE toLower(fd.name) CONTAINS dataset) })
+"""
+
+KEYWORD_FILTER = """
+    AND ($keywords = [] OR ANY(keyword IN $keywords
+        WHERE toLower(p.title) CONTAINS keyword OR toLower(p.abstract) CONTAINS keyword))
+"""
+
+DOMAIN_FILTER = """
+    AND ($domains = [] OR EXISTS {
+        MATCH (p)-[:HAS_DOMAIN]->(fdm:Domain)
+        WHERE ANY(domain IN $domains WHERE toLower(fdm.name) CONTAINS domain) })
+"""
+
+# Keyword search goes through the paper_text full-text index, which returns
+# a BM25 score per paper, instead of scanning every title and abstract.
+FULLTEXT_INDEX = "paper_text"
+
+FULLTEXT_MATCH = f"""
+CALL db.index.fulltext.queryNodes('{FULLTEXT_INDEX}', $search) YIELD node AS p, score
+"""
+
+PAPER_SEARCH_QUERY = f"""{FULLTEXT_MATCH}
+RETURN p.id AS Id, p.title AS Title, score AS Score
+ORDER BY Score DESC
+LIMIT $limit
+"""
+
+
+def _dataset_search_query(filters):
+    return f"""{FULLTEXT_MATCH}
+MATCH (p)-[:USES_DATASET]->(d:Dataset)
+WHERE 1=1
+{DOMAIN_FILTER}{filters}{PAPER_FILTERS}
+OPTIONAL MATCH (a:Author)-[:AUTHORED]->(p)
+OPTIONAL MATCH (p)-[:HAS_KEYWORD]->(k:Keyword)
+RETURN p.id AS Id, d.name AS Dataset, p.title AS Paper, p.abstract AS Abstract,
+       collect(DISTINCT a.name) AS Authors, toString(p.date_published) AS Date_published,
+       p.number_of_citations AS Citations, collect(DISTINCT k.name) AS Keywords,
+       score AS Score
+ORDER BY Score DESC, Date_published DESC
+LIMIT 100
+"""
+
+
+DATASET_SEARCH_QUERY = _dataset_search_query("")
+
+
+def _dataset_query(filters):
+    return f"""
+MATCH (p:Paper)-[:USES_DATASET]->(d:Dataset)
+WHERE 1=1
+{KEYWORD_FILTER}{DOMAIN_FILTER}{filters}{PAPER_FILTERS}
+OPTIONAL MATCH (a:Author)-[:AUTHORED]->(p)
+OPTIONAL MATCH (p)-[:HAS_KEYWORD]->(k:Keyword)
+RETURN p.id AS Id, d.name AS Dataset, p.title AS Paper, p.abstract AS Abstract,
+       collect(DISTINCT a.name) AS Authors, toString(p.date_published) AS Date_published,
+       p.number_of_citations AS Citations, collect(DISTINCT k.name) AS Keywords
+ORDER BY Date_published DESC
+LIMIT 100
+"""
+
+
+DATASET_QUERY = _dataset_query("")
+
+
+# Papers match on their domain, falling back to the keywords when no domain
+# was extracted, or on the keywords appearing in the title or abstract.
+def _theme_query(filters):
+    return f"""
+MATCH (p:Paper)
+WHERE (EXISTS {{
+        MATCH (p)-[:HAS_DOMAIN]->(fdm:Domain)
+        WHERE toLower(fdm.name) IN CASE WHEN $domains = [] THEN $keywords ELSE $domains END }}
+    OR ($domains = [] AND ANY(keyword IN $keywords
+        WHERE toLower(p.title) CONTAINS keyword OR toLower(p.abstract) CONTAINS keyword)))
+{filters}{PAPER_FILTERS}
+OPTIONAL MATCH (a:Author)-[:AUTHORED]->(p)
+OPTIONAL MATCH (p)-[:HAS_KEYWORD]->(k:Keyword)
+OPTIONAL MATCH (p)-[:HAS_DOMAIN]->(dm:Domain)
+OPTIONAL MATCH (p)-[:PRESENTED_AT]->(c:Conference)
+RETURN
+    p.id AS Id,
+    p.title AS Title,
+    p.abstract AS Abstract,
+    p.conclusion AS Conclusion,
+    toString(p.date_published) AS Date_published,
+    p.number_of_citations AS Citations,
+    p.url AS URL,
+    collect(DISTINCT a.name) AS Authors,
+    collect(DISTINCT k.name) AS Keywords,
+    collect(DISTINCT dm.name) AS Domains,
+    collect(DISTINCT c.name) AS Conferences
+LIMIT 100
+"""
+
+
+THEME_QUERY = _theme_query("")
+
+
+# Used when no domain was extracted: papers whose domain is one of the
+# keywords are added to the full-text matches with a score of 0.
+def _theme_search_query(filters):
+    return f"""
+CALL {{
+    {FULLTEXT_MATCH.strip()}
+    RETURN p, score
+    UNION
+    MATCH (p:Paper)-[:HAS_DOMAIN]->(fdm:Domain)
+    WHERE toLower(fdm.name) IN $keywords
+    RETURN p, 0.0 AS score
+}}
+WITH p, max(score) AS score
+WHERE 1=1
+{filters}{PAPER_FILTERS}
+OPTIONAL MATCH (a:Author)-[:AUTHORED]->(p)
+OPTIONAL MATCH (p)-[:HAS_KEYWORD]->(k:Keyword)
+OPTIONAL MATCH (p)-[:HAS_DOMAIN]->(dm:Domain)
+OPTIONAL MATCH (p)-[:PRESENTED_AT]->(c:Conference)
+RETURN
+    p.id AS Id,
+    p.title AS Title,
+    p.abstract AS Abstract,
+    p.conclusion AS Conclusion,
+    toString(p.date_published) AS Date_published,
+    p.number_of_citations AS Citations,
+    p.url AS URL,
+    collect(DISTINCT a.name) AS Authors,
+    collect(DISTINCT k.name) AS Keywords,
+    collect(DISTINCT dm.name) AS Domains,
+    collect(DISTINCT c.name) AS Conferences,
+    score AS Score
+ORDER BY Score DESC
+LIMIT 100
+"""
+
+
+THEME_SEARCH_QUERY = _theme_search_query("")
+
+
+def _author_search_query(filters):
+    return f"""{FULLTEXT_MATCH}
+MATCH (a:Author)-[:AUTHORED]->(p)
+WHERE 1=1
+{DOMAIN_FILTER}{filters}{PAPER_FILTERS}
+OPTIONAL MATCH (p)-[:PRESENTED_AT]->(c:Conference)
+RETURN p.id AS Id, a.name AS Author, p.title AS PaperTitle, p.abstract AS Abstract,
+       collect(DISTINCT c.name) AS Conferences, score AS Score
+ORDER BY Score DESC
+LIMIT 100
+"""
+
+
+AUTHOR_SEARCH_QUERY = _author_search_query("")
+
+
+def _author_query(filters):
+    return f"""
+MATCH (a:Author)-[:AUTHORED]->(p:Paper)
+WHERE 1=1
+{KEYWORD_FILTER}{DOMAIN_FILTER}{filters}{PAPER_FILTERS}
+OPTIONAL MATCH (p)-[:PRESENTED_AT]->(c:Conference)
+RETURN p.id AS Id, a.name AS Author, p.title AS PaperTitle, p.abstract AS Abstract,
+       collect(DISTINCT c.name) AS Conferences
+LIMIT 100
+"""
+
+
+AUTHOR_QUERY = _author_query("")
+
+
+PAPER_TITLE_QUERY = """
+MATCH (p:Paper)
+WHERE toLower(p.title) IN $paper_titles
+RETURN p
+LIMIT 100
+"""
+
+# tool -> (search builder used when there are keywords to search, scan builder used otherwise)
+_BUILDERS = {
+    "dataset": (_dataset_search_query, _dataset_query),
+    "theme": (_theme_search_query, _theme_query),
+    "author": (_author_search_query, _author_query),
+}
+
+# tool -> filter shape -> (search query, scan query)
+TEMPLATES = {
+    tool: {shape: (search(range_filters(shape)), scan(range_filters(shape))) for shape in FILTER_SHAPES}
+    for tool, (search, scan) in _BUILDERS.items()
+}
+
+
+def query_parameters(query_info):
+    """
+    Build the Cypher parameters shared by the templates and the generated queries.
+    """
+    parameters = {key: _normalize_list(query_info.get(key)) for key in LIST_FIELDS}
+    parameters["date_range_start"] = None
+    parameters["date_range_end"] = None
+    parameters["min_citations"] = query_info.get("min_citations")
+    parameters["search"] = fulltext_search(parameters["keywords"])
+
+    # Safely get date range values
+    date_range = query_info.get("date_range")
+    if isinstance(date_range, dict):
+        parameters["date_range_start"] = parse_date(date_range.get("start"))
+        parameters["date_range_end"] = parse_date(date_range.get("end"), end=True)
+
+    # Ranges such as "last year" leave the bounds null; the generated query
+    # gets the raw text instead so the filter is not silently dropped
+    parameters["date_range_text"] = unparsed_date_range(date_range)
+    if parameters["date_range_text"]:
+        print(f"Could not parse date range {parameters['date_range_text']!r}; "
+              "leaving it to the generated query")
+
+    return parameters
+
+
+def unparsed_date_range(date_range):
+    """
+    Return the raw text of a date range parse_date cannot read, or None.
+    """
+    if isinstance(date_range, str):
+        return date_range.strip() or None
+    if not isinstance(date_range, dict):
+        return None
+    unparsed = {key: value for key, value in date_range.items()
+                if value not in (None, "") and parse_date(value) is None}
+    if not unparsed:
+        return None
+    return ", ".join(f"{key}: {value}" for key, value in unparsed.items())
+
+
+def can_use_template(query_info):
+    """
+    Return True if query_info only holds fields the templates can filter on.
+    """
+    for key, value in query_info.items():
+        if key not in KNOWN_FIELDS and value not in (None, [], {}, ""):
+            return False
+    for key in LIST_FIELDS:
+        value = query_info.get(key)
+        if value is not None and not (isinstance(value, list) and all(isinstance(v, str) for v in value)):
+            return False
+    date_range = query_info.get("date_range")
+    if date_range is not None:
+        if not isinstance(date_range, dict):
+            return False
+        if any(v is not None and parse_date(v) is None for v in date_range.values()):
+            return False
+    min_citations = query_info.get("min_citations")
+    if min_citations is not None and (isinstance(min_citations, bool) or not isinstance(min_citations, int)):
+        return False
+    return True
+
+
+def template_query(tool, query_info):
+    """
+    Return the fixed Cypher for tool ("dataset", "theme" or "author"), or
+    None when the query needs LLM generation.
+
+    The variant is picked by the range filters query_parameters fills in, so
+    it must be run with those parameters.
+    """
+    if not can_use_template(query_info):
+        return None
+    parameters = query_parameters(query_info)
+    search_query, scan_query = TEMPLATES[tool][filter_shape(parameters)]
+    search = parameters["search"]
+    # The theme query only searches the keywords when no domain was given
+    if tool == "theme" and _normalize_list(query_info.get("domains")):
+        search = None
+    return search_query if search else scan_query
+
+
+def fulltext_search(keywords):
+    """
+    Turn keywords into a Lucene query for the full-text index, matching any
+    keyword as an exact phrase.
+    """
+    phrases = []
+    for keyword in keywords:
+        if not isinstance(keyword, str) or not keyword.strip():
+            continue
+        escaped = keyword.strip().replace("\\", "\\\\").replace('"', '\\"')
+        phrases.append(f'"{escaped}"')
+    return " OR ".join(phrases) or None
+
+
+def parse_paper_titles(paper_titles):
+    """
+    Split the comma separated titles returned by extract_paper_info into
+    lower case titles, or return an empty list when none were found.
+    """
+    if not paper_titles or paper_titles.strip().lower() == "null":
+        return []
+    titles = [title.strip().strip("\"'").strip().lower() for title in paper_titles.split(",")]
+    return [title for title in titles if title]
+
+
+def _normalize_list(value):
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        value = [value]
+    return [v.strip().lower() if isinstance(v, str) else v for v in value]
@@ -0,0 +1,259 @@
+import math
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from cache import LRUCache
+
+load_dotenv()
+
+# Weight of each ranking signal; RETRIEVAL_WEIGHTS overrides any of them,
+# e.g. "text=0.5,vector=0.2"
+DEFAULT_WEIGHTS = {
+    "text": 0.35,       # BM25 score from the full-text index
+    "vector": 0.30,     # cosine similarity of the paper and query embeddings
+    "citations": 0.15,  # log of number_of_citations
+    "terms": 0.10,      # keywords and domains shared with the query terms
+    "cites": 0.10,      # CITES links to the other candidate papers
+}
+
+# Number of papers whose rows are passed on to the recommendation prompts
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "20"))
+
+# The graph signals of every candidate are read in one query; the query is
+# only embedded, and similarities read, when some candidate has an embedding
+SIGNALS_QUERY = """
+UNWIND $ids AS id
+MATCH (p:Paper {id: id})
+RETURN p.id AS id,
+       p.number_of_citations AS citations,
+       p.embedding IS NOT NULL AS has_embedding,
+       COUNT { (p)-[:HAS_KEYWORD|HAS_DOMAIN]->(t) WHERE toLower(t.name) IN $terms } AS shared_terms,
+       COUNT { (p)-[:CITES]-(q:Paper) WHERE q.id IN $ids AND q.id <> p.id } AS candidate_links
+"""
+
+# Papers still embedded by a previous model are left out until re-embedded
+SIMILARITY_QUERY = """
+UNWIND $ids AS id
+MATCH (p:Paper {id: id})
+WHERE p.embedding IS NOT NULL AND p.embedding_model = $model
+RETURN p.id AS id, vector.similarity.cosine(p.embedding, $embedding) AS similarity
+"""
+
+
+def parse_weights(value):
+    weights = dict(DEFAULT_WEIGHTS)
+    for item in (value or "").split(","):
+        if "=" not in item:
+            continue
+        name, weight = item.split("=", 1)
+        name = name.strip()
+        if name not in weights:
+            print(f"Ignoring unknown retrieval weight: {name}")
+            continue
+        weights[name] = float(weight)
+    return weights
+
+
+RETRIEVAL_WEIGHTS = parse_weights(os.getenv("RETRIEVAL_WEIGHTS"))
+
+
+def min_max(values):
+    """
+    Scale values to [0, 1]; missing values count as 0 and equal values as 1.
+    """
+    present = [value for value in values.values() if value is not None]
+    if not present:
+        return {key: 0.0 for key in values}
+    low, high = min(present), max(present)
+    if high == low:
+        return {key: 0.0 if value is None else 1.0 for key, value in values.items()}
+    return {key: 0.0 if value is None else (value - low) / (high - low) for key, value in values.items()}
+
+
+class QueryEmbedder:
+    """
+    Embed query text for the vector signal, caching embeddings of repeated
+    queries. The embedder is created on first use. A failure disables the
+    vector signal for retry_after seconds, doubling with each consecutive
+    failure up to max_retry_after.
+
+    An embedder that is not configured, or whose model or dimensions differ
+    from those recorded for the vector index, disables the signal for good:
+    its similarities would be meaningless or fail in Neo4j.
+    """
+
+    def __init__(self, maxsize=256, retry_after=30, max_retry_after=1800):
+        self.cache = LRUCache(maxsize=maxsize)
+        self.retry_after = retry_after
+        self.max_retry_after = max_retry_after
+        self._embedder = None
+        self._failures = 0
+        self._retry_at = 0.0
+        self._error = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        return self._embedder.name if self._embedder is not None else None
+
+    def embed(self, text, openai=None, conn=None):
+        if not text or self._error is not None or time.monotonic() < self._retry_at:
+            return None
+        embedding = self.cache.get(text)
+        if embedding is not None:
+            return embedding
+        try:
+            with self._lock:
+                if self._embedder is None:
+                    self._embedder = self._load(openai, conn)
+            embedding = self._embedder.embed([text])[0]
+        except ValueError as e:
+            with self._lock:
+                self._error = str(e)
+            print(f"Query embedding disabled, ranking without it: {e}")
+            return None
+        except Exception as e:
+            with self._lock:
+                self._failures += 1
+                delay = min(self.retry_after * 2 ** (self._failures - 1), self.max_retry_after)
+                self._retry_at = time.monotonic() + delay
+            print(f"Query embedding unavailable, ranking without it for {delay:.0f}s: {e}")
+            return None
+        self._failures = 0
+        self.cache.set(text, embedding)
+        return embedding
+
+    @staticmethod
+    def _load(openai, conn):
+        from paper_embeddings import get_embedder, index_model
+        embedder = get_embedder(openai)
+        if conn is not None:
+            model, dimensions = index_model(conn)
+            if dimensions is not None and dimensions != embedder.dimensions:
+                raise ValueError(f"{embedder.name} has {embedder.dimensions} dimensions "
+                                 f"but the vector index has {dimensions}")
+            if model is not None and model != embedder.name:
+                raise ValueError(f"the vector index holds {model} embeddings, not {embedder.name}")
+        return embedder
+
+
+query_embedder = QueryEmbedder()
+
+
+def embed_query(text, openai=None, weights=None, conn=None):
+    """
+    Embed query text, unless the vector signal is disabled.
+    """
+    if not (weights or RETRIEVAL_WEIGHTS).get("vector"):
+        return None
+    return query_embedder.embed(text, openai, conn)
+
+
+def warm_query_embedding(text, openai=None, weights=None, conn=None):
+    """
+    Embed query text ahead of ranking, to be passed to rank_results as
+    query_embedding. Returns None without calling the model while the vector
+    index has no embeddings yet.
+    """
+    if conn is not None:
+        from paper_embeddings import index_model
+        try:
+            model, _ = index_model(conn)
+        except Exception as e:
+            print(f"Error reading the vector index model: {e}")
+            return None
+        if model is None:
+            return None
+    return embed_query(text, openai, weights, conn)
+
+
+def rank_results(conn, query_info, results, openai=None, weights=None, top_k=RETRIEVAL_TOP_K, query_text=None,
+                 query_embedding=None):
+    """
+    Rank retrieved rows by a weighted mix of full-text score, embedding
+    similarity, citations and graph proximity, and keep the rows of the
+    top_k papers.
+
+    Each signal is min-max normalized over the candidate papers before it is
+    weighted, and every kept row gets the paper's score as Relevance. Rows
+    without an Id (e.g. from a generated query) are returned in their
+    original order, cut to top_k rows.
+
+    Args:
+        conn: Neo4jConnection object
+        query_info (dict): Extracted or expanded query information
+        results (list): Records or dicts returned by the retrieval query
+        openai: LLM client, used when embeddings come from the OpenAI API
+        weights (dict): Signal weights, defaults to RETRIEVAL_WEIGHTS
+        top_k (int): Number of papers to keep
+        query_text (str): Text embedded for the vector signal, defaults to
+            query_info["content"]
+        query_embedding (list): Embedding of query_text computed ahead of
+            ranking (see warm_query_embedding); embedded here when None
+
+    Returns:
+        list: Row dicts, best paper first
+    """
+    rows = [row.data() if hasattr(row, "data") else dict(row) for row in results]
+    weights = weights or RETRIEVAL_WEIGHTS
+    ids = list(dict.fromkeys(row["Id"] for row in rows if row.get("Id") is not None))
+    if not ids:
+        print(f"Kept {min(len(rows), top_k)} results")
+        return rows[:top_k]
+
+    text_scores = {}
+    for row in rows:
+        if row.get("Id") is not None and row.get("Score") is not None:
+            text_scores[row["Id"]] = max(row["Score"], text_scores.get(row["Id"], 0.0))
+
+    terms = [term.lower() for key in ("keywords", "domains")
+             for term in query_info.get(key) or [] if isinstance(term, str)]
+
+    try:
+        signals = {record["id"]: record for record in conn.query(SIGNALS_QUERY, parameters={
+            "ids": ids, "terms": terms})}
+    except Exception as e:
+        print(f"Error reading ranking signals: {e}")
+        signals = {}
+
+    similarities = {}
+    embedded_ids = [paper_id for paper_id, record in signals.items() if record["has_embedding"]]
+    if embedded_ids:
+        embedding = query_embedding
+        if embedding is None:
+            embedding = embed_query(query_text or query_info.get("content"), openai, weights, conn)
+        if embedding is not None:
+            try:
+                similarities = {record["id"]: record["similarity"] for record in conn.query(
+                    SIMILARITY_QUERY, parameters={"ids": embedded_ids, "embedding": embedding,
+                                                  "model": query_embedder.model})}
+            except Exception as e:
+                print(f"Error reading embedding similarities: {e}")
+
+    def signal(name, transform=lambda value: value):
+        values = {}
+        for paper_id in ids:
+            value = signals[paper_id][name] if paper_id in signals else None
+            values[paper_id] = None if value is None else transform(value)
+        return min_max(values)
+
+    normalized = {
+        "text": min_max({paper_id: text_scores.get(paper_id) for paper_id in ids}),
+        "vector": min_max({paper_id: similarities.get(paper_id) for paper_id in ids}),
+        "citations": signal("citations", lambda value: math.log1p(max(value, 0))),
+        "terms": signal("shared_terms"),
+        "cites": signal("candidate_links"),
+    }
+    scores = {paper_id: sum(weight * normalized[name][paper_id] for name, weight in weights.items())
+              for paper_id in ids}
+
+    # Ties keep the order of the retrieval query
+    ranked = sorted(ids, key=lambda paper_id: -scores[paper_id])[:top_k]
+    position = {paper_id: i for i, paper_id in enumerate(ranked)}
+    kept = [row for row in rows if row.get("Id") in position]
+    kept.sort(key=lambda row: position[row["Id"]])
+    for row in kept:
+        row["Relevance"] = round(scores[row["Id"]], 3)
+    print(f"Kept {len(kept)} top ranked results")
+    return kept
@@ -0,0 +1,159 @@
+import json
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SCHEMA_QUERY = """
+CALL apoc.meta.schema()
+"""
+
+# A single :SchemaVersion node whose version the loader bumps after every
+# ingest, so other processes notice that their cached schema is out of date
+SCHEMA_VERSION_QUERY = """
+OPTIONAL MATCH (v:SchemaVersion {id: 'schema'})
+RETURN coalesce(v.version, 0) AS version
+"""
+
+BUMP_SCHEMA_VERSION_QUERY = """
+MERGE (v:SchemaVersion {id: 'schema'})
+SET v.version = coalesce(v.version, 0) + 1,
+    v.updated_at = datetime()
+"""
+
+
+class SchemaCache:
+    """
+    Process-wide cache of the apoc.meta.schema() result.
+
+    apoc.meta.schema() samples the whole store, so the result is kept for ttl
+    seconds and optionally persisted to a JSON file, letting a cold start skip
+    the call entirely. Every check_interval seconds the graph's schema version
+    marker is read, and the schema is fetched again when it changed, so a
+    running server picks up an ingest without waiting for the ttl. The loader
+    calls invalidate() for its own process and bump_schema_version() for
+    everyone else.
+    """
+
+    def __init__(self, ttl=3600, path=None, check_interval=60):
+        self.ttl = ttl
+        self.path = path
+        self.check_interval = check_interval
+        self._schema = None
+        self._version = None
+        self._fetched_at = 0.0
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, conn):
+        """
+        Return the cached schema, fetching it from Neo4j when missing, expired
+        or older than the graph's schema version.
+        """
+        with self._lock:
+            if self._schema is None and self.path:
+                self._load()
+            now = time.time()
+            version = None
+            stale = self._schema is None or now - self._fetched_at > self.ttl
+            if not stale and now - self._checked_at >= self.check_interval:
+                self._checked_at = now
+                version = self._fetch_version(conn)
+                stale = version is not None and version != self._version
+            if stale:
+                if version is None:
+                    version = self._fetch_version(conn)
+                schema = self._fetch(conn)
+                if schema is None:
+                    return self._schema
+                self._schema = schema
+                self._version = version
+                self._fetched_at = self._checked_at = time.time()
+                self._save()
+            return self._schema
+
+    def invalidate(self):
+        with self._lock:
+            self._schema = None
+            self._version = None
+            self._fetched_at = 0.0
+            if self.path and os.path.exists(self.path):
+                os.remove(self.path)
+
+    def _fetch(self, conn):
+        try:
+            records = conn.query(SCHEMA_QUERY)
+            return records[0]["value"] if records else None
+        except Exception as e:
+            print(f"Error fetching schema: {e}")
+            return None
+
+    def _fetch_version(self, conn):
+        try:
+            records = conn.query(SCHEMA_VERSION_QUERY)
+            return records[0]["version"] if records else 0
+        except Exception as e:
+            print(f"Error reading schema version: {e}")
+            return None
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                cached = json.load(f)
+            self._schema = cached["schema"]
+            self._version = cached.get("version")
+            self._fetched_at = cached["fetched_at"]
+        except (OSError, ValueError, KeyError):
+            self._schema = None
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"fetched_at": self._fetched_at, "version": self._version, "schema": self._schema}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error saving schema cache: {e}")
+
+
+def bump_schema_version(session):
+    """
+    Mark the graph's schema as changed, for the schema caches of running servers.
+    """
+    session.run(BUMP_SCHEMA_VERSION_QUERY)
+
+
+def format_schema(schema):
+    """
+    Render an apoc.meta.schema() map as compact text for prompts.
+
+    Each node label is listed once with its property names, followed by one
+    line per relationship pattern, e.g. "(:Author)-[:AUTHORED]->(:Paper)".
+    """
+    if not schema:
+        return "Schema information not available."
+
+    nodes = []
+    relationships = []
+    for label, meta in sorted(schema.items()):
+        # The version and embedding markers are bookkeeping, not something queries should match
+        if meta.get("type") != "node" or label in ("SchemaVersion", "EmbeddingIndex"):
+            continue
+        properties = ", ".join(sorted(meta.get("properties", {})))
+        nodes.append(f"{label}({properties})")
+        for rel_type, rel in sorted(meta.get("relationships", {}).items()):
+            if rel.get("direction") != "out":
+                continue
+            for other in rel.get("labels", []):
+                relationships.append(f"(:{label})-[:{rel_type}]->(:{other})")
+
+    return "Nodes:\n" + "\n".join(nodes) + "\nRelationships:\n" + "\n".join(relationships)
+
+
+schema_cache = SchemaCache(ttl=float(os.getenv("SCHEMA_CACHE_TTL", "3600")),
+                           path=os.getenv("SCHEMA_CACHE_PATH"),
+                           check_interval=float(os.getenv("SCHEMA_VERSION_CHECK_SECONDS", "60")))
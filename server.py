@@ -0,0 +1,211 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from aiohttp import web
+from dotenv import load_dotenv
+from neo4j_connection import SharedNeo4jConnection
+from llm_client import initialize_llm
+from dataset_recommendation import get_dataset_recommendations
+from theme_specific_search import theme_search
+from author_collaboration import get_author_collaboration
+from summarize_papers import summarize_papers, get_citation_reasoning
+from summary_store import flush_requests
+
+load_dotenv()
+
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8080"))
+# Requests processed at the same time; each one holds a worker thread
+SERVER_MAX_CONCURRENCY = int(os.getenv("SERVER_MAX_CONCURRENCY", "16"))
+# Seconds a request waits for a free slot before it is rejected with 503
+SERVER_QUEUE_TIMEOUT = float(os.getenv("SERVER_QUEUE_TIMEOUT", "2"))
+# Seconds a request may run before it is answered with 504
+SERVER_REQUEST_TIMEOUT = float(os.getenv("SERVER_REQUEST_TIMEOUT", "120"))
+
+END_OF_STREAM = object()
+
+
+# path -> function(conn, openai, query, on_token); /agent is served by
+# ResearchAssistantServer.run_agent
+TOOLS = {
+    "/datasets": get_dataset_recommendations,
+    "/theme": theme_search,
+    "/authors": get_author_collaboration,
+    "/summarize": lambda conn, openai, query, on_token: summarize_papers(conn, openai, query, on_token=on_token),
+    "/citations": get_citation_reasoning,
+}
+
+
+class ResearchAssistantServer:
+    """
+    HTTP API over the research assistant tools.
+
+    Every request runs its tool on a worker thread with the shared Neo4j
+    connection pool and LLM client. At most max_concurrency requests run at
+    once; a request that cannot get a slot within queue_timeout seconds gets
+    a 503, and one that runs longer than request_timeout seconds a 504.
+
+    POST a JSON body {"query": "...", "stream": false} to a tool path. With
+    "stream": true the answer is sent as plain text chunks as it is generated.
+
+    The agent behind /agent and its tools are built once, on the first agent
+    request, and shared by all of them. Its tools use the shared Neo4j pool
+    and LLM client; the agent's own model calls go to OpenAI through
+    LangChain, so they bypass the LLM client's backend and cache.
+    """
+
+    def __init__(self, conn, openai, max_concurrency=SERVER_MAX_CONCURRENCY,
+                 queue_timeout=SERVER_QUEUE_TIMEOUT, request_timeout=SERVER_REQUEST_TIMEOUT):
+        self.conn = conn
+        self.openai = openai
+        self.queue_timeout = queue_timeout
+        self.request_timeout = request_timeout
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="tool")
+        self.active = 0
+        self.rejected = 0
+        self.tools = dict(TOOLS, **{"/agent": self.run_agent})
+        self._agent = None
+        self._agent_lock = threading.Lock()
+
+    def run_agent(self, conn, openai, query, on_token=None):
+        with self._agent_lock:
+            if self._agent is None:
+                # Imported here so the tool endpoints work without the agent's extra dependencies
+                from main import setup_tools, setup_agent
+                self._agent = setup_agent(setup_tools(conn, openai), streaming=True)
+        config = {}
+        if on_token is not None:
+            from main import TokenStreamHandler
+            config["callbacks"] = [TokenStreamHandler(on_token)]
+        # Only the agent's final answer is streamed, not the tool answers it builds
+        # on, so the first token still waits for every tool call (see setup_agent)
+        return self._agent.invoke({"input": query}, config=config)["output"]
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/health", self.health)
+        for path in self.tools:
+            app.router.add_post(path, self.handle)
+        app.on_cleanup.append(self.cleanup)
+        return app
+
+    async def health(self, request):
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.wait_for(loop.run_in_executor(None, self.conn.query, "RETURN 1"), 5)
+            neo4j_status = "ok"
+        except Exception as e:
+            neo4j_status = f"error: {e}"
+        return web.json_response({
+            "neo4j": neo4j_status,
+            "active_requests": self.active,
+            "rejected_requests": self.rejected,
+            "llm_cache": self.openai.stats(),
+        }, status=200 if neo4j_status == "ok" else 503)
+
+    async def handle(self, request):
+        try:
+            body = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return web.json_response({"error": "Request body must be JSON"}, status=400)
+        query = body.get("query") if isinstance(body, dict) else None
+        if not isinstance(query, str) or not query.strip():
+            return web.json_response({"error": "Missing query"}, status=400)
+
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return web.json_response({"error": "Server busy, retry later"}, status=503,
+                                     headers={"Retry-After": "1"})
+
+        tool = self.tools[request.path]
+        if body.get("stream"):
+            return await self._stream(request, tool, query)
+        return await self._respond(request, tool, query)
+
+    async def _respond(self, request, tool, query):
+        start = time.perf_counter()
+        future = self._submit(tool, query, None)
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), self.request_timeout)
+        except asyncio.TimeoutError:
+            return web.json_response({"error": "Request timed out"}, status=504)
+        except Exception as e:
+            print(f"Error handling {request.path}: {e}")
+            return web.json_response({"error": str(e)}, status=500)
+        if result is None:
+            return web.json_response({"error": "The request could not be completed"}, status=500)
+        return web.json_response({"result": result, "seconds": round(time.perf_counter() - start, 3)})
+
+    async def _stream(self, request, tool, query):
+        loop = asyncio.get_running_loop()
+        tokens = asyncio.Queue()
+
+        def on_token(token):
+            loop.call_soon_threadsafe(tokens.put_nowait, token)
+
+        future = self._submit(tool, query, on_token)
+        future.add_done_callback(lambda _: tokens.put_nowait(END_OF_STREAM))
+
+        response = web.StreamResponse(headers={"Content-Type": "text/plain; charset=utf-8"})
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+        deadline = loop.time() + self.request_timeout
+        try:
+            while True:
+                token = await asyncio.wait_for(tokens.get(), max(deadline - loop.time(), 0))
+                if token is END_OF_STREAM:
+                    break
+                await response.write(token.encode("utf-8"))
+            if future.exception() is not None:
+                await response.write(f"\n[error: {future.exception()}]".encode("utf-8"))
+            elif future.result() is None:
+                # The tools print their errors and return None, which _respond answers with a 500
+                await response.write(b"\n[error: The request could not be completed]")
+        except asyncio.TimeoutError:
+            await response.write(b"\n[error: request timed out]")
+        except ConnectionResetError:
+            # The client went away; the tool finishes in the background
+            return response
+        await response.write_eof()
+        return response
+
+    def _submit(self, tool, query, on_token):
+        """
+        Run tool on a worker thread. The request's slot is released when the
+        thread finishes, not when the request times out, so abandoned work
+        still counts against the concurrency limit.
+        """
+        self.active += 1
+        future = asyncio.wrap_future(self._executor.submit(tool, self.conn, self.openai, query, on_token))
+
+        def release(_):
+            self.active -= 1
+            self._slots.release()
+
+        future.add_done_callback(release)
+        return future
+
+    async def cleanup(self, app):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def main():
+    conn = SharedNeo4jConnection(os.getenv("NEO4J_URI"), os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD"),
+                                 max_pool_size=int(os.getenv("NEO4J_POOL_SIZE", "50")))
+    conn.connect()
+    try:
+        server = ResearchAssistantServer(conn, initialize_llm())
+        web.run_app(server.app(), host=SERVER_HOST, port=SERVER_PORT)
+    finally:
+        flush_requests(conn)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,134 @@
 import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pdfTojson import extract_paper_content_from_url
-
-def summarize_papers(conn, openai, query):
+from schema_cache import format_schema
+from utility import get_database_structure
+from query_templates import PAPER_TITLE_QUERY, parse_paper_titles
+from cypher_cache import cached_cypher_query
+from doc_packing import pack_document, SUMMARY_TOKEN_BUDGET
+from summary_store import get_summary, save_summary
+
+# Number of papers fetched, parsed and summarized at the same time
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4"))
+# Token budget shared by all papers in a citation reasoning prompt
+CITATION_TOKEN_BUDGET = int(os.getenv("CITATION_TOKEN_BUDGET", "12000"))
+
+def summarize_papers(conn, openai, query, max_concurrency=SUMMARY_CONCURRENCY, on_token=None):
     query_content = extract_paper_info(conn, openai, query)
     paper_nodes = get_paper_info(conn, openai, query_content)
-    summaries = '''Here is the requested summary:'''
-    for p in paper_nodes:
-        paper_data = p.data()
-        doc = extract_paper_content_from_url(paper_data['p']['url'], paper_data['p']['title'])
-        json_doc= json.dumps(doc, indent=4)
-        summary = generate_summary(query_content, openai, json_doc, paper_data['p']['title'])
-        summaries += f"\nPaper: {paper_data['p']['title']}\n{summary}\n"
+    papers = [p.data()['p'] for p in paper_nodes]
+
+    header = '''Here is the requested summary:'''
+    stream = OrderedTokens(on_token, len(papers)) if on_token else None
+    if on_token:
+        on_token(header)
+
+    def summarize(indexed_paper):
+        i, paper = indexed_paper
+        write = stream.writer(i) if stream else None
+        if write:
+            write(f"\nPaper: {paper['title']}\n")
+        summary = summarize_paper(conn, query_content, openai, paper, write)
+        if write:
+            write("\n")
+            stream.finish(i)
+        return summary
+
+    results = map_concurrently(summarize, list(enumerate(papers)), max_concurrency)
+
+    summaries = header
+    for paper, summary in zip(papers, results):
+        summaries += f"\nPaper: {paper['title']}\n{summary}\n"
 
     return summaries
 
-def get_citation_reasoning(conn, openai, query):
+class OrderedTokens:
+    """
+    Forward tokens from concurrent producers to on_token in producer order.
+
+    The first unfinished producer streams straight through; the others are
+    buffered and flushed when every producer before them has finished.
+    """
+
+    def __init__(self, on_token, count):
+        self.on_token = on_token
+        self._buffers = [[] for _ in range(count)]
+        self._finished = [False] * count
+        self._current = 0
+        self._lock = threading.Lock()
+
+    def writer(self, index):
+        return lambda token: self._write(index, token)
+
+    def finish(self, index):
+        with self._lock:
+            self._finished[index] = True
+            while self._current < len(self._finished) and self._finished[self._current]:
+                self._current += 1
+                if self._current < len(self._buffers):
+                    self._flush(self._current)
+
+    def _write(self, index, token):
+        with self._lock:
+            if index == self._current:
+                self.on_token(token)
+            else:
+                self._buffers[index].append(token)
+
+    def _flush(self, index):
+        for token in self._buffers[index]:
+            self.on_token(token)
+        self._buffers[index] = []
+
+def summarize_paper(conn, query_content, openai, paper, on_token=None):
+    """
+    Return the stored summary of one paper, or fetch, parse and summarize it
+    and store the result. Errors are reported in the returned text so one
+    failing paper does not fail the whole request.
+    """
+    try:
+        summary = get_summary(conn, paper['id'], SUMMARY_PROMPT_VERSION)
+        if summary is None:
+            summary = generate_paper_summary(openai, paper, query_content, on_token)
+            if summary is None:
+                summary = "Summary unavailable: the paper content could not be retrieved."
+            else:
+                save_summary(conn, paper['id'], summary, SUMMARY_PROMPT_VERSION)
+                return summary
+    except Exception as e:
+        print(f"Error summarizing {paper.get('title')}: {e}")
+        summary = f"Summary unavailable: {e}"
+    # Generated summaries were streamed as they arrived; the rest are sent whole
+    if on_token:
+        on_token(summary)
+    return summary
+
+def generate_paper_summary(openai, paper, query_content=None, on_token=None):
+    doc = extract_paper_content_from_url(paper['url'], paper['title'])
+    if doc is None:
+        return None
+    json_doc = packed_document(doc, SUMMARY_TOKEN_BUDGET)
+    return generate_summary(query_content, openai, json_doc, paper['title'], on_token)
+
+def packed_document(doc, max_tokens):
+    json_doc, report = pack_document(doc, max_tokens)
+    if report["trimmed_tokens"]:
+        print(f"Packed {doc.get('title')}: {report['tokens']} of {report['original_tokens']} tokens, "
+              f"trimmed {report['trimmed_tokens']}, dropped {len(report['dropped_sections'])} sections")
+    return json_doc
+
+def map_concurrently(func, items, max_concurrency=SUMMARY_CONCURRENCY):
+    """
+    Apply func to every item on a thread pool, returning results in input order.
+    """
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(items)))) as executor:
+        return list(executor.map(func, items))
+
+def get_citation_reasoning(conn, openai, query, on_token=None):
     query_content = extract_paper_info(conn, openai, query)
     no_of_titles_extracted = len(query_content['paper_titles'].split(","))
     paper_nodes = get_paper_info(conn, openai, query_content)
@@ -23,11 +137,12 @@ def get_citation_reasoning(conn, openai, query):
         print("Insufficient information on given papers")
         return
     
+    papers = [p.data()['p'] for p in paper_nodes]
+    docs = map_concurrently(lambda paper: extract_paper_content_from_url(paper['url'], paper['title']), papers)
+
     context = '''Here is the information about the papers:'''
-    for p in paper_nodes:
-        paper_data = p.data()
-        doc = extract_paper_content_from_url(paper_data['p']['url'], paper_data['p']['title'])
-        json_doc = json.dumps(doc, indent=4)
+    for doc in docs:
+        json_doc = packed_document(doc, CITATION_TOKEN_BUDGET // max(len(docs), 1))
         context += f"\n{json_doc}\n"
     
     prompt = f"""
@@ -41,11 +156,7 @@ def get_citation_reasoning(conn, openai, query):
     2. Give separate reasoning for each pair of citing and cited paper.
     """
 
-    response = openai.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}]
-    )
-    return response.choices[0].message.content
+    return openai.complete(prompt, on_token=on_token)
 
 
 def extract_paper_info(conn, openai, query):
@@ -57,12 +168,7 @@ def extract_paper_info(conn, openai, query):
     """
 
     try:
-        response = openai.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}]
-        )
-
-        content = response.choices[0].message.content.strip()
+        content = openai.complete(prompt).strip()
 
         query_content = {
             "content": query,
@@ -74,10 +180,7 @@ def extract_paper_info(conn, openai, query):
     return query_content
 
 def generate_cypher_query(conn, openai, query_info, schema):
-    if not schema:
-        schema_str = "Schema information not available."
-    else:
-        schema_str = json.dumps(schema, indent=2)
+    schema_str = format_schema(schema)
     content = query_info.get("content", "")
     paper_titles = query_info.get("paper_titles")
     prompt = f"""
@@ -120,25 +223,29 @@ def generate_cypher_query(conn, openai, query_info, schema):
     Do not include the 'CYPHER' keyword in the query and dont generate ```.
     """
 
-    response = openai.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}]
-    )
-
-    return response.choices[0].message.content.strip()
+    return openai.complete(prompt).strip()
 
 
 
 
 def get_paper_info(conn, openai, query_content):
     # return paper url
-    schema = get_database_structure(conn)
-    cypher_query = generate_cypher_query(conn, openai, query_content, schema)
+    paper_titles = parse_paper_titles(query_content.get("paper_titles"))
+    if paper_titles:
+        results = conn.query(PAPER_TITLE_QUERY, parameters={"paper_titles": paper_titles})
+        if results:
+            return results
+
+    cypher_query = cached_cypher_query("summarize", query_content, lambda: generate_cypher_query(
+        conn, openai, query_content, get_database_structure(conn)))
     results = conn.query(cypher_query)
     return results
 
 
-def generate_summary(query, openai, json_doc, paper_tile):
+# Bump whenever the summary prompt changes, so stored summaries are regenerated
+SUMMARY_PROMPT_VERSION = "1"
+
+def generate_summary(query, openai, json_doc, paper_tile, on_token=None):
     prompt = f"""
     Summarize the given json data containing information about the research paper : {paper_tile}
     Json data:
@@ -152,21 +259,4 @@ def generate_summary(query, openai, json_doc, paper_tile):
     Each section should atleast be 250 words if possible.
     """
 
-    response = openai.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}]
-    )
-
-    return response.choices[0].message.content
-
-
-def get_database_structure(conn):
-    schema_query = """
-    CALL apoc.meta.schema()
-    """
-    try:
-        schema = conn.query(schema_query)
-        return schema[0] if schema else None
-    except Exception as e:
-        print(f"Error fetching schema: {e}")
-        return None
+    return openai.complete(prompt, on_token=on_token)
@@ -0,0 +1,289 @@
+import argparse
+import atexit
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Summaries older than this are regenerated even if the paper did not change
+SUMMARY_MAX_AGE_DAYS = float(os.getenv("SUMMARY_MAX_AGE_DAYS", "30"))
+
+# A paper whose summary failed is retried after SUMMARY_RETRY_SECONDS, doubling
+# with every further failure, and left alone after SUMMARY_MAX_ATTEMPTS until
+# its content changes
+SUMMARY_RETRY_SECONDS = float(os.getenv("SUMMARY_RETRY_SECONDS", "3600"))
+SUMMARY_MAX_ATTEMPTS = int(os.getenv("SUMMARY_MAX_ATTEMPTS", "5"))
+
+# Summary lookups are counted in memory and written to the papers by a
+# background thread this often, so reading a summary never writes to the graph
+SUMMARY_REQUEST_FLUSH_SECONDS = float(os.getenv("SUMMARY_REQUEST_FLUSH_SECONDS", "60"))
+
+# Composite uniqueness of (paper_id, prompt_version), whose backing index
+# serves the summary lookups
+SUMMARY_CONSTRAINT_QUERIES = [
+    "CREATE CONSTRAINT summary_key_unique IF NOT EXISTS "
+    "FOR (s:Summary) REQUIRE (s.paper_id, s.prompt_version) IS UNIQUE",
+]
+
+# A summary is kept as a (:Summary)-[:SUMMARIZES]->(:Paper) side node keyed by
+# paper id and prompt version. It records the paper's content_hash when it was
+# generated, so re-ingesting a changed paper makes its summary stale.
+GET_SUMMARY_QUERY = """
+MATCH (p:Paper {id: $paper_id})
+OPTIONAL MATCH (s:Summary {paper_id: $paper_id, prompt_version: $prompt_version})-[:SUMMARIZES]->(p)
+RETURN s.text AS text,
+       s.content_hash IS NULL OR s.content_hash = p.content_hash AS current,
+       s.created_at >= datetime() - duration({seconds: $max_age}) AS recent
+"""
+
+SAVE_SUMMARY_QUERY = """
+MATCH (p:Paper {id: $paper_id})
+MERGE (s:Summary {paper_id: $paper_id, prompt_version: $prompt_version})
+MERGE (s)-[:SUMMARIZES]->(p)
+SET s.text = $text,
+    s.content_hash = p.content_hash,
+    s.created_at = datetime()
+REMOVE p.summary_attempts, p.summary_failed_at, p.summary_failed_hash
+"""
+
+FLUSH_REQUESTS_QUERY = """
+UNWIND $rows AS row
+MATCH (p:Paper {id: row.id})
+SET p.summary_requests = coalesce(p.summary_requests, 0) + row.count
+"""
+
+# Attempts restart from one when the paper changed since the last failure
+SUMMARY_FAILED_QUERY = """
+UNWIND $ids AS id
+MATCH (p:Paper {id: id})
+SET p.summary_attempts = CASE WHEN p.summary_failed_hash = p.content_hash
+                              THEN coalesce(p.summary_attempts, 0) + 1 ELSE 1 END,
+    p.summary_failed_at = datetime(),
+    p.summary_failed_hash = p.content_hash
+"""
+
+# Papers with a full record and no up to date summary, most requested first,
+# leaving out those whose last failure is still in its backoff window
+PENDING_SUMMARIES_QUERY = """
+MATCH (p:Paper)
+WHERE p.content_hash IS NOT NULL AND p.url IS NOT NULL
+  AND (p.summary_failed_at IS NULL OR p.summary_failed_hash <> p.content_hash
+       OR (p.summary_attempts < $max_attempts
+           AND p.summary_failed_at < datetime() - duration({seconds: $retry_after * 2 ^ (p.summary_attempts - 1)})))
+  AND NOT EXISTS {
+    MATCH (s:Summary {prompt_version: $prompt_version})-[:SUMMARIZES]->(p)
+    WHERE s.content_hash = p.content_hash
+      AND s.created_at >= datetime() - duration({seconds: $max_age})
+  }
+RETURN p.id AS id, p.title AS title, p.url AS url
+ORDER BY coalesce(p.summary_requests, 0) DESC, p.id
+LIMIT $limit
+"""
+
+
+_request_counts = {}
+_request_lock = threading.Lock()
+_flush_conn = None
+_flusher = None
+
+
+def create_summary_constraint(conn):
+    for query in SUMMARY_CONSTRAINT_QUERIES:
+        conn.query(query)
+
+
+def count_request(conn, paper_id, flush_after=SUMMARY_REQUEST_FLUSH_SECONDS):
+    """
+    Count a summary request for a paper in memory. The counts are written by
+    a background thread started on the first request, every flush_after
+    seconds, and once more at exit.
+    """
+    global _flush_conn, _flusher
+    with _request_lock:
+        _request_counts[paper_id] = _request_counts.get(paper_id, 0) + 1
+        _flush_conn = conn
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_periodically, args=(flush_after,),
+                                        name="summary-request-flush", daemon=True)
+            _flusher.start()
+
+
+def _flush_periodically(interval):
+    while True:
+        time.sleep(interval)
+        flush_requests(_flush_conn)
+
+
+@atexit.register
+def _flush_at_exit():
+    if _flush_conn is not None:
+        flush_requests(_flush_conn)
+
+
+def flush_requests(conn):
+    """
+    Add the counted summary requests to the papers' summary_requests in one
+    batched write.
+    """
+    with _request_lock:
+        rows = [{"id": paper_id, "count": count} for paper_id, count in sorted(_request_counts.items())]
+        _request_counts.clear()
+    if not rows:
+        return
+    try:
+        conn.query(FLUSH_REQUESTS_QUERY, parameters={"rows": rows})
+    except Exception as e:
+        print(f"Error storing summary request counts: {e}")
+
+
+def get_summary(conn, paper_id, prompt_version, max_age_days=SUMMARY_MAX_AGE_DAYS):
+    """
+    Return the stored summary of a paper, or None if it is missing or stale.
+
+    Every lookup also counts as a request for the paper, which the background
+    worker uses to decide what to summarize first.
+    """
+    count_request(conn, paper_id)
+    try:
+        records = conn.query(GET_SUMMARY_QUERY, parameters={
+            "paper_id": paper_id,
+            "prompt_version": prompt_version,
+            "max_age": int(max_age_days * 86400),
+        })
+    except Exception as e:
+        print(f"Error reading stored summary: {e}")
+        return None
+    if not records or records[0]["text"] is None:
+        return None
+    if not (records[0]["current"] and records[0]["recent"]):
+        return None
+    return records[0]["text"]
+
+
+def save_summary(conn, paper_id, text, prompt_version):
+    try:
+        conn.query(SAVE_SUMMARY_QUERY, parameters={
+            "paper_id": paper_id,
+            "prompt_version": prompt_version,
+            "text": text,
+        })
+    except Exception as e:
+        print(f"Error storing summary: {e}")
+
+
+def mark_failed(conn, paper_ids):
+    """
+    Record a failed summary attempt for each paper, starting its backoff.
+    """
+    try:
+        conn.query(SUMMARY_FAILED_QUERY, parameters={"ids": list(paper_ids)})
+    except Exception as e:
+        print(f"Error recording failed summaries: {e}")
+
+
+def pending_summaries(conn, prompt_version, limit=10, max_age_days=SUMMARY_MAX_AGE_DAYS,
+                      retry_after=SUMMARY_RETRY_SECONDS, max_attempts=SUMMARY_MAX_ATTEMPTS):
+    return [record.data() for record in conn.query(PENDING_SUMMARIES_QUERY, parameters={
+        "prompt_version": prompt_version,
+        "max_age": int(max_age_days * 86400),
+        "retry_after": retry_after,
+        "max_attempts": max_attempts,
+        "limit": limit,
+    })]
+
+
+class SummaryWorker:
+    """
+    Background thread that pre-generates summaries for new, changed and
+    most requested papers, so interactive requests are served from the store.
+    """
+
+    def __init__(self, conn, openai, interval=300, batch_size=10):
+        self.conn = conn
+        self.openai = openai
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="summary-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        flush_requests(self.conn)
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                generated = self.run_once()
+            except Exception as e:
+                print(f"Summary worker error: {e}")
+                generated = 0
+            # Keep going without waiting while there is a backlog
+            if generated < self.batch_size:
+                self._stop.wait(self.interval)
+
+    def run_once(self):
+        """
+        Generate and store summaries for one batch of pending papers.
+
+        Returns:
+            int: Number of summaries generated
+        """
+        from summarize_papers import SUMMARY_PROMPT_VERSION, generate_paper_summary, map_concurrently
+
+        flush_requests(self.conn)
+        papers = pending_summaries(self.conn, SUMMARY_PROMPT_VERSION, limit=self.batch_size)
+        if not papers:
+            return 0
+
+        start = time.perf_counter()
+        summaries = map_concurrently(lambda paper: self._generate(paper, generate_paper_summary), papers)
+        generated = 0
+        failed = []
+        for paper, summary in zip(papers, summaries):
+            if summary:
+                save_summary(self.conn, paper['id'], summary, SUMMARY_PROMPT_VERSION)
+                generated += 1
+            else:
+                failed.append(paper['id'])
+        if failed:
+            mark_failed(self.conn, failed)
+        print(f"Pre-generated {generated} summaries in {time.perf_counter() - start:.1f}s")
+        return generated
+
+    def _generate(self, paper, generate_paper_summary):
+        try:
+            return generate_paper_summary(self.openai, paper)
+        except Exception as e:
+            print(f"Error pre-generating summary for {paper['title']}: {e}")
+            return None
+
+
+def main():
+    from neo4j_connection import Neo4jConnection
+    from llm_client import initialize_llm
+
+    parser = argparse.ArgumentParser(description="Pre-generate paper summaries into the graph.")
+    parser.add_argument("--once", action="store_true", help="Process one batch and exit")
+    parser.add_argument("--interval", type=float, default=300, help="Seconds to wait when idle")
+    parser.add_argument("--batch-size", type=int, default=10, help="Papers summarized per batch")
+    args = parser.parse_args()
+
+    with Neo4jConnection(os.getenv("NEO4J_URI"), os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD")) as conn:
+        create_summary_constraint(conn)
+        worker = SummaryWorker(conn, initialize_llm(), interval=args.interval, batch_size=args.batch_size)
+        if args.once:
+            worker.run_once()
+        else:
+            worker.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import time
+
+from cache import LRUCache
+from cypher_cache import cypher_cache_key
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    cache = LRUCache(ttl=10)
+    cache.set("q", "MATCH (p) RETURN p")
+    now[0] += 5
+    assert cache.get("q") == "MATCH (p) RETURN p"
+    now[0] += 10
+    assert cache.get("q") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats() == {"hits": 3, "misses": 1, "hit_rate": 0.75, "size": 2}
+
+
+def test_sqlite_tier_persists_across_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    first = LRUCache(path=path, table="cypher_cache")
+    first.set("q", {"query": "MATCH (p) RETURN p"})
+    second = LRUCache(path=path, table="cypher_cache")
+    assert second.get("q") == {"query": "MATCH (p) RETURN p"}
+    assert second.stats()["size"] == 1
+
+
+def test_sqlite_tier_is_trimmed_and_cleared(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    path = str(tmp_path / "cache.sqlite")
+    cache = LRUCache(maxsize=1, path=path, disk_maxsize=2)
+    for i, key in enumerate("abc"):
+        now[0] += 1
+        cache.set(key, i)
+    reopened = LRUCache(path=path)
+    assert reopened.get("a") is None
+    assert reopened.get("c") == 2
+    cache.clear()
+    assert LRUCache(path=path).get("c") is None
+
+
+def test_cypher_cache_key_normalizes_fields():
+    key = cypher_cache_key("dataset", {"content": "NER datasets please",
+                                       "keywords": ["NER ", "ner", "Relation Extraction"],
+                                       "domains": [], "date_range": None})
+    same = cypher_cache_key("dataset", {"content": "which datasets for NER?",
+                                        "keywords": ["relation extraction", "NER"]})
+    assert key == same
+    assert key != cypher_cache_key("theme", {"keywords": ["ner", "relation extraction"]})
+    assert key != cypher_cache_key("dataset", {"keywords": ["ner"]})
+
+
+def test_cypher_cache_key_uses_content_when_nothing_was_extracted():
+    assert cypher_cache_key("dataset", {"content": "Hello  World"}) == \
+        cypher_cache_key("dataset", {"content": "hello world", "keywords": []})
+    assert cypher_cache_key("dataset", {"content": "hello"}) != \
+        cypher_cache_key("dataset", {"content": "goodbye"})
@@ -0,0 +1,50 @@
+from context_packing import merge_rows, pack_results
+
+
+class FakeRecord:
+    def __init__(self, data):
+        self._data = data
+
+    def data(self):
+        return dict(self._data)
+
+
+def test_no_results():
+    assert pack_results([]) == "No results found."
+
+
+def test_rows_of_one_paper_are_merged():
+    rows = [
+        {"Id": "1", "Title": "Paper A", "Dataset": "CoNLL", "Score": 2.0},
+        {"Id": "1", "Title": "Paper A", "Dataset": "OntoNotes", "Score": 2.0},
+        {"Id": "2", "Title": "Paper B", "Dataset": "CoNLL", "Score": 1.0},
+    ]
+    merged = merge_rows(rows)
+    assert [paper["Title"] for paper in merged] == ["Paper A", "Paper B"]
+    assert merged[0]["Dataset"] == ["CoNLL", "OntoNotes"]
+    assert merged[1]["Dataset"] == "CoNLL"
+
+
+def test_packs_header_and_hides_ranking_columns():
+    rows = [FakeRecord({"Id": "1", "Title": "Paper | A", "Authors": ["Ada", "Alan"], "Relevance": 0.9})]
+    assert pack_results(rows).splitlines() == ["Title | Authors", "Paper / A | Ada; Alan"]
+
+
+def test_long_fields_are_truncated():
+    text = pack_results([{"Title": "Paper", "Abstract": " ".join(["word"] * 500)}], long_field_tokens=10)
+    line = text.splitlines()[1]
+    assert line.endswith("...")
+    assert len(line) < 200
+
+
+def test_stops_at_token_budget():
+    rows = [{"Id": str(i), "Title": f"Paper {i} " + "x" * 200} for i in range(20)]
+    lines = pack_results(rows, max_tokens=200).splitlines()
+    assert lines[0] == "Title"
+    assert 1 < len(lines) < 21
+    assert lines[-1].endswith("more results omitted)")
+
+
+def test_first_result_is_kept_even_over_budget():
+    lines = pack_results([{"Title": "x" * 1000}], max_tokens=5).splitlines()
+    assert lines == ["Title", "x" * 1000]
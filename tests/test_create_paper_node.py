@@ -0,0 +1,103 @@
+from create_paper_node import (LINKS, PAPER_PROPERTIES, delta_papers_batch, paper_hash,
+                               paper_links, paper_properties)
+
+
+class FakeRecord:
+    def __init__(self, data):
+        self._data = data
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def data(self):
+        return dict(self._data)
+
+
+class FakeTx:
+    """
+    Answers fetch_paper_state from stored papers and records every other query.
+    """
+
+    def __init__(self, stored=()):
+        self.stored = {paper['id']: paper for paper in stored}
+        self.writes = []
+
+    def run(self, query, **params):
+        if "content_hash AS content_hash" in query:
+            return [self._state(row) for row in params["rows"] if row["id"] in self.stored]
+        self.writes.append((query, params))
+        return []
+
+    def _state(self, row):
+        paper = self.stored[row["id"]]
+        stored_hash = paper_hash(paper)
+        if stored_hash == row["content_hash"]:
+            return FakeRecord({"id": paper['id'], "content_hash": stored_hash, "props": None, "links": None})
+        return FakeRecord({
+            "id": paper['id'],
+            "content_hash": stored_hash,
+            "props": paper_properties(paper),
+            "links": {field: [link['key'] for link in paper_links(paper, field)] for field in LINKS},
+        })
+
+    def rows_for(self, fragment):
+        return [row for query, params in self.writes if fragment in query for row in params["rows"]]
+
+
+def make_paper(paper_id, **overrides):
+    paper = {
+        "id": paper_id,
+        "title": f"Paper {paper_id}",
+        "date_published": "25 Oct 2022",
+        "abstract": "An abstract.",
+        "conclusion": "A conclusion.",
+        "number_of_citations": 3,
+        "url": f"https://example.org/{paper_id}",
+        "authors": ["Ada Lovelace", "Alan Turing"],
+        "datasets": ["CoNLL-2003"],
+        "domains": ["NLP"],
+        "keywords": ["ner"],
+        "conference": "ACL",
+        "citations": [],
+    }
+    paper.update(overrides)
+    return paper
+
+
+def test_paper_properties_match_the_fetched_columns():
+    assert set(paper_properties(make_paper("1"))) == set(PAPER_PROPERTIES)
+
+
+def test_unchanged_paper_is_skipped():
+    paper = make_paper("1")
+    tx = FakeTx([paper])
+    assert delta_papers_batch(tx, [paper]) == {"new": 0, "changed": 0, "unchanged": 1}
+    assert tx.writes == []
+
+
+def test_new_paper_is_written_in_full():
+    tx = FakeTx()
+    assert delta_papers_batch(tx, [make_paper("1")]) == {"new": 1, "changed": 0, "unchanged": 0}
+    assert [row["id"] for row in tx.rows_for("SET p += row.props")] == ["1"]
+    assert {row["key"] for row in tx.rows_for(":AUTHORED")} == {"Ada Lovelace", "Alan Turing"}
+
+
+def test_changed_paper_sets_only_differing_properties():
+    tx = FakeTx([make_paper("1")])
+    changed = make_paper("1", number_of_citations=10)
+    assert delta_papers_batch(tx, [changed]) == {"new": 0, "changed": 1, "unchanged": 0}
+    (row,) = tx.rows_for("SET p += row.props")
+    assert set(row["props"]) == {"number_of_citations", "content_hash"}
+    assert row["props"]["number_of_citations"] == 10
+
+
+def test_changed_links_are_added_and_removed():
+    tx = FakeTx([make_paper("1")])
+    changed = make_paper("1", authors=["Ada Lovelace", "Grace Hopper"])
+    delta_papers_batch(tx, [changed])
+    deletes = [row for query, params in tx.writes if "DELETE r" in query and ":AUTHORED" in query
+               for row in params["rows"]]
+    creates = [row for query, params in tx.writes if "DELETE r" not in query and ":AUTHORED" in query
+               for row in params["rows"]]
+    assert deletes == [{"paper_id": "1", "key": "Alan Turing"}]
+    assert [row["key"] for row in creates] == ["Grace Hopper"]
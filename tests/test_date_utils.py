@@ -0,0 +1,47 @@
+from datetime import date, datetime
+import pytest
+from date_utils import parse_date
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("25 Oct 2022", date(2022, 10, 25)),
+    ("25 October 2022", date(2022, 10, 25)),
+    ("Oct 25, 2022", date(2022, 10, 25)),
+    ("2022-10-25", date(2022, 10, 25)),
+    ("  25   Oct  2022 ", date(2022, 10, 25)),
+    ("4 Sept 2023", date(2023, 9, 4)),
+    ("April 2024", date(2024, 4, 1)),
+    ("2024-04", date(2024, 4, 1)),
+    ("2024", date(2024, 1, 1)),
+    (2024, date(2024, 1, 1)),
+])
+def test_parses_start_of_period(value, expected):
+    assert parse_date(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("25 Oct 2022", date(2022, 10, 25)),
+    ("February 2024", date(2024, 2, 29)),
+    ("Feb 2023", date(2023, 2, 28)),
+    ("2024", date(2024, 12, 31)),
+])
+def test_end_returns_last_day_of_period(value, expected):
+    assert parse_date(value, end=True) == expected
+
+
+@pytest.mark.parametrize("value", [None, "", "soon", "31 Feb 2024", 3.5, ["2024"]])
+def test_unparsable_values_return_none(value):
+    assert parse_date(value) is None
+
+
+def test_passes_dates_through():
+    assert parse_date(date(2022, 1, 2)) == date(2022, 1, 2)
+    assert parse_date(datetime(2022, 1, 2, 15, 30)) == date(2022, 1, 2)
+
+
+def test_converts_neo4j_temporal_values():
+    class Neo4jDate:
+        def to_native(self):
+            return date(2021, 5, 6)
+
+    assert parse_date(Neo4jDate()) == date(2021, 5, 6)
@@ -0,0 +1,61 @@
+import json
+from doc_packing import count_tokens, pack_document, section_rank
+
+
+def words(n, word="token"):
+    return " ".join([word] * n)
+
+
+DOC = {
+    "title": "A Paper",
+    "content": "Title block and abstract.",
+    "sections": {
+        "5 Results": words(200, "result"),
+        "1 Introduction": words(200, "intro"),
+        "References": words(500, "ref"),
+        "3 Method": words(200, "method"),
+        "Appendix A": words(300, "appendix"),
+    },
+}
+
+
+def test_section_rank_orders_by_priority():
+    assert section_rank("Abstract") < section_rank("1 Introduction") < section_rank("3 Proposed Method")
+    assert section_rank("6 Conclusion") < section_rank("5 Experiments") < section_rank("7 Limitations")
+    assert section_rank("References") is None
+    assert section_rank("Acknowledgements") is None
+
+
+def test_fits_whole_document_within_budget():
+    text, report = pack_document(DOC, max_tokens=100000)
+    packed = json.loads(text)
+    assert packed["title"] == "A Paper"
+    assert packed["content"] == DOC["content"]
+    assert list(packed["sections"]) == ["1 Introduction", "3 Method", "5 Results"]
+    assert report["dropped_sections"] == ["References", "Appendix A"]
+    assert report["tokens"] == count_tokens(text)
+
+
+def test_trims_low_priority_sections_to_budget():
+    budget = 400
+    text, report = pack_document(DOC, max_tokens=budget)
+    packed = json.loads(text)
+    assert report["tokens"] <= budget
+    assert packed["sections"]["1 Introduction"] == DOC["sections"]["1 Introduction"]
+    assert "5 Results" not in packed["sections"]
+    assert "5 Results" in report["dropped_sections"]
+    assert report["trimmed_tokens"] == report["original_tokens"] - report["tokens"]
+
+
+def test_truncates_first_section_that_does_not_fit():
+    doc = {"title": "T", "content": "", "sections": {"1 Introduction": words(1000)}}
+    text, report = pack_document(doc, max_tokens=300)
+    section = json.loads(text)["sections"]["1 Introduction"]
+    assert 0 < len(section) < len(doc["sections"]["1 Introduction"])
+    assert report["tokens"] <= 300
+
+
+def test_empty_document():
+    text, report = pack_document(None)
+    assert text == "null"
+    assert report["tokens"] == 0
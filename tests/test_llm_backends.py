@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from llm_backends import (DATASET_QUERY, RecordingBackend, ReplayBackend, StubBackend, completion_key,
+                          create_backend, split_tokens)
+
+MESSAGES = [{"role": "user", "content": 'User Query: "datasets for NER"'}]
+
+
+def test_split_tokens_joins_back():
+    text = "Stub answer for  NER.\n\nner ner"
+    assert "".join(split_tokens(text)) == text
+
+
+def test_stub_is_deterministic_and_streams_the_same_text():
+    stub = StubBackend(words_per_answer=20)
+    text = stub.complete("gpt-4o-mini", MESSAGES)
+    assert text == StubBackend(words_per_answer=20).complete("gpt-4o-mini", MESSAGES)
+    assert text.startswith("Stub answer for datasets for NER.")
+    assert "".join(stub.stream("gpt-4o-mini", MESSAGES)) == text
+
+
+def test_stub_answers_extraction_and_cypher_prompts():
+    stub = StubBackend()
+    prompt = 'Extract the following information from the given query:\n    "papers on event extraction since 2021"\n'
+    extracted = json.loads(stub.complete("gpt-4o-mini", [{"role": "user", "content": prompt}]))
+    assert extracted["keywords"] == ["event extraction"]
+    assert extracted["date_range"] == {"start": "2021-01-01", "end": None}
+    cypher = stub.complete("gpt-4o-mini", [{"role": "user", "content": "Generate a Cypher query that finds datasets"}])
+    assert cypher == DATASET_QUERY.strip()
+
+
+class FixedBackend:
+    def __init__(self, text):
+        self.text = text
+
+    def complete(self, model, messages, **params):
+        return self.text
+
+    def stream(self, model, messages, **params):
+        yield from split_tokens(self.text)
+
+
+def test_recorded_completions_replay(tmp_path):
+    path = str(tmp_path / "recordings.jsonl")
+    recorder = RecordingBackend(FixedBackend("recorded answer"), path)
+    assert recorder.complete("gpt-4o-mini", MESSAGES, temperature=0) == "recorded answer"
+    assert "".join(recorder.stream("gpt-4o", MESSAGES)) == "recorded answer"
+
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [record["key"] for record in records] == [
+        completion_key("gpt-4o-mini", MESSAGES, {"temperature": 0}), completion_key("gpt-4o", MESSAGES, {})]
+
+    replay = ReplayBackend(path)
+    assert replay.complete("gpt-4o-mini", MESSAGES, temperature=0) == "recorded answer"
+    assert "".join(replay.stream("gpt-4o", MESSAGES)) == "recorded answer"
+    with pytest.raises(KeyError):
+        replay.complete("gpt-4o-mini", MESSAGES)
+
+
+def test_replay_falls_back_for_unrecorded_prompts(tmp_path):
+    path = tmp_path / "recordings.jsonl"
+    path.write_text("")
+    replay = ReplayBackend(str(path), fallback=StubBackend(words_per_answer=5))
+    assert replay.complete("gpt-4o-mini", MESSAGES) == StubBackend(words_per_answer=5).complete("gpt-4o-mini", MESSAGES)
+
+
+def test_create_backend_by_name(monkeypatch):
+    assert isinstance(create_backend("stub"), StubBackend)
+    monkeypatch.setenv("LLM_BACKEND", "stub")
+    assert isinstance(create_backend(), StubBackend)
+    with pytest.raises(ValueError):
+        create_backend("nope")
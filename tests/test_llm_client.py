@@ -0,0 +1,55 @@
+from cache import LRUCache
+from llm_backends import StubBackend
+from llm_client import LLMClient
+
+
+class CountingStub(StubBackend):
+    def __init__(self):
+        super().__init__(words_per_answer=5)
+        self.calls = 0
+
+    def respond(self, model, messages, **params):
+        self.calls += 1
+        return super().respond(model, messages, **params)
+
+
+def make_client():
+    backend = CountingStub()
+    return LLMClient(backend, cache=LRUCache(maxsize=16)), backend
+
+
+def test_identical_prompts_hit_the_cache():
+    client, backend = make_client()
+    first = client.complete('User Query: "datasets for NER"')
+    assert client.complete('User Query: "datasets for NER"') == first
+    assert backend.calls == 1
+    assert client.stats()["hits"] == 1
+
+
+def test_model_and_response_format_are_part_of_the_key():
+    client, backend = make_client()
+    prompt = 'Extract the following information from the given query: "graph neural networks"\n'
+    client.complete(prompt)
+    client.complete(prompt, model="gpt-4o")
+    client.complete(prompt, response_format={"type": "json_object"})
+    assert backend.calls == 3
+    assert client.stats() == {"hits": 0, "misses": 3, "hit_rate": 0.0, "size": 3}
+
+
+def test_streamed_completion_is_cached_for_complete():
+    client, backend = make_client()
+    tokens = []
+    text = client.complete('User Query: "papers on summarization"', on_token=tokens.append)
+    assert "".join(tokens) == text
+    assert client.complete('User Query: "papers on summarization"') == text
+    assert backend.calls == 1
+    assert client.stats()["hit_rate"] == 0.5
+
+
+def test_client_without_cache_always_calls_backend():
+    backend = CountingStub()
+    client = LLMClient(backend)
+    client.complete("hello")
+    client.complete("hello")
+    assert backend.calls == 2
+    assert client.stats()["hits"] == 0
@@ -0,0 +1,60 @@
+import json
+import pytest
+import paper_loader
+from paper_loader import iter_papers, batched
+
+
+PAPERS = [{"id": str(i), "title": f"Paper {i}", "keywords": ["a", "b"]} for i in range(5)]
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(paper_loader, "CHUNK_SIZE", 7)
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_reads_json_array(tmp_path, small_chunks):
+    path = write(tmp_path, "papers.json", json.dumps(PAPERS, indent=2))
+    assert list(iter_papers(path)) == PAPERS
+
+
+def test_reads_json_lines(tmp_path):
+    text = "\n".join(json.dumps(paper) for paper in PAPERS) + "\n\n"
+    path = write(tmp_path, "papers.jsonl", text)
+    assert list(iter_papers(path)) == PAPERS
+
+
+def test_offset_skips_papers(tmp_path, small_chunks):
+    path = write(tmp_path, "papers.json", json.dumps(PAPERS))
+    assert list(iter_papers(path, offset=3)) == PAPERS[3:]
+
+
+def test_empty_array(tmp_path):
+    path = write(tmp_path, "papers.json", " [ ] ")
+    assert list(iter_papers(path)) == []
+
+
+def test_scalar_split_across_chunks(tmp_path, small_chunks):
+    path = write(tmp_path, "numbers.json", "[1234567]")
+    assert list(iter_papers(path)) == [1234567]
+
+
+def test_truncated_array_raises(tmp_path, small_chunks):
+    path = write(tmp_path, "papers.json", json.dumps(PAPERS)[:-10])
+    with pytest.raises(ValueError):
+        list(iter_papers(path))
+
+
+def test_invalid_json_line_reports_line_number(tmp_path):
+    path = write(tmp_path, "papers.jsonl", '{"id": "1"}\n{"id": \n')
+    with pytest.raises(ValueError, match="line 2"):
+        list(iter_papers(path))
+
+
+def test_batched():
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
@@ -0,0 +1,60 @@
+import os
+
+import pdf_cache
+from pdf_cache import PdfCache
+
+
+def set_mtime(cache, url, sub, suffix, mtime):
+    path = cache._blob_path(url, sub, suffix)
+    os.utime(path, (mtime, mtime))
+
+
+def test_pdf_and_parsed_round_trip(tmp_path):
+    cache = PdfCache(str(tmp_path))
+    assert cache.get_pdf("http://a") is None
+    cache.put_parsed("http://a", {"content": "x"})  # no PDF yet, nothing to key it by
+    assert cache.get_parsed("http://a") is None
+    digest = cache.put_pdf("http://a", b"%PDF-a")
+    assert cache.get_pdf("http://a") == b"%PDF-a"
+    cache.put_parsed("http://a", {"content": "x", "sections": []})
+    assert cache.get_parsed("http://a") == {"content": "x", "sections": []}
+    # The same bytes from another url share the blob
+    assert cache.put_pdf("http://mirror", b"%PDF-a") == digest
+    assert len(os.listdir(tmp_path / "pdf")) == 1
+
+
+def test_least_recently_used_files_are_evicted_by_size(tmp_path):
+    cache = PdfCache(str(tmp_path), max_bytes=250)
+    for i, url in enumerate(["http://a", "http://b"]):
+        cache.put_pdf(url, bytes([i]) * 100)
+        set_mtime(cache, url, "pdf", ".pdf", 1000 + i)
+    cache.get_pdf("http://a")  # a is now the most recently used
+    cache.put_pdf("http://c", b"c" * 100)
+    assert cache.get_pdf("http://b") is None
+    assert cache.get_pdf("http://a") == b"\x00" * 100
+    assert cache.get_pdf("http://c") == b"c" * 100
+    assert cache._size == 200
+    # The ref of the evicted PDF is dropped with it
+    assert not os.path.exists(cache._ref_path("http://b"))
+    assert os.path.exists(cache._ref_path("http://a"))
+
+
+def test_eviction_goes_down_to_low_water(tmp_path):
+    cache = PdfCache(str(tmp_path), max_bytes=1000)
+    for i in range(10):
+        cache.put_pdf(f"http://{i}", bytes([i]) * 100)
+        set_mtime(cache, f"http://{i}", "pdf", ".pdf", 1000 + i)
+    cache.put_pdf("http://new", b"n" * 100)
+    assert cache._size <= 900
+    assert cache.get_pdf("http://0") is None
+    assert cache.get_pdf("http://new") == b"n" * 100
+
+
+def test_default_cache_is_created_lazily(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_cache, "_default_cache", None)
+    monkeypatch.setenv("PDF_CACHE_DIR", "")
+    assert pdf_cache.get_pdf_cache() is None
+    monkeypatch.setenv("PDF_CACHE_DIR", str(tmp_path / "pdfs"))
+    cache = pdf_cache.get_pdf_cache()
+    assert cache.root == str(tmp_path / "pdfs")
+    assert pdf_cache.get_pdf_cache() is cache
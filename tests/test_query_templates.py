@@ -0,0 +1,111 @@
+from query_templates import (AUTHOR_QUERY, AUTHOR_SEARCH_QUERY, DATASET_QUERY, DATASET_SEARCH_QUERY,
+                             THEME_QUERY, can_use_template, fulltext_search, parse_paper_titles,
+                             TEMPLATES, query_parameters, template_query)
+
+
+def test_template_hit_for_extracted_fields():
+    query_info = {
+        "content": "datasets for biomedical NER since 2020",
+        "keywords": ["named entity recognition"],
+        "domains": ["biomedical"],
+        "date_range": {"start": "2020", "end": None},
+        "min_citations": 10,
+    }
+    assert can_use_template(query_info)
+    assert template_query("dataset", query_info) is not None
+
+
+def test_keywords_choose_the_full_text_template():
+    assert template_query("dataset", {"keywords": ["ner"]}) == DATASET_SEARCH_QUERY
+    assert template_query("dataset", {"keywords": []}) == DATASET_QUERY
+    assert template_query("author", {"keywords": ["ner"]}) == AUTHOR_SEARCH_QUERY
+    # The theme query matches keywords against domains when one was given
+    assert template_query("theme", {"keywords": ["ner"], "domains": ["nlp"]}) == THEME_QUERY
+
+
+def test_plain_paper_and_author_names_use_the_template():
+    query_info = {"papers": ["BERT"], "authors": ["  Jacob Devlin "]}
+    assert template_query("author", query_info) == AUTHOR_QUERY
+    parameters = query_parameters(query_info)
+    assert parameters["papers"] == ["bert"]
+    assert parameters["authors"] == ["jacob devlin"]
+
+
+def test_structured_paper_or_author_mentions_fall_back():
+    assert template_query("author", {"authors": [{"name": "Jacob Devlin", "affiliation": "Google"}]}) is None
+    assert template_query("dataset", {"papers": "BERT"}) is None
+
+
+def test_unknown_fields_fall_back():
+    assert template_query("theme", {"keywords": ["ner"], "venue_rank": "A*"}) is None
+    # Empty unknown fields do not matter
+    assert template_query("theme", {"keywords": ["ner"], "venue_rank": None}) is not None
+
+
+def test_invalid_filters_fall_back():
+    assert template_query("dataset", {"min_citations": "many"}) is None
+    assert template_query("dataset", {"min_citations": True}) is None
+    assert template_query("dataset", {"date_range": "last year"}) is None
+
+
+def test_parameters_for_every_field():
+    parameters = query_parameters({"keywords": ["NER"], "date_range": {"start": "Jan 2020", "end": "2021"}})
+    assert set(parameters) >= {"keywords", "papers", "datasets", "domains", "authors", "conferences",
+                               "date_range_start", "date_range_end", "min_citations", "search"}
+    assert parameters["datasets"] == []
+    assert str(parameters["date_range_start"]) == "2020-01-01"
+    assert str(parameters["date_range_end"]) == "2021-12-31"
+    assert parameters["min_citations"] is None
+
+
+def test_full_text_search_from_multi_word_keywords():
+    assert fulltext_search(["named entity recognition", "relation extraction"]) == \
+        '"named entity recognition" OR "relation extraction"'
+    assert fulltext_search(['say "hi"', " ", None]) == '"say \\"hi\\""'
+    assert fulltext_search([]) is None
+    assert query_parameters({"keywords": ["Open IE", "event extraction"]})["search"] == \
+        '"open ie" OR "event extraction"'
+
+
+def test_parse_paper_titles():
+    assert parse_paper_titles('"Attention Is All You Need", BERT') == ["attention is all you need", "bert"]
+    assert parse_paper_titles("null") == []
+    assert parse_paper_titles(None) == []
+
+
+def test_date_filters_pick_a_variant_with_only_their_predicates():
+    start_only = template_query("dataset", {"date_range": {"start": "2020", "end": None}})
+    assert "p.date_published >= $date_range_start" in start_only
+    assert "$date_range_end" not in start_only
+    both = template_query("theme", {"domains": ["nlp"], "date_range": {"start": "2019", "end": "2021"}})
+    assert "p.date_published >= $date_range_start" in both
+    assert "p.date_published <= $date_range_end" in both
+    assert template_query("dataset", {}) == DATASET_QUERY
+    assert "date_published >=" not in DATASET_QUERY
+
+
+def test_no_template_uses_null_tolerant_range_predicates():
+    for variants in TEMPLATES.values():
+        for queries in variants.values():
+            for query in queries:
+                assert "$date_range_start IS NULL" not in query
+                assert "$date_range_end IS NULL" not in query
+
+
+def test_min_citations_picks_a_variant_with_its_predicate():
+    query = template_query("author", {"keywords": ["ner"], "min_citations": 50})
+    assert "p.number_of_citations >= $min_citations" in query
+    assert "$min_citations IS NULL" not in query
+    assert "$min_citations" not in template_query("author", {"keywords": ["ner"]})
+    assert len(TEMPLATES["dataset"]) == 8
+
+
+def test_unparsable_date_range_is_passed_to_the_generated_query():
+    for date_range, text in [("last year", "last year"),
+                             ({"start": "early 2020s", "end": "2023"}, "start: early 2020s")]:
+        query_info = {"keywords": ["ner"], "date_range": date_range}
+        assert template_query("dataset", query_info) is None
+        parameters = query_parameters(query_info)
+        assert parameters["date_range_text"] == text
+        assert parameters["date_range_start"] is None
+    assert query_parameters({"date_range": {"start": "2020"}})["date_range_text"] is None
@@ -0,0 +1,107 @@
+import pytest
+
+import paper_embeddings
+from retrieval import SIGNALS_QUERY, QueryEmbedder, min_max, rank_results
+
+
+class FakeEmbedder:
+    name = "local:fake:3"
+    dimensions = 3
+
+    def embed(self, texts):
+        return [[1.0, 0.0, 0.0] for _ in texts]
+
+
+class IndexConn:
+    def __init__(self, model, dimensions):
+        self.record = {"model": model, "dimensions": dimensions}
+
+    def query(self, query, parameters=None):
+        return [self.record]
+
+
+def test_query_embedder_matches_index_model(monkeypatch):
+    monkeypatch.setattr(paper_embeddings, "get_embedder", lambda openai=None: FakeEmbedder())
+    embedder = QueryEmbedder()
+    assert embedder.embed("ner", conn=IndexConn("local:fake:3", 3)) == [1.0, 0.0, 0.0]
+    assert embedder.model == "local:fake:3"
+
+
+def test_query_embedder_fails_fast_on_dimension_mismatch(monkeypatch):
+    monkeypatch.setattr(paper_embeddings, "get_embedder", lambda openai=None: FakeEmbedder())
+    embedder = QueryEmbedder()
+    assert embedder.embed("ner", conn=IndexConn("openai:text-embedding-3-small:1536", 1536)) is None
+    assert embedder.model is None
+    # Disabled for good, not retried after a backoff
+    monkeypatch.setattr(paper_embeddings, "get_embedder", lambda openai=None: 1 / 0)
+    assert embedder.embed("ner", conn=IndexConn("local:fake:3", 3)) is None
+
+
+def test_unset_embedding_backend_is_an_error():
+    with pytest.raises(ValueError, match="EMBEDDING_BACKEND"):
+        paper_embeddings.get_embedder(backend=None)
+
+
+def test_min_max_scales_to_unit_range():
+    assert min_max({"a": 2.0, "b": 4.0, "c": 3.0}) == {"a": 0.0, "b": 1.0, "c": 0.5}
+
+
+def test_min_max_equal_and_missing_values():
+    assert min_max({"a": 5, "b": 5, "c": None}) == {"a": 1.0, "b": 1.0, "c": 0.0}
+    assert min_max({"a": None, "b": None}) == {"a": 0.0, "b": 0.0}
+    assert min_max({}) == {}
+
+
+class SignalsConn:
+    def __init__(self, signals):
+        self.signals = signals
+        self.queries = []
+
+    def query(self, query, parameters=None):
+        self.queries.append(query)
+        if query == SIGNALS_QUERY:
+            return [dict(record, id=paper_id, has_embedding=False) for paper_id, record in self.signals.items()]
+        return []
+
+
+def test_rank_results_orders_papers_by_weighted_signals():
+    conn = SignalsConn({
+        "p1": {"citations": 0, "shared_terms": 0, "candidate_links": 0},
+        "p2": {"citations": 1000, "shared_terms": 2, "candidate_links": 1},
+        "p3": {"citations": 10, "shared_terms": 1, "candidate_links": 0},
+    })
+    results = [
+        {"Id": "p1", "Score": 3.0, "Dataset": "a"},
+        {"Id": "p2", "Score": 1.0, "Dataset": "b"},
+        {"Id": "p1", "Score": 2.0, "Dataset": "c"},
+        {"Id": "p3", "Score": 2.0, "Dataset": "d"},
+    ]
+    weights = {"text": 0.2, "vector": 0.0, "citations": 0.4, "terms": 0.2, "cites": 0.2}
+    ranked = rank_results(conn, {"keywords": ["NER"]}, results, weights=weights, top_k=2)
+    assert [row["Dataset"] for row in ranked] == ["b", "d"]
+    assert ranked[0]["Relevance"] == 0.8
+    assert conn.queries == [SIGNALS_QUERY]
+
+
+def test_rank_results_keeps_rows_without_ids_in_order():
+    rows = [{"Paper": "x"}, {"Paper": "y"}, {"Paper": "z"}]
+    assert rank_results(SignalsConn({}), {}, rows, top_k=2) == rows[:2]
+
+
+class EmbeddedConn(SignalsConn):
+    def query(self, query, parameters=None):
+        self.queries.append(query)
+        if query == SIGNALS_QUERY:
+            return [{"id": paper_id, "citations": 0, "has_embedding": True, "shared_terms": 0,
+                     "candidate_links": 0} for paper_id in parameters["ids"]]
+        self.similarity_parameters = parameters
+        return [{"id": "p1", "similarity": 0.1}, {"id": "p2", "similarity": 0.9}]
+
+
+def test_rank_results_uses_the_embedding_computed_ahead(monkeypatch):
+    monkeypatch.setattr(paper_embeddings, "get_embedder", lambda openai=None: 1 / 0)
+    conn = EmbeddedConn({})
+    rows = [{"Id": "p1"}, {"Id": "p2"}]
+    ranked = rank_results(conn, {}, rows, query_embedding=[0.0, 1.0], top_k=1)
+    assert ranked == [{"Id": "p2", "Relevance": 0.65}]
+    assert conn.similarity_parameters["embedding"] == [0.0, 1.0]
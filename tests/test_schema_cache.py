@@ -0,0 +1,58 @@
+from schema_cache import SchemaCache, format_schema
+
+
+class FakeConn:
+    def __init__(self):
+        self.version = 1
+        self.schema = {"Paper": {"type": "node", "properties": {"title": {}}}}
+        self.schema_fetches = 0
+
+    def query(self, query, parameters=None):
+        if "SchemaVersion" in query:
+            return [{"version": self.version}]
+        self.schema_fetches += 1
+        return [{"value": dict(self.schema)}]
+
+
+def test_schema_is_cached():
+    conn = FakeConn()
+    cache = SchemaCache(check_interval=0)
+    assert cache.get(conn) == conn.schema
+    assert cache.get(conn) == conn.schema
+    assert conn.schema_fetches == 1
+
+
+def test_version_change_reloads_schema():
+    conn = FakeConn()
+    cache = SchemaCache(check_interval=0)
+    cache.get(conn)
+    conn.version = 2
+    conn.schema = {"Paper": {"type": "node", "properties": {"year": {}}}}
+    assert cache.get(conn) == conn.schema
+    assert conn.schema_fetches == 2
+
+
+def test_version_is_only_checked_every_interval():
+    conn = FakeConn()
+    cache = SchemaCache(check_interval=3600)
+    cache.get(conn)
+    conn.version = 2
+    cache.get(conn)
+    assert conn.schema_fetches == 1
+
+
+def test_persists_schema_and_version(tmp_path):
+    path = str(tmp_path / "schema.json")
+    conn = FakeConn()
+    SchemaCache(path=path, check_interval=0).get(conn)
+    SchemaCache(path=path, check_interval=0).get(conn)
+    assert conn.schema_fetches == 1
+
+
+def test_format_schema_hides_version_marker():
+    text = format_schema({
+        "Paper": {"type": "node", "properties": {"title": {}}},
+        "SchemaVersion": {"type": "node", "properties": {"version": {}}},
+    })
+    assert "Paper(title)" in text
+    assert "SchemaVersion" not in text
@@ -0,0 +1,32 @@
+import summary_store
+from summary_store import FLUSH_REQUESTS_QUERY, SummaryWorker, count_request, flush_requests
+
+
+class FakeConn:
+    def __init__(self):
+        self.queries = []
+
+    def query(self, query, parameters=None):
+        self.queries.append((query, parameters))
+        return []
+
+
+def test_counting_a_request_does_not_write():
+    conn = FakeConn()
+    count_request(conn, "p2", flush_after=3600)
+    count_request(conn, "p1", flush_after=3600)
+    count_request(conn, "p2", flush_after=3600)
+    assert conn.queries == []
+    flush_requests(conn)
+    assert conn.queries == [(FLUSH_REQUESTS_QUERY, {"rows": [{"id": "p1", "count": 1},
+                                                             {"id": "p2", "count": 2}]})]
+    flush_requests(conn)
+    assert len(conn.queries) == 1
+
+
+def test_worker_stop_flushes_pending_counts():
+    conn = FakeConn()
+    count_request(conn, "p1", flush_after=3600)
+    SummaryWorker(conn, openai=None).stop()
+    assert conn.queries[0][1] == {"rows": [{"id": "p1", "count": 1}]}
+    assert summary_store._request_counts == {}
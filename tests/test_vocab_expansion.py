@@ -0,0 +1,57 @@
+from vocab_expansion import VocabularyExpander, trigrams
+
+
+def make_expander(**kwargs):
+    return VocabularyExpander.build({
+        "Keyword": {
+            "named entity recognition": {"p1", "p2", "p3"},
+            "ner": {"p1", "p2"},
+            "entity linking": {"p3"},
+            "image segmentation": {"p9"},
+        },
+        "Dataset": {"conll-2003": {"p1"}, "ontonotes 5.0": {"p2"}},
+    }, **kwargs)
+
+
+def test_trigrams_are_padded_and_lower_cased():
+    assert trigrams("NER") == ["  n", " ne", "ner", "er "]
+
+
+def test_cooccurring_terms_are_neighbours():
+    expander = make_expander()
+    assert expander.similar("Keyword", "ner")[0] == "named entity recognition"
+    assert "image segmentation" not in expander.similar("Keyword", "ner")
+
+
+def test_misspelled_term_is_matched_by_trigrams():
+    expander = make_expander()
+    assert expander.match("Keyword", "named entity recogniton") == ["named entity recognition"]
+    assert expander.similar("Keyword", "named entity recogniton")[0] == "named entity recognition"
+    assert expander.match("Keyword", "protein folding") == []
+
+
+def test_expand_adds_graph_terms_per_field():
+    expanded = make_expander().expand({"content": "ner data", "keywords": ["NER"], "datasets": []})
+    assert expanded["keywords"][:2] == ["ner", "named entity recognition"]
+    assert expanded["datasets"] == []
+    assert expanded["content"] == "ner data"
+
+
+def test_posting_lists_are_capped():
+    index = VocabularyExpander._invert([{"f": 0.1}, {"f": 0.9}, {"f": 0.5}], max_postings=2)
+    assert index["f"] == [(1, 0.9), (2, 0.5)]
+
+    def pairs(expander):
+        return sum(len(neighbors) for neighbors in expander.neighbors["Keyword"].values())
+
+    assert 0 < pairs(make_expander(max_postings=1)) < pairs(make_expander())
+
+
+def test_saved_index_round_trips(tmp_path):
+    expander = make_expander()
+    expander.version = "6:7"
+    path = str(tmp_path / "vocab.json")
+    expander.save(path)
+    loaded = VocabularyExpander.load(path)
+    assert loaded.version == "6:7"
+    assert loaded.similar("Keyword", "ner") == expander.similar("Keyword", "ner")
@@ -1,7 +1,11 @@
 import openai
 import json
+import os
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from schema_cache import schema_cache, format_schema
+from query_templates import PAPER_SEARCH_QUERY, fulltext_search
+from vocab_expansion import QUERY_EXPANSION, get_local_expander
 
 def extract_query_information(query, openai):
     prompt = f"""
@@ -24,12 +28,7 @@ def extract_query_information(query, openai):
     """
 
     try:
-        response = openai.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}]
-        )
-
-        content = response.choices[0].message.content.strip()
+        content = openai.complete(prompt).strip()
 
         if not content:
             raise ValueError("Empty response from OpenAI API")
@@ -106,14 +105,8 @@ def expand_query_information(extracted_info, openai_client):
     """
     
     try:
-        # Call OpenAI API for expansion
-        response = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": expansion_prompt}]
-        )
-        
-        # Parse the response
-        expanded_content = response.choices[0].message.content.strip()
+        # Call OpenAI API for expansion and parse the response
+        expanded_content = openai_client.complete(expansion_prompt).strip()
         # print(f"Raw API response: {expanded_content}")
         
         if not expanded_content:
@@ -145,13 +138,160 @@ def expand_query_information(extracted_info, openai_client):
         print(f"Error in query expansion: {e}")
         return extracted_info
 
-def get_database_structure(conn):
-    schema_query = """
-    CALL apoc.meta.schema()
+EXPANDABLE_KEYS = ['keywords', 'domains', 'papers', 'datasets', 'authors', 'conferences']
+
+_string_list = {"type": "array", "items": {"type": "string"}}
+
+# JSON schema for the combined extraction and expansion response
+QUERY_INFORMATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "extracted": {
+            "type": "object",
+            "properties": {
+                "content": {"type": "string"},
+                **{key: _string_list for key in EXPANDABLE_KEYS},
+                "date_range": {
+                    "anyOf": [
+                        {
+                            "type": "object",
+                            "properties": {
+                                "start": {"type": ["string", "null"]},
+                                "end": {"type": ["string", "null"]},
+                            },
+                            "required": ["start", "end"],
+                            "additionalProperties": False,
+                        },
+                        {"type": "null"},
+                    ]
+                },
+                "min_citations": {"type": ["integer", "null"]},
+            },
+            "required": ["content"] + EXPANDABLE_KEYS + ["date_range", "min_citations"],
+            "additionalProperties": False,
+        },
+        "expanded": {
+            "type": "object",
+            "properties": {key: _string_list for key in EXPANDABLE_KEYS},
+            "required": EXPANDABLE_KEYS,
+            "additionalProperties": False,
+        },
+    },
+    "required": ["extracted", "expanded"],
+    "additionalProperties": False,
+}
+
+def default_query_information(query):
+    return {
+        "content": query,
+        "keywords": [],
+        "papers": [],
+        "datasets": [],
+        "domains": [],
+        "authors": [],
+        "conferences": [],
+        "date_range": None,
+        "min_citations": None
+    }
+
+def extract_and_expand_query_information(query, openai):
+    """
+    Extract query information and expand it in a single structured call.
+
+    Does the work of extract_query_information followed by
+    expand_query_information with one round trip, using JSON-schema
+    structured output so the response always parses.
+
+    :param query: User query text
+    :param openai: LLM client object
+    :return: Tuple of (extracted information, expanded information)
     """
+    prompt = f"""
+    Extract the following information from the given query:
+    "{query}"
+
+    In "extracted", return:
+    - "content": the original query text
+    - "keywords": list of relevant keywords or topics
+    - "papers": list of any specific papers mentioned
+    - "datasets": list of any specific datasets mentioned
+    - "domains": list of any specific domains or research areas mentioned
+    - "authors": list of any specific authors mentioned
+    - "conferences": list of any specific conferences mentioned
+    - "date_range": object with "start" and "end" dates if a date range is specified, otherwise null
+    - "min_citations": minimum number of citations if specified, otherwise null
+
+    In "expanded", for each list in "extracted" that is not empty, generate up to 5 additional terms:
+    synonyms, related terms, acronyms or alternative phrasings, and broader and narrower terms.
+    Leave the list empty for categories that were not mentioned.
+
+    Store all values in the lists as lower case.
+    """
+
     try:
-        schema = conn.query(schema_query)
-        return schema[0] if schema else None
+        content = openai.complete(prompt, response_format={
+            "type": "json_schema",
+            "json_schema": {"name": "query_information", "strict": True, "schema": QUERY_INFORMATION_SCHEMA},
+        })
+        result = json.loads(content)
     except Exception as e:
-        print(f"Error fetching schema: {e}")
-        return None
+        print(f"An error occurred: {e}")
+        default = default_query_information(query)
+        return default, dict(default)
+
+    extracted_info = default_query_information(query)
+    extracted_info.update(result["extracted"])
+    for key in EXPANDABLE_KEYS:
+        extracted_info[key] = [term.lower() for term in extracted_info[key]]
+
+    # Merge and deduplicate expanded terms, keeping the original terms first
+    expanded_info = dict(extracted_info)
+    for key in EXPANDABLE_KEYS:
+        expanded_info[key] = list(dict.fromkeys(
+            extracted_info[key] + [term.lower() for term in result["expanded"].get(key, [])]
+        ))
+
+    return extracted_info, expanded_info
+
+def get_expanded_query_information(conn, query, openai):
+    """
+    Extract and expand query information, expanding either with the LLM or,
+    when QUERY_EXPANSION is "local", with graph terms from the vocabulary index.
+    Until the index is available the LLM expansion is used.
+
+    :param conn: Neo4jConnection object, used to check and build the index
+    :param query: User query text
+    :param openai: LLM client object
+    :return: Tuple of (extracted information, expanded information)
+    """
+    if QUERY_EXPANSION == "local":
+        try:
+            expander = get_local_expander(conn)
+        except Exception as e:
+            print(f"Local query expansion unavailable, falling back to the LLM: {e}")
+            expander = None
+        if expander is not None:
+            extracted_info = extract_query_information(query, openai)
+            return extracted_info, expander.expand(extracted_info)
+    return extract_and_expand_query_information(query, openai)
+
+def get_database_structure(conn):
+    """
+    Return the database schema, served from the process-wide schema cache.
+    """
+    return schema_cache.get(conn)
+
+def search_papers(conn, keywords, limit=20):
+    """
+    Find papers whose title, abstract or conclusion match any keyword using
+    the full-text index.
+
+    :param conn: Neo4jConnection object
+    :param keywords: List of keywords or phrases
+    :param limit: Maximum number of papers to return
+    :return: List of records with Id, Title and BM25 Score, best match first
+    """
+    search = fulltext_search(keywords)
+    if not search:
+        return []
+    return conn.query(PAPER_SEARCH_QUERY, parameters={"search": search, "limit": limit})
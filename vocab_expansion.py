@@ -0,0 +1,354 @@
+import argparse
+import heapq
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# query_info key -> node label whose names are used to expand it
+EXPANSION_LABELS = {
+    "keywords": "Keyword",
+    "domains": "Domain",
+    "datasets": "Dataset",
+    "conferences": "Conference",
+}
+
+VOCABULARY_QUERY = """
+MATCH (t)
+WHERE (t:Keyword OR t:Domain OR t:Dataset OR t:Conference) AND t.name IS NOT NULL
+OPTIONAL MATCH (p:Paper)-[:HAS_KEYWORD|HAS_DOMAIN|USES_DATASET|PRESENTED_AT]->(t)
+RETURN labels(t)[0] AS label, t.name AS name, collect(p.id) AS papers
+"""
+
+# Term and link counts, read from the count store; the index is rebuilt when they change
+VOCABULARY_VERSION_QUERY = """
+RETURN COUNT { (:Keyword) } + COUNT { (:Domain) } + COUNT { (:Dataset) } + COUNT { (:Conference) } AS terms,
+       COUNT { ()-[:HAS_KEYWORD]->() } + COUNT { ()-[:HAS_DOMAIN]->() } +
+       COUNT { ()-[:USES_DATASET]->() } + COUNT { ()-[:PRESENTED_AT]->() } AS links
+"""
+
+# "llm" expands terms with the model, "local" with the graph vocabulary index
+QUERY_EXPANSION = os.getenv("QUERY_EXPANSION", "llm")
+
+VOCAB_EXPANSION_PATH = os.getenv("VOCAB_EXPANSION_PATH", "vocab_expansion.json")
+# Seconds between checks of the graph for vocabulary changes
+VOCAB_EXPANSION_CHECK_SECONDS = float(os.getenv("VOCAB_EXPANSION_CHECK_SECONDS", "600"))
+
+
+def trigrams(text):
+    padded = f"  {text.lower()} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def _normalize(vector):
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    return {feature: weight / norm for feature, weight in vector.items()} if norm else {}
+
+
+def _trigram_vectors(names, max_df_ratio=0.05):
+    """
+    TF-IDF vectors over character trigrams. Trigrams shared by more than
+    max_df_ratio of the names carry little signal and are dropped, which also
+    keeps the inverted index posting lists short.
+    """
+    counts = [defaultdict(int) for _ in names]
+    df = defaultdict(int)
+    for count, name in zip(counts, names):
+        for gram in trigrams(name):
+            count[gram] += 1
+        for gram in count:
+            df[gram] += 1
+    max_df = max(50, int(max_df_ratio * len(names)))
+    n = len(names)
+    idf = {gram: math.log(n / d) + 1 for gram, d in df.items() if d <= max_df}
+    vectors = [_normalize({("g", gram): tf * idf[gram] for gram, tf in count.items() if gram in idf})
+               for count in counts]
+    return vectors, idf
+
+
+def _cooccurrence_vectors(paper_sets):
+    """
+    Vectors over the papers a term is attached to, each paper weighted by
+    how few terms share it, so terms used on the same papers end up close.
+    """
+    df = defaultdict(int)
+    for papers in paper_sets:
+        for paper in papers:
+            df[paper] += 1
+    n = len(paper_sets)
+    return [_normalize({("p", paper): math.log(n / df[paper]) + 1 for paper in papers})
+            for papers in paper_sets]
+
+
+class VocabularyExpander:
+    """
+    Expand extracted query terms with similar names that exist in the graph.
+
+    Every Keyword, Domain, Dataset and Conference name gets a sparse vector
+    mixing paper co-occurrence (shared HAS_KEYWORD, HAS_DOMAIN, USES_DATASET
+    and PRESENTED_AT papers) with character trigram TF-IDF. Nearest
+    neighbours are precomputed, so expanding a known term is a dictionary
+    lookup; unknown terms are first matched to graph names by trigrams.
+
+    version identifies the graph vocabulary the index was built from (see
+    graph_version), so a saved index can be checked against the graph.
+    """
+
+    def __init__(self, names, neighbors, cooccurrence_weight=0.7, version=None):
+        self.names = names
+        self.neighbors = neighbors
+        self.cooccurrence_weight = cooccurrence_weight
+        self.version = version
+        self._lookup = {label: {name.lower(): name for name in label_names}
+                        for label, label_names in names.items()}
+        self._trigram_index = {}
+        self._trigram_idf = {}
+        for label, label_names in names.items():
+            vectors, idf = _trigram_vectors(label_names)
+            self._trigram_idf[label] = idf
+            self._trigram_index[label] = self._invert(vectors)
+
+    @classmethod
+    def build(cls, term_papers, k=10, cooccurrence_weight=0.7, min_score=0.2, max_postings=200):
+        """
+        Each name is scored only against the names sharing one of its
+        features, and every feature's posting list keeps just the
+        max_postings names it weighs most, so the build stays close to linear
+        in the vocabulary size instead of comparing all pairs. Common
+        trigrams and papers with many terms lose their weakest postings,
+        which could only contribute small scores.
+
+        Args:
+            term_papers (dict): label -> {name: set of paper ids}
+            k (int): Number of neighbours kept per name
+            cooccurrence_weight (float): Share of the similarity that comes
+                from paper co-occurrence rather than spelling
+            min_score (float): Minimum cosine similarity of a neighbour
+            max_postings (int): Longest posting list kept per feature
+        """
+        names = {}
+        neighbors = {}
+        for label, papers_by_name in term_papers.items():
+            label_names = sorted(papers_by_name)
+            names[label] = label_names
+            trigram_vectors, _ = _trigram_vectors(label_names)
+            cooccurrence_vectors = _cooccurrence_vectors([papers_by_name[name] for name in label_names])
+
+            # Concatenating the two unit vectors scaled by the square roots of
+            # their weights makes the dot product the weighted sum of both cosines
+            a = math.sqrt(cooccurrence_weight)
+            b = math.sqrt(1 - cooccurrence_weight)
+            vectors = [{**{f: w * a for f, w in co.items()}, **{f: w * b for f, w in tri.items()}}
+                       for co, tri in zip(cooccurrence_vectors, trigram_vectors)]
+            index = cls._invert(vectors, max_postings)
+
+            label_neighbors = {}
+            for i, vector in enumerate(vectors):
+                scores = cls._score(vector, index)
+                scores.pop(i, None)
+                best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+                label_neighbors[label_names[i].lower()] = [
+                    [label_names[j], round(score, 4)] for j, score in best if score >= min_score]
+            neighbors[label] = label_neighbors
+        return cls(names, neighbors, cooccurrence_weight)
+
+    @classmethod
+    def from_graph(cls, conn, **kwargs):
+        version = graph_version(conn.query(VOCABULARY_VERSION_QUERY))
+        return cls.from_records(conn.query(VOCABULARY_QUERY), version=version, **kwargs)
+
+    @classmethod
+    def from_records(cls, records, version=None, **kwargs):
+        term_papers = defaultdict(dict)
+        for record in records:
+            term_papers[record["label"]][record["name"]] = set(record["papers"])
+        expander = cls.build(term_papers, **kwargs)
+        expander.version = version
+        return expander
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["names"], data["neighbors"], data.get("cooccurrence_weight", 0.7), data.get("version"))
+
+    def save(self, path):
+        # Written to a temporary file first so a running process never loads a partial index
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"names": self.names, "neighbors": self.neighbors,
+                       "cooccurrence_weight": self.cooccurrence_weight, "version": self.version},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def similar(self, label, term, k=5, min_match=0.5):
+        """
+        Return up to k graph names similar to term, lower-cased.
+
+        A term that is not itself a graph name is replaced by the names it
+        matches best by spelling, and those names are returned first.
+        """
+        term = term.lower()
+        if term in self._lookup.get(label, {}):
+            seeds = [term]
+            results = []
+        else:
+            seeds = [name.lower() for name in self.match(label, term, min_score=min_match)]
+            results = list(seeds)
+        for seed in seeds:
+            for name, _ in self.neighbors.get(label, {}).get(seed, []):
+                results.append(name.lower())
+        results = [name for name in dict.fromkeys(results) if name != term]
+        return results[:k]
+
+    def match(self, label, term, k=3, min_score=0.5):
+        """
+        Return graph names whose spelling is closest to term.
+        """
+        idf = self._trigram_idf.get(label, {})
+        counts = defaultdict(int)
+        for gram in trigrams(term):
+            counts[gram] += 1
+        vector = _normalize({("g", gram): tf * idf[gram] for gram, tf in counts.items() if gram in idf})
+        scores = self._score(vector, self._trigram_index.get(label, {}))
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [self.names[label][i] for i, score in best if score >= min_score]
+
+    def expand(self, extracted_info, k=5):
+        """
+        Return a copy of extracted_info with up to k graph terms added to each
+        expandable list, in the same shape as expand_query_information.
+        """
+        expanded_info = dict(extracted_info)
+        for key, label in EXPANSION_LABELS.items():
+            terms = [term.lower() for term in extracted_info.get(key) or []]
+            expanded = list(terms)
+            for term in terms:
+                expanded += self.similar(label, term, k=k)
+            expanded_info[key] = list(dict.fromkeys(expanded))
+        return expanded_info
+
+    @staticmethod
+    def _invert(vectors, max_postings=None):
+        index = defaultdict(list)
+        for i, vector in enumerate(vectors):
+            for feature, weight in vector.items():
+                index[feature].append((i, weight))
+        if max_postings is not None:
+            for feature, postings in index.items():
+                if len(postings) > max_postings:
+                    index[feature] = heapq.nlargest(max_postings, postings, key=lambda posting: posting[1])
+        return index
+
+    @staticmethod
+    def _score(vector, index):
+        scores = defaultdict(float)
+        for feature, weight in vector.items():
+            for j, other_weight in index.get(feature, ()):
+                scores[j] += weight * other_weight
+        return scores
+
+
+def graph_version(records):
+    """
+    Turn the result of VOCABULARY_VERSION_QUERY into a version string.
+    """
+    record = records[0]
+    return f"{record['terms']}:{record['links']}"
+
+
+def rebuild_expansion_index(driver, path=VOCAB_EXPANSION_PATH):
+    """
+    Build the index from the graph and save it to path, for use right after
+    an ingest so no query has to wait for it.
+    """
+    start = time.perf_counter()
+    with driver.session() as session:
+        version = graph_version(list(session.run(VOCABULARY_VERSION_QUERY)))
+        expander = VocabularyExpander.from_records(list(session.run(VOCABULARY_QUERY)), version=version)
+    expander.save(path)
+    count = sum(len(names) for names in expander.names.values())
+    print(f"Rebuilt vocabulary expansion index of {count} terms in {time.perf_counter() - start:.1f}s")
+    return expander
+
+
+_expander = None
+_expander_lock = threading.Lock()
+_checked_at = None
+_refreshing = False
+
+
+def get_local_expander(conn, path=VOCAB_EXPANSION_PATH, check_interval=VOCAB_EXPANSION_CHECK_SECONDS):
+    """
+    Return the process-wide expander, or None while it is not available yet.
+
+    The saved index at path is loaded on first use. Every check_interval
+    seconds a background thread compares its version with the graph and
+    reloads or rebuilds it when they differ, so a request never waits for a
+    build; callers fall back to LLM expansion while the expander is None.
+    """
+    global _expander, _checked_at, _refreshing
+    with _expander_lock:
+        if _expander is None and _checked_at is None and path and os.path.exists(path):
+            _expander = VocabularyExpander.load(path)
+        now = time.monotonic()
+        if not _refreshing and (_checked_at is None or now - _checked_at >= check_interval):
+            _checked_at = now
+            _refreshing = True
+            threading.Thread(target=_refresh, args=(conn, path), name="vocab-expansion", daemon=True).start()
+        return _expander
+
+
+def _refresh(conn, path):
+    global _expander, _refreshing
+    try:
+        version = graph_version(conn.query(VOCABULARY_VERSION_QUERY))
+        current = _expander
+        if current is not None and current.version == version:
+            return
+        expander = None
+        if path and os.path.exists(path):
+            # Another process (e.g. the ingest) may already have rebuilt it
+            saved = VocabularyExpander.load(path)
+            if saved.version == version:
+                expander = saved
+        if expander is None:
+            start = time.perf_counter()
+            expander = VocabularyExpander.from_records(conn.query(VOCABULARY_QUERY), version=version)
+            print(f"Built vocabulary expansion index in {time.perf_counter() - start:.1f}s")
+            if path:
+                expander.save(path)
+        with _expander_lock:
+            _expander = expander
+    except Exception as e:
+        print(f"Error refreshing vocabulary expansion index: {e}")
+    finally:
+        with _expander_lock:
+            _refreshing = False
+
+
+def main():
+    from neo4j_connection import Neo4jConnection
+
+    parser = argparse.ArgumentParser(description="Build the local query expansion index from the graph.")
+    parser.add_argument("--output", default=VOCAB_EXPANSION_PATH, help="Where to write the index")
+    parser.add_argument("--neighbors", type=int, default=10, help="Neighbours kept per term")
+    parser.add_argument("--max-postings", type=int, default=200,
+                        help="Terms kept per shared trigram or paper when comparing terms")
+    args = parser.parse_args()
+
+    with Neo4jConnection(os.getenv("NEO4J_URI"), os.getenv("NEO4J_USER"), os.getenv("NEO4J_PASSWORD")) as conn:
+        start = time.perf_counter()
+        expander = VocabularyExpander.from_graph(conn, k=args.neighbors, max_postings=args.max_postings)
+        expander.save(args.output)
+        count = sum(len(names) for names in expander.names.values())
+        print(f"Indexed {count} terms in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()